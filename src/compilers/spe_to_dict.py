@@ -5,11 +5,11 @@
 
 from fractions import Fraction
 
-import scipy.stats
 from sympy import E
 from sympy import sqrt
 
 from ..spe import AtomicLeaf
+from ..spe import CategoricalLeaf
 from ..spe import ContinuousLeaf
 from ..spe import DiscreteLeaf
 from ..spe import NominalLeaf
@@ -45,6 +45,7 @@ def env_to_dict(env):
     return {repr(k): repr(v) for k, v in env.items()}
 
 def scipy_dist_from_dict(dist):
+    import scipy.stats
     constructor = getattr(scipy.stats, dist['name'])
     return constructor(*dist['args'], **dist['kwds'])
 
@@ -56,6 +57,10 @@ def scipy_dist_to_dict(dist):
     }
 
 def spe_from_dict(metadata):
+    if metadata['class'] == 'CategoricalLeaf':
+        symbol = Id(metadata['symbol'])
+        logweights = [float(w) for w in metadata['logweights']]
+        return CategoricalLeaf(symbol, metadata['categories'], logweights)
     if metadata['class'] == 'NominalLeaf':
         symbol = Id(metadata['symbol'])
         dist = {x: Fraction(w[0], w[1]) for x, w in metadata['dist']}
@@ -90,6 +95,14 @@ def spe_from_dict(metadata):
     assert False, 'Cannot convert %s to SPE' % (metadata,)
 
 def spe_to_dict(spe):
+    if isinstance(spe, CategoricalLeaf):
+        return {
+            'class'        : 'CategoricalLeaf',
+            'symbol'       : spe.symbol.token,
+            'categories'   : list(spe.categories),
+            'logweights'   : [str(w) for w in spe.logweights.tolist()],
+            'env'          : env_to_dict(spe.env),
+        }
     if isinstance(spe, NominalLeaf):
         return {
             'class'        : 'NominalLeaf',
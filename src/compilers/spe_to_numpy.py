@@ -0,0 +1,218 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+"""Convert SPE to a straight-line NumPy function."""
+
+from functools import lru_cache
+from io import StringIO
+from keyword import iskeyword
+
+import numpy
+
+from ..spe import AtomicLeaf
+from ..spe import ContinuousLeaf
+from ..spe import DiscreteLeaf
+from ..spe import LeafSPE
+from ..spe import NominalLeaf
+from ..spe import ProductSPE
+from ..spe import SumSPE
+from ..spe import spe_nominal_labels
+
+KINDS = ('logpdf', 'logcdf')
+
+get_indentation = lambda i: ' ' * i
+float_to_str = lambda x: repr(float(x))
+
+class _NumPy_Render_State:
+    def __init__(self, kind, symbols):
+        self.kind = kind
+        self.symbols = frozenset(symbols)
+        self.names = {s: symbol_to_name(s, i) for i, s in enumerate(symbols)}
+        self.stream = StringIO()
+        self.constants = {}
+        self.nodes = {}
+        self.counter = 0
+    def fresh(self, prefix):
+        self.counter += 1
+        return '%s_%d' % (prefix, self.counter)
+    def constant(self, prefix, value):
+        name = self.fresh(prefix)
+        self.constants[name] = value
+        return name
+    def write(self, line):
+        self.stream.write('%s%s\n' % (get_indentation(4), line))
+
+def render_numpy_leaf(spe, state):
+    if spe.get_symbols() & state.symbols != {spe.symbol}:
+        raise ValueError('Cannot compile %s of derived symbols in %s'
+            % (state.kind, list(spe.env)))
+    x = state.names[spe.symbol]
+    lp = state.fresh('lp')
+    if isinstance(spe, NominalLeaf):
+        if state.kind != 'logpdf':
+            raise ValueError('Cannot compile %s of NominalLeaf' % (state.kind,))
+        table = {k: spe.logpdf__(k) for k in spe.dist}
+        table_name = state.constant('table', table)
+        state.write('%s = nominal_logpdf(%s, %s)' % (lp, table_name, x))
+        return ('0', lp)
+    if isinstance(spe, AtomicLeaf):
+        value = float_to_str(spe.value)
+        if state.kind == 'logpdf':
+            state.write('%s = where(%s == %s, 0., -inf)' % (lp, x, value))
+        else:
+            state.write('%s = where(%s >= %s, 0., -inf)' % (lp, x, value))
+        return ('0', lp)
+    if state.kind == 'logcdf':
+        leaf = state.constant('leaf', spe)
+        state.write('%s = %s.logcdf(%s)' % (lp, leaf, x))
+        return (None, lp)
+    if isinstance(spe, ContinuousLeaf):
+        dist = state.constant('dist', spe.kernel)
+        expr = '%s.logpdf(%s)' % (dist, x)
+        if spe.conditioned:
+            cl = '<' if spe.support.left_open else '<='
+            cr = '<' if spe.support.right_open else '<='
+            mask = '(%s %s %s) & (%s %s %s)' % (
+                float_to_str(spe.support.left), cl, x,
+                x, cr, float_to_str(spe.support.right))
+            expr = 'where(%s, %s - %s, -inf)' % (
+                mask, expr, float_to_str(spe.logZ))
+        state.write('%s = %s' % (lp, expr))
+        return ('1', lp)
+    if isinstance(spe, DiscreteLeaf):
+        dist = state.constant('dist', spe.kernel)
+        expr = '%s.logpmf(%s)' % (dist, x)
+        if spe.conditioned:
+            mask = '(%s <= %s) & (%s <= %s)' % (
+                float_to_str(spe.xl), x, x, float_to_str(spe.xu))
+            expr = 'where(%s, %s - %s, -inf)' % (
+                mask, expr, float_to_str(spe.logZ))
+        state.write('%s = %s' % (lp, expr))
+        return ('0', lp)
+    assert False, 'Unknown leaf %s' % (spe,)
+
+def render_numpy_sum(spe, state):
+    terms = [render_numpy_helper(c, state) for c in spe.children]
+    lps = ['%s + %s' % (float_to_str(w), lp)
+        for w, (d, lp) in zip(spe.weights, terms)]
+    lp = state.fresh('lp')
+    # Base measures are known statically, so the mixture is a logsumexp.
+    ds = set(d for d, _lp in terms)
+    if len(ds) == 1:
+        expr = lps[0]
+        for term in lps[1:]:
+            expr = 'logaddexp(%s, %s)' % (expr, term)
+        state.write('%s = %s' % (lp, expr))
+        return (terms[0][0], lp)
+    # Base measures depend on which children have nonzero density.
+    d = state.fresh('d')
+    state.write('%s, %s = sum_logpdf((%s,), (%s,))' % (d, lp,
+        ', '.join(d for d, _lp in terms), ', '.join(lps)))
+    return (d, lp)
+
+def render_numpy_product(spe, state):
+    children = [c for c in spe.children if c.get_symbols() & state.symbols]
+    terms = [render_numpy_helper(c, state) for c in children]
+    lp = state.fresh('lp')
+    state.write('%s = %s' % (lp, ' + '.join(lp for _d, lp in terms)))
+    if state.kind != 'logpdf':
+        return (None, lp)
+    ds = [d for d, _lp in terms]
+    if all(d.isdigit() for d in ds):
+        return (str(sum(int(d) for d in ds)), lp)
+    d = state.fresh('d')
+    state.write('%s = %s' % (d, ' + '.join(ds)))
+    return (d, lp)
+
+def render_numpy_helper(spe, state):
+    # Shared subtrees are emitted once.
+    if id(spe) in state.nodes:
+        return state.nodes[id(spe)]
+    if isinstance(spe, LeafSPE):
+        result = render_numpy_leaf(spe, state)
+        if state.kind != 'logpdf':
+            result = (None, result[1])
+    elif isinstance(spe, SumSPE):
+        result = render_numpy_sum(spe, state)
+    elif isinstance(spe, ProductSPE):
+        result = render_numpy_product(spe, state)
+    else:
+        assert False, 'Unknown spe %s' % (spe,)
+    state.nodes[id(spe)] = result
+    return result
+
+def render_numpy(spe, kind, symbols):
+    if kind not in KINDS:
+        raise ValueError('Unknown kind %s (allowed %s)' % (kind, KINDS))
+    unknown = [s for s in symbols if s not in spe.get_symbols()]
+    if unknown:
+        raise ValueError('Unknown symbols %s' % (unknown,))
+    state = _NumPy_Render_State(kind, symbols)
+    nominals = spe_nominal_labels(spe)
+    for symbol in symbols:
+        if symbol not in nominals:
+            x = state.names[symbol]
+            state.write('%s = asarray(%s, dtype=float)' % (x, x))
+    (_d, lp) = render_numpy_helper(spe, state)
+    state.write('return %s' % (lp,))
+    args = ', '.join(state.names[s] for s in symbols)
+    source = 'def %s(%s):\n%s' % (kind, args, state.stream.getvalue())
+    return (source, state.constants)
+
+def compile_numpy(spe, kind='logpdf', symbols=None):
+    if symbols is None:
+        symbols = sorted(spe_base_symbols(spe), key=str)
+    return compile_numpy_cached(spe, kind, tuple(symbols))
+
+@lru_cache(maxsize=128)
+def compile_numpy_cached(spe, kind, symbols):
+    (source, constants) = render_numpy(spe, kind, symbols)
+    namespace = dict(NAMESPACE, **constants)
+    exec(compile(source, '<sppl-%s>' % (kind,), 'exec'), namespace)
+    func = namespace[kind]
+    func.source = source
+    return func
+
+def symbol_to_name(symbol, i):
+    token = symbol.token
+    if token.isidentifier() and not iskeyword(token) \
+            and token not in NAMESPACE \
+            and not token.startswith(('d_', 'dist_', 'leaf_', 'lp_', 'table_', 'x_')):
+        return token
+    return 'x_%d' % (i,)
+
+def spe_base_symbols(spe):
+    if isinstance(spe, LeafSPE):
+        return frozenset([spe.symbol])
+    return frozenset().union(*[spe_base_symbols(c) for c in spe.children])
+
+# ==============================================================================
+# Runtime helpers available in the generated code.
+
+def nominal_logpdf(table, x):
+    if isinstance(x, str):
+        return table.get(x, -numpy.inf)
+    xs = numpy.asarray(x, dtype=object)
+    lps = [table.get(v, -numpy.inf) for v in xs.ravel()]
+    return numpy.asarray(lps, dtype=float).reshape(xs.shape)
+
+def sum_logpdf(ds, lps):
+    # Vectorized version of SumSPE.logpdf_mem: only children with the
+    # smallest base measure among those with nonzero density contribute.
+    arrays = numpy.broadcast_arrays(*ds, *lps)
+    ds = numpy.stack(arrays[:len(ds)])
+    lps = numpy.stack(arrays[len(ds):])
+    ds_noninf = numpy.where(lps > -numpy.inf, ds, numpy.iinfo(int).max)
+    d_min = ds_noninf.min(axis=0)
+    lps_min = numpy.where(ds_noninf == d_min, lps, -numpy.inf)
+    lp = numpy.logaddexp.reduce(lps_min, axis=0)
+    return (numpy.where(numpy.isinf(lp), 0, d_min), lp)
+
+NAMESPACE = {
+    'asarray'           : numpy.asarray,
+    'inf'               : numpy.inf,
+    'logaddexp'         : numpy.logaddexp,
+    'nominal_logpdf'    : nominal_logpdf,
+    'sum_logpdf'        : sum_logpdf,
+    'where'             : numpy.where,
+}
@@ -14,15 +14,17 @@ from types import SimpleNamespace
 from collections import namedtuple
 from collections import OrderedDict
 from contextlib import contextmanager
+from functools import lru_cache
 
 from astunparse import unparse
 
-def __load_spe_distributions():
+@lru_cache(maxsize=None)
+def get_spe_distributions():
+    # Introspect sppl.distributions on first use, not at import time.
     from .. import distributions
     members = inspect.getmembers(distributions,lambda t: isinstance(t, type))
     return frozenset(m for (m, v) in members if m[0].islower())
 
-DISTRIBUTIONS = __load_spe_distributions()
 get_indentation = lambda i: ' ' * i
 
 @contextmanager
@@ -89,7 +91,7 @@ class SPPL_Visitor(ast.NodeVisitor):
 
         # Record visited distributions.
         value = node.value
-        visitor_name = SPPL_Visitor_Name(DISTRIBUTIONS, self.variables)
+        visitor_name = SPPL_Visitor_Name(get_spe_distributions(), self.variables)
         visitor_name.visit(value)
         for d in visitor_name.distributions:
             if d not in self.distributions:
@@ -101,7 +103,7 @@ class SPPL_Visitor(ast.NodeVisitor):
         # Assigning a distribution.
         if visitor_name.distributions:
             # Assigning distribution (directly).
-            if isinstance(value, ast.Call) and value.func.id in DISTRIBUTIONS:
+            if isinstance(value, ast.Call) and value.func.id in get_spe_distributions():
                 return self.visit_Assign_sample_or_transform(node, 'Sample')
             # Assigning distribution (mixture).
             if isinstance(value, ast.BinOp) and isinstance(value.op, ast.BitOr):
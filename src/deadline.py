@@ -0,0 +1,53 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+"""Cooperative deadlines for queries, usable from any thread."""
+
+import threading
+import time
+
+from contextlib import contextmanager
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, deadline):
+        super().__init__('Exceeded deadline of %s seconds' % (deadline.seconds,))
+        self.deadline = deadline
+
+class Deadline():
+    """Wall-clock budget that is checked cooperatively by the running thread."""
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+    def remaining(self):
+        return self.expires - time.monotonic()
+    def check(self):
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(self)
+    def __repr__(self):
+        return 'Deadline(%s)' % (self.seconds,)
+
+# Deadline of the query running in each thread.
+STATE = threading.local()
+
+def get_deadline():
+    return getattr(STATE, 'deadline', None)
+
+def check_deadline():
+    deadline = get_deadline()
+    if deadline is not None:
+        deadline.check()
+
+@contextmanager
+def deadline_scope(deadline):
+    # Install a deadline (a Deadline or seconds) for the current thread,
+    # keeping an enclosing deadline if it expires sooner.
+    previous = get_deadline()
+    if deadline is not None and not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    candidates = [d for d in (previous, deadline) if d is not None]
+    STATE.deadline = min(candidates, key=lambda d: d.expires) \
+        if candidates else None
+    try:
+        yield STATE.deadline
+    finally:
+        STATE.deadline = previous
@@ -0,0 +1,251 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+"""Decision diagrams of events over independent factors.
+
+An event is compiled to a hash-consed Boolean formula over solved literals
+(symbol << values).  Given an ordered list of factors with disjoint symbols
+(e.g., the children of a ProductSPE), each node of the diagram tests the
+factor of the lowest level that its formula mentions: the values of the
+symbols of that factor are split into the disjoint cells on which every
+literal is constant, and cells that leave the same residual formula share
+one outgoing edge.  A formula that only mentions one factor is left for
+that factor to solve, e.g., recursively when the factor is a SumSPE.  Nodes
+are identified by their formulas, so equal residuals are merged and factors
+that a residual does not mention are skipped.  Unlike the DNF, which has
+m**k clauses for a conjunction of k disjunctions of size m, the diagram of a
+CNF-shaped event over distinct factors has O(k * m) nodes."""
+
+from functools import reduce
+from itertools import product
+from math import isinf
+
+from .deadline import check_deadline
+from .math_util import logsumexp
+from .math_util import isinf_neg
+from .sets import EmptySet
+from .sets import FiniteReal
+from .sets import Reals
+from .sets import Strings
+from .sets import get_set_parts
+from .sets import make_set
+from .sets import make_union
+from .transforms import EventAnd
+from .transforms import EventBasic
+from .transforms import EventOr
+
+inf = float('inf')
+
+# Identifiers of the constant formulas.
+FALSE = 0
+TRUE = 1
+
+class Formula():
+    """Hash-consed Boolean formulas over literals, identified by integers."""
+    def __init__(self):
+        self.nodes = [('const', False), ('const', True)]
+        self.symbols = [frozenset(), frozenset()]
+        self.table = {}
+    def make(self, node, symbols):
+        index = self.table.get(node)
+        if index is None:
+            index = len(self.nodes)
+            self.nodes.append(node)
+            self.symbols.append(symbols)
+            self.table[node] = index
+        return index
+    def literal(self, symbol, values):
+        if values is EmptySet:
+            return FALSE
+        return self.make(('lit', symbol, values), frozenset([symbol]))
+    def conjoin(self, args):
+        return self.combine('and', args, FALSE, TRUE, lambda a, b: a & b)
+    def disjoin(self, args):
+        return self.combine('or', args, TRUE, FALSE, lambda a, b: a | b)
+    def combine(self, op, args, absorbing, neutral, merge):
+        # Flatten nested operations and merge literals on the same symbol.
+        flat = []
+        for arg in args:
+            node = self.nodes[arg]
+            flat.extend(node[1] if node[0] == op else [arg])
+        if absorbing in flat:
+            return absorbing
+        literals = {}
+        others = set()
+        for arg in flat:
+            node = self.nodes[arg]
+            if node[0] == 'lit':
+                symbol = node[1]
+                literals[symbol] = merge(literals[symbol], node[2]) \
+                    if symbol in literals else node[2]
+            elif arg != neutral:
+                others.add(arg)
+        for symbol, values in literals.items():
+            others.add(self.literal(symbol, values))
+        others.discard(neutral)
+        if absorbing in others:
+            return absorbing
+        if not others:
+            return neutral
+        if len(others) == 1:
+            return next(iter(others))
+        symbols = frozenset().union(*[self.symbols[a] for a in others])
+        return self.make((op, frozenset(others)), symbols)
+    def compile(self, event):
+        if isinstance(event, EventBasic):
+            [symbol] = event.get_symbols()
+            return self.literal(symbol, event.solve())
+        if isinstance(event, EventAnd):
+            return self.conjoin([self.compile(e) for e in event.subexprs])
+        if isinstance(event, EventOr):
+            return self.disjoin([self.compile(e) for e in event.subexprs])
+        assert False, 'Unknown event: %s' % (event,)
+    def to_event(self, f):
+        node = self.nodes[f]
+        if node[0] == 'lit':
+            return node[1] << node[2]
+        events = [self.to_event(g) for g in sorted(node[1])]
+        if node[0] == 'and':
+            return reduce(lambda a, b: a & b, events)
+        return reduce(lambda a, b: a | b, events)
+    def get_literals(self, f, symbols):
+        # Literals of f on the given symbols.
+        (literals, visited, stack) = (set(), set(), [f])
+        while stack:
+            g = stack.pop()
+            if g in visited or not (self.symbols[g] & symbols):
+                continue
+            visited.add(g)
+            node = self.nodes[g]
+            if node[0] == 'lit':
+                literals.add(g)
+            else:
+                stack.extend(node[1])
+        return sorted(literals)
+    def restrict(self, f, assignment, symbols, memo):
+        # Formula obtained from f by setting the literals in assignment,
+        # which are all the literals of f on the given symbols.
+        if not (self.symbols[f] & symbols):
+            return f
+        if f not in memo:
+            node = self.nodes[f]
+            if node[0] == 'lit':
+                memo[f] = TRUE if assignment[f] else FALSE
+            else:
+                args = [self.restrict(g, assignment, symbols, memo)
+                    for g in node[1]]
+                memo[f] = self.conjoin(args) if node[0] == 'and' \
+                    else self.disjoin(args)
+        return memo[f]
+
+def get_complement(values):
+    # Complement within Strings and the extended reals; the ~ operator on
+    # sets instead complements within the type of each part.
+    (nominals, intervals, atoms) = get_set_parts(values)
+    atoms = [] if atoms is EmptySet else list(atoms.values)
+    reals = make_set(EmptySet, intervals, [x for x in atoms if not isinf(x)])
+    infinities = [x for x in (-inf, inf) if x not in atoms]
+    complements = [
+        Strings if nominals is EmptySet else ~nominals,
+        Reals if reals is EmptySet else ~reals,
+        FiniteReal(*infinities) if infinities else EmptySet,
+    ]
+    complements = [c for c in complements if c is not EmptySet]
+    return make_union(*complements) if complements else EmptySet
+
+def get_cells(formula, literals):
+    # Split the values of the symbols of the literals into disjoint cells
+    # on which every literal is constant, returning a list of pairs
+    # (assignment of literals, map from symbol to cell).
+    by_symbol = {}
+    for literal in literals:
+        (_lit, symbol, values) = formula.nodes[literal]
+        by_symbol.setdefault(symbol, []).append((literal, values))
+    cells_symbols = []
+    for symbol, literals_symbol in by_symbol.items():
+        cells = [({}, None)]
+        for literal, values in literals_symbol:
+            complement = get_complement(values)
+            refined = []
+            for assignment, cell in cells:
+                inside = values if cell is None else cell & values
+                outside = complement if cell is None else cell & complement
+                if inside is not EmptySet:
+                    refined.append(({**assignment, literal: True}, inside))
+                if outside is not EmptySet:
+                    refined.append(({**assignment, literal: False}, outside))
+            cells = refined
+        cells_symbols.append([(a, {symbol: c}) for a, c in cells])
+    return [
+        reduce(lambda x, y: ({**x[0], **y[0]}, {**x[1], **y[1]}), cells)
+        for cells in product(*cells_symbols)
+    ]
+
+def make_cells_event(cells):
+    # Event that the symbols are in one of the cells.
+    if len(cells[0]) == 1:
+        [symbol] = cells[0]
+        return symbol << make_union(*[cell[symbol] for cell in cells])
+    conjunctions = [
+        reduce(lambda a, b: a & b, [symbol << v for symbol, v in cell.items()])
+        for cell in cells
+    ]
+    return reduce(lambda a, b: a | b, conjunctions)
+
+class DecisionDiagram():
+    """Reduced ordered decision diagram of an event over factors."""
+    def __init__(self, root, nodes):
+        self.root = root
+        # Map from node to (level, [(event on factor at level, node), ...]).
+        self.nodes = nodes
+    def size(self):
+        return len(self.nodes)
+    def logprobs(self, logprob_factor):
+        # Map from each node to its log probability, given a function
+        # that returns the log probability of an event on a factor.
+        logps = {TRUE: 0, FALSE: -inf}
+        def logprob_node(node):
+            if node not in logps:
+                check_deadline()
+                (level, edges) = self.nodes[node]
+                terms = []
+                for event, target in edges:
+                    logp_edge = logprob_factor(level, event)
+                    if not isinf_neg(logp_edge):
+                        terms.append(logp_edge + logprob_node(target))
+                logps[node] = logsumexp(terms) if terms else -inf
+            return logps[node]
+        logprob_node(self.root)
+        return logps
+
+def compile_diagram(event, factors):
+    # Compile event to a DecisionDiagram over factors, a list of disjoint
+    # sets of symbols ordered by level.
+    lookup = {s: i for i, symbols in enumerate(factors) for s in symbols}
+    formula = Formula()
+    root = formula.compile(event)
+    nodes = {}
+    stack = [root]
+    while stack:
+        f = stack.pop()
+        if f in (TRUE, FALSE) or f in nodes:
+            continue
+        check_deadline()
+        level = min(lookup[s] for s in formula.symbols[f])
+        symbols = factors[level]
+        # Leave a formula on a single factor for that factor to solve.
+        if formula.symbols[f] <= symbols:
+            nodes[f] = (level, [(formula.to_event(f), TRUE)])
+            continue
+        literals = formula.get_literals(f, symbols)
+        groups = {}
+        for assignment, cell in get_cells(formula, literals):
+            residual = formula.restrict(f, assignment, symbols, {})
+            if residual != FALSE:
+                groups.setdefault(residual, []).append(cell)
+        nodes[f] = (level, [
+            (make_cells_event(cells), residual)
+            for residual, cells in groups.items()
+        ])
+        stack.extend(groups)
+    return DecisionDiagram(root, nodes)
@@ -1,8 +1,13 @@
 # Copyright 2020 MIT Probabilistic Computing Project.
 # See LICENSE.txt
 
-import scipy.stats
-import sympy
+class ScipyFamily():
+    """Distribution family from scipy.stats, imported on first access."""
+    def __init__(self, name):
+        self.name = name
+    def __get__(self, obj, objtype=None):
+        import scipy.stats
+        return getattr(scipy.stats, self.name)
 
 class Distribution():
     def __rmul__(self, x):
@@ -16,11 +21,20 @@ class Distribution():
             return NotImplemented
 
 class NominalDistribution(Distribution):
-    def __init__(self, dist):
+    def __init__(self, dist, exact=True):
         self.dist = dict(dist)
+        self.exact = exact
     def __call__(self, symbol):
-        from .spe import NominalLeaf
-        return NominalLeaf(symbol, self.dist)
+        if self.exact:
+            from .spe import NominalLeaf
+            return NominalLeaf(symbol, self.dist)
+        # Float64 log weights, for variables with many outcomes.
+        import numpy
+        from .spe import CategoricalLeaf
+        weights = numpy.asarray([float(w) for w in self.dist.values()])
+        with numpy.errstate(divide='ignore'):
+            logweights = numpy.log(weights / numpy.sum(weights))
+        return CategoricalLeaf(symbol, self.dist.keys(), logweights)
 
 choice = NominalDistribution
 
@@ -76,6 +90,8 @@ from .sets import RealsNeg
 from .sets import RealsPos
 from .sets import inf as oo
 from .spe import ContinuousLeaf
+from .sym_util import sym_pi
+from .sym_util import sym_sqrt
 
 def RealsPosLoc(kwargs):
     if 'loc' in kwargs:
@@ -92,157 +108,161 @@ class ContinuousReal(RealDistribution):
 
 class alpha(ContinuousReal):
     """An alpha continuous random variable."""
-    dist = scipy.stats.alpha
+    dist = ScipyFamily('alpha')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class anglit(ContinuousReal):
     """An anglit continuous random variable."""
-    dist = scipy.stats.anglit
-    def get_domain(self): return Interval(-sympy.pi/4, sympy.pi/4)
+    dist = ScipyFamily('anglit')
+    def get_domain(self):
+        pi = sym_pi()
+        return Interval(-pi/4, pi/4)
 
 class arcsine(ContinuousReal):
     """An arcsine continuous random variable."""
-    dist = scipy.stats.arcsine
+    dist = ScipyFamily('arcsine')
     def get_domain(self): return UnitIntervalLocScale(self.kwargs)
 
 class argus(ContinuousReal):
     """Argus distribution"""
-    dist = scipy.stats.argus
+    dist = ScipyFamily('argus')
     def get_domain(self): return UnitIntervalLocScale(self.kwargs)
 
 class beta(ContinuousReal):
     """A beta continuous random variable."""
-    dist = scipy.stats.beta
+    dist = ScipyFamily('beta')
     def get_domain(self): return UnitIntervalLocScale(self.kwargs)
 
 class betaprime(ContinuousReal):
     """A beta prime continuous random variable."""
-    dist = scipy.stats.betaprime
+    dist = ScipyFamily('betaprime')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class bradford(ContinuousReal):
     """A Bradford continuous random variable."""
-    dist = scipy.stats.bradford
+    dist = ScipyFamily('bradford')
     def get_domain(self): return UnitIntervalLocScale(self.kwargs)
 
 class burr(ContinuousReal):
     """A Burr (Type III) continuous random variable."""
-    dist = scipy.stats.burr
+    dist = ScipyFamily('burr')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class burr12(ContinuousReal):
     """A Burr (Type XII) continuous random variable."""
-    dist = scipy.stats.burr12
+    dist = ScipyFamily('burr12')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class cauchy(ContinuousReal):
     """A Cauchy continuous random variable."""
-    dist = scipy.stats.cauchy
+    dist = ScipyFamily('cauchy')
     def get_domain(self): return Reals
 
 class chi(ContinuousReal):
     """A chi continuous random variable."""
-    dist = scipy.stats.chi
+    dist = ScipyFamily('chi')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class chi2(ContinuousReal):
     """A chi-squared continuous random variable."""
-    dist = scipy.stats.chi2
+    dist = ScipyFamily('chi2')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class cosine(ContinuousReal):
     """A cosine continuous random variable."""
-    dist = scipy.stats.cosine
-    def get_domain(self): return Interval(-sympy.pi/2, sympy.pi/2)
+    dist = ScipyFamily('cosine')
+    def get_domain(self):
+        pi = sym_pi()
+        return Interval(-pi/2, pi/2)
 
 class crystalball(ContinuousReal):
     """Crystalball distribution."""
-    dist = scipy.stats.crystalball
+    dist = ScipyFamily('crystalball')
     def get_domain(self): return Reals
 
 class dgamma(ContinuousReal):
     """A double gamma continuous random variable."""
-    dist = scipy.stats.dgamma
+    dist = ScipyFamily('dgamma')
     def get_domain(self): return Reals
 
 class dweibull(ContinuousReal):
     """A double Weibull continuous random variable."""
-    dist = scipy.stats.dweibull
+    dist = ScipyFamily('dweibull')
     def get_domain(self): return Reals
 
 class erlang(ContinuousReal):
     """An Erlang continuous random variable."""
-    dist = scipy.stats.erlang
+    dist = ScipyFamily('erlang')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class expon(ContinuousReal):
     """An exponential continuous random variable."""
-    dist = scipy.stats.expon
+    dist = ScipyFamily('expon')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class exponnorm(ContinuousReal):
     """An exponentially modified normal continuous random variable."""
-    dist = scipy.stats.exponnorm
+    dist = ScipyFamily('exponnorm')
     def get_domain(self): return Reals
 
 class exponweib(ContinuousReal):
     """An exponentiated Weibull continuous random variable."""
-    dist = scipy.stats.exponweib
+    dist = ScipyFamily('exponweib')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class exponpow(ContinuousReal):
     """An exponential power continuous random variable."""
-    dist = scipy.stats.exponpow
+    dist = ScipyFamily('exponpow')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class f(ContinuousReal):
     """An F continuous random variable."""
-    dist = scipy.stats.f
+    dist = ScipyFamily('f')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class fatiguelife(ContinuousReal):
     """A fatigue-life (Birnbaum-Saunders) continuous random variable."""
-    dist = scipy.stats.fatiguelife
+    dist = ScipyFamily('fatiguelife')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class fisk(ContinuousReal):
     """A Fisk continuous random variable."""
-    dist = scipy.stats.fisk
+    dist = ScipyFamily('fisk')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class foldcauchy(ContinuousReal):
     """A folded Cauchy continuous random variable."""
-    dist = scipy.stats.foldcauchy
+    dist = ScipyFamily('foldcauchy')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class foldnorm(ContinuousReal):
     """A folded normal continuous random variable."""
-    dist = scipy.stats.foldnorm
+    dist = ScipyFamily('foldnorm')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class genlogistic(ContinuousReal):
     """A generalized logistic continuous random variable."""
-    dist = scipy.stats.genlogistic
+    dist = ScipyFamily('genlogistic')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class gennorm(ContinuousReal):
     """A generalized normal continuous random variable."""
-    dist = scipy.stats.gennorm
+    dist = ScipyFamily('gennorm')
     def get_domain(self): return Reals
 
 class genpareto(ContinuousReal):
     """A generalized Pareto continuous random variable."""
-    dist = scipy.stats.genpareto
+    dist = ScipyFamily('genpareto')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class genexpon(ContinuousReal):
     """A generalized exponential continuous random variable."""
-    dist = scipy.stats.genexpon
+    dist = ScipyFamily('genexpon')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class genextreme(ContinuousReal):
     """A generalized extreme value continuous random variable."""
-    dist = scipy.stats.genextreme
+    dist = ScipyFamily('genextreme')
     def get_domain(self):
         c = self.kwargs['c']
         if c == 0:
@@ -255,280 +275,281 @@ class genextreme(ContinuousReal):
 
 class gausshyper(ContinuousReal):
     """A Gauss hypergeometric continuous random variable."""
-    dist = scipy.stats.gausshyper
+    dist = ScipyFamily('gausshyper')
     def get_domain(self): return UnitIntervalLocScale(self.kwargs)
 
 class gamma(ContinuousReal):
     """A gamma continuous random variable."""
-    dist = scipy.stats.gamma
+    dist = ScipyFamily('gamma')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class gengamma(ContinuousReal):
     """A generalized gamma continuous random variable."""
-    dist = scipy.stats.gengamma
+    dist = ScipyFamily('gengamma')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class genhalflogistic(ContinuousReal):
     """A generalized half-logistic continuous random variable."""
-    dist = scipy.stats.genhalflogistic
+    dist = ScipyFamily('genhalflogistic')
     def get_domain(self):
         assert self.kwargs['c'] > 0
         return Interval(0, 1./self.kwargs['c'])
 
 class geninvgauss(ContinuousReal):
     """A Generalized Inverse Gaussian continuous random variable."""
-    dist = scipy.stats.geninvgauss
+    dist = ScipyFamily('geninvgauss')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class gilbrat(ContinuousReal):
     """A Gilbrat continuous random variable."""
-    dist = scipy.stats.gilbrat
+    dist = ScipyFamily('gilbrat')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class gompertz(ContinuousReal):
     """A Gompertz (or truncated Gumbel) continuous random variable."""
-    dist = scipy.stats.gompertz
+    dist = ScipyFamily('gompertz')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class gumbel_r(ContinuousReal):
     """A right-skewed Gumbel continuous random variable."""
-    dist = scipy.stats.gumbel_r
+    dist = ScipyFamily('gumbel_r')
     def get_domain(self): return Reals
 
 class gumbel_l(ContinuousReal):
     """A left-skewed Gumbel continuous random variable."""
-    dist = scipy.stats.gumbel_l
+    dist = ScipyFamily('gumbel_l')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class halfcauchy(ContinuousReal):
     """A Half-Cauchy continuous random variable."""
-    dist = scipy.stats.halfcauchy
+    dist = ScipyFamily('halfcauchy')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class halflogistic(ContinuousReal):
     """A half-logistic continuous random variable."""
-    dist = scipy.stats.halflogistic
+    dist = ScipyFamily('halflogistic')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class halfnorm(ContinuousReal):
     """A half-normal continuous random variable."""
-    dist = scipy.stats.halfnorm
+    dist = ScipyFamily('halfnorm')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class halfgennorm(ContinuousReal):
     """The upper half of a generalized normal continuous random variable."""
-    dist = scipy.stats.halfgennorm
+    dist = ScipyFamily('halfgennorm')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class hypsecant(ContinuousReal):
     """A hyperbolic secant continuous random variable."""
-    dist = scipy.stats.hypsecant
+    dist = ScipyFamily('hypsecant')
     def get_domain(self): return Reals
 
 class invgamma(ContinuousReal):
     """An inverted gamma continuous random variable."""
-    dist = scipy.stats.invgamma
+    dist = ScipyFamily('invgamma')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class invgauss(ContinuousReal):
     """An inverse Gaussian continuous random variable."""
-    dist = scipy.stats.invgauss
+    dist = ScipyFamily('invgauss')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class invweibull(ContinuousReal):
     """An inverted Weibull continuous random variable."""
-    dist = scipy.stats.invweibull
+    dist = ScipyFamily('invweibull')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class johnsonsb(ContinuousReal):
     """A Johnson SB continuous random variable."""
-    dist = scipy.stats.johnsonsb
+    dist = ScipyFamily('johnsonsb')
     def get_domain(self): return UnitIntervalLocScale(self.kwargs)
 
 class johnsonsu(ContinuousReal):
     """A Johnson SU continuous random variable."""
-    dist = scipy.stats.johnsonsu
+    dist = ScipyFamily('johnsonsu')
     def get_domain(self): return Reals
 
 class kappa4(ContinuousReal):
     """Kappa 4 parameter distribution."""
-    dist = scipy.stats.kappa4
+    dist = ScipyFamily('kappa4')
     def get_domain(self): return Reals
 
 class kappa3(ContinuousReal):
     """Kappa 3 parameter distribution."""
-    dist = scipy.stats.kappa3
+    dist = ScipyFamily('kappa3')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class ksone(ContinuousReal):
     """General Kolmogorov-Smirnov one-sided test."""
-    dist = scipy.stats.ksone
+    dist = ScipyFamily('ksone')
     def get_domain(self): return UnitIntervalLocScale(self.kwargs)
 
 class kstwobign(ContinuousReal):
     """Kolmogorov-Smirnov two-sided test for large N."""
-    dist = scipy.stats.kstwobign
-    def get_domain(self): return Interval(0, sympy.sqrt(self.kwargs['n']))
+    dist = ScipyFamily('kstwobign')
+    def get_domain(self):
+        return Interval(0, sym_sqrt(self.kwargs['n']))
 
 class laplace(ContinuousReal):
     """A Laplace continuous random variable."""
-    dist = scipy.stats.laplace
+    dist = ScipyFamily('laplace')
     def get_domain(self): return Reals
 
 class levy(ContinuousReal):
     """A Levy continuous random variable."""
-    dist = scipy.stats.levy
+    dist = ScipyFamily('levy')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class levy_l(ContinuousReal):
     """A left-skewed Levy continuous random variable."""
-    dist = scipy.stats.levy_l
+    dist = ScipyFamily('levy_l')
     def get_domain(self): return RealsNeg
 
 class levy_stable(ContinuousReal):
     """A Levy-stable continuous random variable."""
-    dist = scipy.stats.levy_stable
+    dist = ScipyFamily('levy_stable')
     def get_domain(self): return Reals
 
 class logistic(ContinuousReal):
     """A logistic (or Sech-squared) continuous random variable."""
-    dist = scipy.stats.logistic
+    dist = ScipyFamily('logistic')
     def get_domain(self): return Reals
 
 class loggamma(ContinuousReal):
     """A log gamma continuous random variable."""
-    dist = scipy.stats.loggamma
+    dist = ScipyFamily('loggamma')
     def get_domain(self): return RealsNeg
 
 class loglaplace(ContinuousReal):
     """A log-Laplace continuous random variable."""
-    dist = scipy.stats.loglaplace
+    dist = ScipyFamily('loglaplace')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class lognorm(ContinuousReal):
     """A lognormal continuous random variable."""
-    dist = scipy.stats.lognorm
+    dist = ScipyFamily('lognorm')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class loguniform(ContinuousReal):
     """A loguniform or reciprocal continuous random variable."""
-    dist = scipy.stats.loguniform
+    dist = ScipyFamily('loguniform')
     def get_domain(self): return Interval(self.kwargs['a'], self.kwargs['b'])
 
 class lomax(ContinuousReal):
     """A Lomax (Pareto of the second kind) continuous random variable."""
-    dist = scipy.stats.lomax
+    dist = ScipyFamily('lomax')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class maxwell(ContinuousReal):
     """A Maxwell continuous random variable."""
-    dist = scipy.stats.maxwell
+    dist = ScipyFamily('maxwell')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class mielke(ContinuousReal):
     """A Mielke Beta-Kappa / Dagum continuous random variable."""
-    dist = scipy.stats.mielke
+    dist = ScipyFamily('mielke')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class moyal(ContinuousReal):
     """A Moyal continuous random variable."""
-    dist = scipy.stats.moyal
+    dist = ScipyFamily('moyal')
     def get_domain(self): return Reals
 
 class nakagami(ContinuousReal):
     """A Nakagami continuous random variable."""
-    dist = scipy.stats.nakagami
+    dist = ScipyFamily('nakagami')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class ncx2(ContinuousReal):
     """A non-central chi-squared continuous random variable."""
-    dist = scipy.stats.ncx2
+    dist = ScipyFamily('ncx2')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class ncf(ContinuousReal):
     """A non-central F distribution continuous random variable."""
-    dist = scipy.stats.ncf
+    dist = ScipyFamily('ncf')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class nct(ContinuousReal):
     """A non-central Student’s t continuous random variable."""
-    dist = scipy.stats.nct
+    dist = ScipyFamily('nct')
     def get_domain(self): return Reals
 
 class norm(ContinuousReal):
     """A normal continuous random variable."""
-    dist = scipy.stats.norm
+    dist = ScipyFamily('norm')
     def get_domain(self): return Reals
 normal = norm
 
 class norminvgauss(ContinuousReal):
     """A normal Inverse Gaussian continuous random variable."""
-    dist = scipy.stats.norminvgauss
+    dist = ScipyFamily('norminvgauss')
     def get_domain(self): return Reals
 
 class pareto(ContinuousReal):
     """A Pareto continuous random variable."""
-    dist = scipy.stats.pareto
+    dist = ScipyFamily('pareto')
     def get_domain(self): return Interval(1, oo)
 
 class pearson3(ContinuousReal):
     """A pearson type III continuous random variable."""
-    dist = scipy.stats.pearson3
+    dist = ScipyFamily('pearson3')
     def get_domain(self): return Reals
 
 class powerlaw(ContinuousReal):
     """A power-function continuous random variable."""
-    dist = scipy.stats.powerlaw
+    dist = ScipyFamily('powerlaw')
     def get_domain(self): return UnitIntervalLocScale(self.kwargs)
 
 class powerlognorm(ContinuousReal):
     """A power log-normal continuous random variable."""
-    dist = scipy.stats.powerlognorm
+    dist = ScipyFamily('powerlognorm')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class powernorm(ContinuousReal):
     """A power normal continuous random variable."""
-    dist = scipy.stats.powernorm
+    dist = ScipyFamily('powernorm')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class rdist(ContinuousReal):
     """An R-distributed (symmetric beta) continuous random variable."""
-    dist = scipy.stats.rdist
+    dist = ScipyFamily('rdist')
     def get_domain(self): return Interval(-1, 1)
 
 class rayleigh(ContinuousReal):
     """A Rayleigh continuous random variable."""
-    dist = scipy.stats.rayleigh
+    dist = ScipyFamily('rayleigh')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class rice(ContinuousReal):
     """A Rice continuous random variable."""
-    dist = scipy.stats.rice
+    dist = ScipyFamily('rice')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class recipinvgauss(ContinuousReal):
     """A reciprocal inverse Gaussian continuous random variable."""
-    dist = scipy.stats.recipinvgauss
+    dist = ScipyFamily('recipinvgauss')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class semicircular(ContinuousReal):
     """A semicircular continuous random variable."""
-    dist = scipy.stats.semicircular
+    dist = ScipyFamily('semicircular')
     def get_domain(self): return Interval(-1, 1)
 
 class skewnorm(ContinuousReal):
     """A skew-normal random variable."""
-    dist = scipy.stats.skewnorm
+    dist = ScipyFamily('skewnorm')
     def get_domain(self): return Reals
 
 class t(ContinuousReal):
     """A Student’s t continuous random variable."""
-    dist = scipy.stats.t
+    dist = ScipyFamily('t')
     def get_domain(self): return Reals
 
 class trapz(ContinuousReal):
     """A trapezoidal continuous random variable."""
-    dist = scipy.stats.trapz
+    dist = ScipyFamily('trapz')
     def get_domain(self):
         loc = self.kwargs.get('loc', 0)
         scale = self.kwargs.get('scale', 1)
@@ -536,7 +557,7 @@ class trapz(ContinuousReal):
 
 class triang(ContinuousReal):
     """A triangular continuous random variable."""
-    dist = scipy.stats.triang
+    dist = ScipyFamily('triang')
     def get_domain(self):
         loc = self.kwargs.get('loc', 0)
         scale = self.kwargs.get('scale', 1)
@@ -544,22 +565,22 @@ class triang(ContinuousReal):
 
 class truncexpon(ContinuousReal):
     """A truncated exponential continuous random variable."""
-    dist = scipy.stats.truncexpon
+    dist = ScipyFamily('truncexpon')
     def get_domain(self): return Interval(0, self.kwargs['b'])
 
 class truncnorm(ContinuousReal):
     """A truncated normal continuous random variable."""
-    dist = scipy.stats.truncnorm
+    dist = ScipyFamily('truncnorm')
     def get_domain(self): return Interval(self.kwargs['a'], self.kwargs['b'])
 
 class tukeylambda(ContinuousReal):
     """A Tukey-Lamdba continuous random variable."""
-    dist = scipy.stats.tukeylambda
+    dist = ScipyFamily('tukeylambda')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class uniform(ContinuousReal):
     """A uniform continuous random variable."""
-    dist = scipy.stats.uniform
+    dist = ScipyFamily('uniform')
     def get_domain(self):
         loc = self.kwargs.get('loc', 0)
         scale = self.kwargs.get('scale', 1)
@@ -567,33 +588,39 @@ class uniform(ContinuousReal):
 
 class vonmises(ContinuousReal):
     """A Von Mises continuous random variable."""
-    dist = scipy.stats.vonmises
-    def get_domain(self): return Interval(-sympy.pi, sympy.pi)
+    dist = ScipyFamily('vonmises')
+    def get_domain(self):
+        pi = sym_pi()
+        return Interval(-pi, pi)
 
 class vonmises_line(ContinuousReal):
     """A Von Mises continuous random variable."""
-    dist = scipy.stats.vonmises_line
-    def get_domain(self): return Interval(-sympy.pi, sympy.pi)
+    dist = ScipyFamily('vonmises_line')
+    def get_domain(self):
+        pi = sym_pi()
+        return Interval(-pi, pi)
 
 class wald(ContinuousReal):
     """A Wald continuous random variable."""
-    dist = scipy.stats.wald
+    dist = ScipyFamily('wald')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class weibull_min(ContinuousReal):
     """Weibull minimum continuous random variable."""
-    dist = scipy.stats.weibull_min
+    dist = ScipyFamily('weibull_min')
     def get_domain(self): return RealsPosLoc(self.kwargs)
 
 class weibull_max(ContinuousReal):
     """Weibull maximum continuous random variable."""
-    dist = scipy.stats.weibull_max
+    dist = ScipyFamily('weibull_max')
     def get_domain(self): return RealsNeg
 
 class wrapcauchy(ContinuousReal):
     """A wrapped Cauchy continuous random variable."""
-    dist = scipy.stats.wrapcauchy
-    def get_domain(self): return Interval(0, 2*sympy.pi)
+    dist = ScipyFamily('wrapcauchy')
+    def get_domain(self):
+        pi = sym_pi()
+        return Interval(0, 2*pi)
 
 # ==============================================================================
 # DiscreteReal
@@ -609,37 +636,37 @@ class DiscreteReal(RealDistribution):
 
 class bernoulli(DiscreteReal):
     """A Bernoulli discrete random variable."""
-    dist = scipy.stats.bernoulli
+    dist = ScipyFamily('bernoulli')
     def get_domain(self): return Range(0, 1)
 
 class betabinom(DiscreteReal):
     """A beta-binomial discrete random variable."""
-    dist = scipy.stats.betabinom
+    dist = ScipyFamily('betabinom')
     def get_domain(self): return Range(0, self.kwargs['n'])
 
 class binom(DiscreteReal):
     """A binomial discrete random variable."""
-    dist = scipy.stats.binom
+    dist = ScipyFamily('binom')
     def get_domain(self): return Range(0, self.kwargs['n'])
 
 class boltzmann(DiscreteReal):
     """A Boltzmann (Truncated Discrete Exponential) random variable."""
-    dist = scipy.stats.boltzmann
+    dist = ScipyFamily('boltzmann')
     def get_domain(self): return Range(0, self.kwargs['N'])
 
 class dlaplace(DiscreteReal):
     """A Laplacian discrete random variable."""
-    dist = scipy.stats.dlaplace
+    dist = ScipyFamily('dlaplace')
     def get_domain(self): return Integers
 
 class geom(DiscreteReal):
     """A geometric discrete random variable."""
-    dist = scipy.stats.geom
+    dist = ScipyFamily('geom')
     def get_domain(self): return Integers
 
 class hypergeom(DiscreteReal):
     """A hypergeometric discrete random variable."""
-    dist = scipy.stats.hypergeom
+    dist = ScipyFamily('hypergeom')
     def get_domain(self):
         low = max(0, self.kwargs['N'], self.kwargs['N']-self.kwargs['M']+self.kwargs['n'])
         high = min(self.kwargs['n'], self.kwargs['N'])
@@ -647,42 +674,42 @@ class hypergeom(DiscreteReal):
 
 class logser(DiscreteReal):
     """A Logarithmic (Log-Series, Series) discrete random variable."""
-    dist = scipy.stats.logser
+    dist = ScipyFamily('logser')
     def get_domain(self): return IntegersPos
 
 class nbinom(DiscreteReal):
     """A negative binomial discrete random variable."""
-    dist = scipy.stats.nbinom
+    dist = ScipyFamily('nbinom')
     def get_domain(self): return IntegersPos0
 
 class planck(DiscreteReal):
     """A Planck discrete exponential random variable."""
-    dist = scipy.stats.planck
+    dist = ScipyFamily('planck')
     def get_domain(self): return IntegersPos0
 
 class poisson(DiscreteReal):
     """A Poisson discrete random variable."""
-    dist = scipy.stats.poisson
+    dist = ScipyFamily('poisson')
     def get_domain(self): return IntegersPos0
 
 class randint(DiscreteReal):
     """A uniform discrete random variable."""
-    dist = scipy.stats.randint
+    dist = ScipyFamily('randint')
     def get_domain(self): return Interval.Ropen(self.kwargs['low'], self.kwargs['high'])
 
 class skellam(DiscreteReal):
     """A Skellam discrete random variable."""
-    dist = scipy.stats.skellam
+    dist = ScipyFamily('skellam')
     def get_domain(self): return Integers
 
 class zipf(DiscreteReal):
     """A Zipf discrete random variable."""
-    dist = scipy.stats.zipf
+    dist = ScipyFamily('zipf')
     def get_domain(self): return IntegersPos
 
 class yulesimon(DiscreteReal):
     """A Yule-Simon discrete random variable."""
-    dist = scipy.stats.yulesimon
+    dist = ScipyFamily('yulesimon')
     def get_domain(self): return IntegersPos
 
 class atomic(randint):
@@ -695,7 +722,9 @@ class atomic(randint):
 
 class rv_discrete(DiscreteReal):
     """A general discrete random variable."""
-    dist = lambda self, **kwargs: scipy.stats.rv_discrete(**kwargs).freeze()
+    def dist(self, **kwargs):
+        import scipy.stats
+        return scipy.stats.rv_discrete(**kwargs).freeze()
     def get_domain(self):
         atoms = self.kwargs['values'][0]
         return Range(min(atoms), max(atoms))
@@ -1,11 +1,18 @@
 # Copyright 2020 MIT Probabilistic Computing Project.
 # See LICENSE.txt
 
+from collections import namedtuple
 from functools import reduce
+from heapq import heappop
+from heapq import heappush
 from itertools import chain
 from itertools import combinations
+from math import prod
+from threading import Lock
 
 from .sets import EmptySet
+from .sets import get_set_parts
+from .sets import make_union
 from .transforms import EventAnd
 from .transforms import EventBasic
 from .transforms import EventOr
@@ -63,6 +70,14 @@ def dnf_factor(event, lookup=None):
 
     assert False, 'Invalid DNF event: %s' % (event,)
 
+def dnf_count_clauses(event):
+    # Number of clauses of event.to_dnf(), without constructing them.
+    if isinstance(event, EventOr):
+        return sum(dnf_count_clauses(e) for e in event.subexprs)
+    if isinstance(event, EventAnd):
+        return prod(dnf_count_clauses(e) for e in event.subexprs)
+    return 1
+
 def dnf_normalize(event):
     if isinstance(event, EventBasic):
         if isinstance(event.subexpr, Id):
@@ -71,73 +86,246 @@ def dnf_normalize(event):
     # solving the subexpressions and return the resulting DNF formula,
     # or None if all solutions evaluate to EmptySet.
     event_dnf = event.to_dnf()
-    event_factor = dnf_factor(event_dnf)
-    solutions = list(filter(lambda x: all(y[1] is not EmptySet for y in x), [
-        [(symbol, ev.solve()) for symbol, ev in clause.items()]
-        for clause in event_factor
-    ]))
-    if not solutions:
+    solutions = dnf_solve_clauses(event_dnf)
+    solutions_simple = dnf_simplify(solutions)
+    if not solutions_simple:
+        SIMPLIFY_STATS.record(len(solutions), 0)
         return None
-    conjunctions = [
-        reduce(lambda x, e: x & e, [(symbol << S) for symbol, S in clause])
-        for i, clause in enumerate(solutions) if clause not in solutions[:i]
-    ]
-    disjunctions = reduce(lambda x, e: x|e, conjunctions)
-    return disjunctions.to_dnf()
+    conjunctions = [dnf_clause_event(clause) for clause in solutions_simple]
+    disjunctions = reduce(lambda x, e: x|e, conjunctions).to_dnf()
+    n_clauses = len(disjunctions.subexprs) \
+        if isinstance(disjunctions, EventOr) else 1
+    SIMPLIFY_STATS.record(len(solutions), n_clauses)
+    return disjunctions
 
-def dnf_non_disjoint_clauses(event):
-    # Given an event in DNF, returns a dictionary R
-    # such that R[j] = [i | i < j and event[i] intersects event[j]]
-    event_factor = dnf_factor(event)
-    solutions = [
+def dnf_clause_event(clause):
+    # Conjunction of the literals of a solved clause.
+    literals = [(symbol << S) for symbol, S in clause.items()]
+    return reduce(lambda x, e: x & e, literals)
+
+def dnf_solve_clauses(event):
+    # Given an event in DNF, returns a list of dictionaries mapping the
+    # symbols of each clause to their solved values.
+    return [
         {symbol: ev.solve() for symbol, ev in clause.items()}
-        for clause in event_factor
+        for clause in dnf_factor(event)
     ]
 
-    n_clauses = len(event_factor)
-    overlap_dict = {}
-    for i, j in combinations(range(n_clauses), 2):
-        # Exit if any symbol in i does not intersect a symbol in j.
-        intersections = (
-            solutions[i][symbol] & solutions[j][symbol]
-                if (symbol in solutions[j]) else
-                solutions[i][symbol]
-            for symbol in solutions[i]
-        )
-        if any(x is EmptySet for x in intersections):
-            continue
-        # Exit if any symbol in j is EmptySet.
-        if any(solutions[j] is EmptySet for symbol in solutions[j]):
+def get_span(values):
+    # Closed bounds of the real part of values, or None.
+    (_nominals, intervals, atoms) = get_set_parts(values)
+    points = list(chain(
+        (i.a for i in intervals),
+        (i.b for i in intervals),
+        atoms.values if atoms is not EmptySet else ()))
+    return (min(points), max(points)) if points else None
+
+def get_overlapping_spans(spans):
+    # Pairs of indexes of intersecting (lo, hi, index) spans, by sweeping
+    # the spans in order of their left endpoints.
+    pairs = []
+    active = []
+    for lo, hi, i in sorted(spans):
+        while active and active[0][0] < lo:
+            heappop(active)
+        pairs.extend((j, i) for _hi, j in active)
+        heappush(active, (hi, i))
+    return pairs
+
+def get_candidate_pairs(clauses, symbol):
+    # Pairs of indexes of clauses whose values of the symbol may intersect,
+    # which is a superset of the pairs whose values do intersect.
+    spans = []
+    nominals_finite = {}
+    nominals_cofinite = []
+    nominals_all = []
+    for i, clause in enumerate(clauses):
+        if symbol not in clause:
             continue
-        # All symbols intersect, so clauses overlap.
-        if j not in overlap_dict:
-            overlap_dict[j] = []
-        overlap_dict[j].append(i)
+        span = get_span(clause[symbol])
+        if span is not None:
+            spans.append((span[0], span[1], i))
+        (nominals, _intervals, _atoms) = get_set_parts(clause[symbol])
+        if nominals is not EmptySet:
+            nominals_all.append(i)
+            if nominals.b:
+                nominals_cofinite.append(i)
+            else:
+                for x in nominals.values:
+                    nominals_finite.setdefault(x, []).append(i)
+    pairs = get_overlapping_spans(spans)
+    for indexes in nominals_finite.values():
+        pairs.extend(combinations(indexes, 2))
+    pairs.extend((i, j)
+        for i in nominals_cofinite for j in nominals_all if i != j)
+    return pairs
 
+def get_overlaps(clauses):
+    # Given solved clauses, returns a dictionary R such that
+    # R[j] = [i | i < j and clauses[i] intersects clauses[j]].
+    # Candidate pairs are found using an index of the values of each symbol,
+    # instead of comparing all pairs of clauses.
+    indexes = [i for i, c in enumerate(clauses)
+        if all(v is not EmptySet for v in c.values())]
+    # Clauses without common symbols always overlap.
+    groups = {}
+    for i in indexes:
+        groups.setdefault(frozenset(clauses[i]), []).append(i)
+    pairs = set()
+    for g0, g1 in combinations(list(groups), 2):
+        if not (g0 & g1):
+            pairs.update((min(i, j), max(i, j))
+                for i in groups[g0] for j in groups[g1])
+    # Clauses with common symbols overlap if all the common values intersect.
+    nonempty = set(indexes)
+    clauses_index = [c if i in nonempty else {} for i, c in enumerate(clauses)]
+    candidates = set()
+    for symbol in set(chain.from_iterable(clauses_index)):
+        candidates.update((min(i, j), max(i, j))
+            for i, j in get_candidate_pairs(clauses_index, symbol))
+    for i, j in candidates:
+        if all(clauses[i][s] & clauses[j][s] is not EmptySet
+                for s in clauses[i] if s in clauses[j]):
+            pairs.add((i, j))
+    overlap_dict = {}
+    for i, j in sorted(pairs):
+        overlap_dict.setdefault(j, []).append(i)
     return overlap_dict
 
+# ==============================================================================
+# Simplification of solved clauses.
+
+SimplifyInfo = namedtuple('SimplifyInfo',
+    ['calls', 'clauses_before', 'clauses_after'])
+
+class SimplifyStats():
+    """Cumulative numbers of clauses before and after dnf_normalize."""
+    def __init__(self):
+        self.calls = 0
+        self.clauses_before = 0
+        self.clauses_after = 0
+        self.lock = Lock()
+    def record(self, before, after):
+        with self.lock:
+            self.calls += 1
+            self.clauses_before += before
+            self.clauses_after += after
+    def info(self):
+        return SimplifyInfo(self.calls, self.clauses_before, self.clauses_after)
+    def clear(self):
+        with self.lock:
+            self.calls = 0
+            self.clauses_before = 0
+            self.clauses_after = 0
+
+SIMPLIFY_STATS = SimplifyStats()
+
+def is_subclause(clause, other):
+    # True if every point of clause is in other.
+    return all(
+        s in clause and clause[s] & values == clause[s]
+        for s, values in other.items())
+
+def dnf_simplify_duplicates(clauses):
+    # Remove clauses that are equal, using hashes of their solutions.
+    seen = set()
+    result = []
+    for clause in clauses:
+        key = frozenset(clause.items())
+        if key not in seen:
+            seen.add(key)
+            result.append(clause)
+    return result
+
+def dnf_simplify_subsumed(clauses):
+    # Remove clauses that are contained in another clause, checking only
+    # the pairs of clauses that overlap.
+    removed = set()
+    for j, indexes in get_overlaps(clauses).items():
+        for i in indexes:
+            if is_subclause(clauses[j], clauses[i]):
+                removed.add(j)
+            elif is_subclause(clauses[i], clauses[j]):
+                removed.add(i)
+    return [c for i, c in enumerate(clauses) if i not in removed]
+
+def dnf_simplify_merge(clauses):
+    # Merge clauses that are equal except on the values of one symbol,
+    # writing (A and B) or (A and C) as (A and (B or C)).
+    for symbol in dict.fromkeys(chain.from_iterable(clauses)):
+        groups = {}
+        for i, clause in enumerate(clauses):
+            key = frozenset((s, v) for s, v in clause.items() if s != symbol) \
+                if symbol in clause else i
+            groups.setdefault(key, []).append(clause)
+        clauses = [
+            group[0] if len(group) == 1 else
+                {**group[0], symbol: make_union(*[c[symbol] for c in group])}
+            for group in groups.values()
+        ]
+    return clauses
+
+def dnf_simplify(clauses):
+    # Given solved clauses, returns an equivalent list of clauses without
+    # empty, duplicate, or subsumed clauses, and with clauses that differ
+    # on one symbol merged, repeating until no clause is removed.
+    clauses = [c for c in clauses if all(v is not EmptySet for v in c.values())]
+    clauses = dnf_simplify_duplicates(clauses)
+    while True:
+        n_clauses = len(clauses)
+        clauses = dnf_simplify_subsumed(clauses)
+        clauses = dnf_simplify_merge(clauses)
+        clauses = dnf_simplify_duplicates(clauses)
+        if len(clauses) == n_clauses:
+            return clauses
+
+def dnf_non_disjoint_clauses(event):
+    # Given an event in DNF, returns a dictionary R
+    # such that R[j] = [i | i < j and event[i] intersects event[j]]
+    return get_overlaps(dnf_solve_clauses(event))
+
+def clause_difference(clause, other):
+    # Given solved clauses, returns disjoint clauses whose union is the
+    # set difference, using the identity (A and B) minus (C and D)
+    # = (A and B and ~C) or (A and B and C and ~D).
+    if any(clause[s] & other[s] is EmptySet for s in clause if s in other):
+        return [clause]
+    pieces = []
+    prefix = dict(clause)
+    for symbol, values in other.items():
+        if symbol in prefix:
+            inside = prefix[symbol] & values
+            outside = prefix[symbol] & ~values
+        else:
+            (inside, outside) = (values, ~values)
+        if outside is not EmptySet:
+            pieces.append({**prefix, symbol: outside})
+        prefix[symbol] = inside
+    return pieces
+
 def dnf_to_disjoint_union(event):
     # Given an event in DNF, returns an event in DNF where all the
-    # clauses are disjoint from one another, by recursively solving the
-    # identity E = (A or B or C) = (A) or (B and ~A) or (C and ~A and ~B).
+    # clauses are disjoint from one another, by solving the identity
+    # E = (A or B or C) = (A) or (B and ~A) or (C and ~A and ~B),
+    # where the negations only include the clauses that overlap.
     # Base case.
     if isinstance(event, (EventBasic, EventAnd)):
         return event
     # Find indexes of pairs of clauses that overlap.
-    overlap_dict = dnf_non_disjoint_clauses(event)
+    clauses = dnf_solve_clauses(event)
+    overlap_dict = get_overlaps(clauses)
     if not overlap_dict:
         return event
-    # Create the cascading negated clauses.
-    n_clauses = len(event.subexprs)
-    clauses_disjoint = [
-        reduce(
-            lambda state, event: state & ~event,
-            (event.subexprs[j] for j in overlap_dict.get(i, [])),
-            event.subexprs[i])
-        for i in range(n_clauses)
-    ]
-    # Recursively find the solutions for each clause.
-    clauses_normalized = [dnf_normalize(clause) for clause in clauses_disjoint]
-    solutions = [dnf_to_disjoint_union(c) for c in clauses_normalized if c]
+    # Create the cascading differences of the solved clauses.
+    solutions = []
+    for i, clause in enumerate(clauses):
+        if any(v is EmptySet for v in clause.values()):
+            continue
+        pieces = [clause]
+        for j in overlap_dict.get(i, []):
+            pieces = list(chain.from_iterable(
+                clause_difference(piece, clauses[j]) for piece in pieces))
+        solutions.extend(pieces)
     # Return the merged solution.
-    return reduce(lambda a, b: a|b, solutions)
+    conjunctions = [dnf_clause_event(clause) for clause in solutions]
+    return reduce(lambda x, e: x|e, conjunctions).to_dnf()
@@ -0,0 +1,178 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+"""Fast kernels for frozen scipy.stats distributions of common families."""
+
+from functools import partial
+from math import log
+from math import pi
+from threading import Lock
+
+import numpy
+
+from scipy.special import bdtr
+from scipy.special import betainc
+from scipy.special import betaln
+from scipy.special import gammainc
+from scipy.special import gammaln
+from scipy.special import log_ndtr
+from scipy.special import ndtr
+from scipy.special import pdtr
+from scipy.special import xlog1py
+from scipy.special import xlogy
+
+inf = float('inf')
+
+class Kernel():
+    """Frozen distribution whose logpdf, logpmf, logcdf, and cdf methods
+    are replaced by closed-form kernels when the family is known."""
+    def __init__(self, dist, descriptor=None):
+        self.dist = dist
+        self.descriptor = descriptor or get_descriptor(dist)
+        for method, f in get_kernel_methods(dist).items():
+            setattr(self, method, f)
+    def __getattr__(self, name):
+        # Methods without a kernel (e.g., ppf, rvs) defer to scipy.
+        if name == 'dist':
+            raise AttributeError(name)
+        return getattr(self.dist, name)
+
+# Kernels are shared among all leaves with the same descriptor, so that
+# conditioning and serialization do not allocate new scipy objects.
+KERNEL_CACHE = {}
+KERNEL_CACHE_SIZE = 1024
+KERNEL_CACHE_LOCK = Lock()
+
+def get_kernel(dist):
+    descriptor = get_descriptor(dist)
+    with KERNEL_CACHE_LOCK:
+        kernel = KERNEL_CACHE.get(descriptor)
+    if kernel is not None:
+        return kernel
+    kernel = Kernel(dist, descriptor)
+    with KERNEL_CACHE_LOCK:
+        if descriptor not in KERNEL_CACHE:
+            if len(KERNEL_CACHE) >= KERNEL_CACHE_SIZE:
+                KERNEL_CACHE.pop(next(iter(KERNEL_CACHE)))
+            KERNEL_CACHE[descriptor] = kernel
+        return KERNEL_CACHE[descriptor]
+
+def get_descriptor(dist):
+    # Compact (family, params) key of a frozen distribution.
+    import scipy.stats
+    name = dist.dist.name
+    params = (dist.args, tuple(sorted(dist.kwds.items())))
+    if hasattr(dist.dist, 'xk'):
+        return (name, params, tuple(dist.dist.xk), tuple(dist.dist.pk))
+    if not isinstance(dist.dist, type(getattr(scipy.stats, name, None))):
+        return (name, params, id(dist.dist))
+    return (name, params)
+
+def get_kernel_methods(dist):
+    import scipy.stats
+    name = dist.dist.name
+    if dist.args or name not in KERNELS:
+        return {}
+    # Custom distributions may reuse the name of a scipy family.
+    if not isinstance(dist.dist, type(getattr(scipy.stats, name))):
+        return {}
+    try:
+        kwds = {k: float(v) for k, v in dist.kwds.items()}
+    except TypeError:
+        return {}
+    return {method: partial(f, **kwds) for method, f in KERNELS[name].items()}
+
+def log_cdf(cdf):
+    with numpy.errstate(divide='ignore'):
+        return numpy.log(cdf)
+
+# ==============================================================================
+# Continuous families.
+
+def norm_logpdf(x, loc=0, scale=1):
+    z = (numpy.asarray(x, dtype=float) - loc) / scale
+    return (-z**2 / 2 - log(scale) - log(2*pi) / 2)[()]
+def norm_logcdf(x, loc=0, scale=1):
+    return log_ndtr((numpy.asarray(x, dtype=float) - loc) / scale)[()]
+def norm_cdf(x, loc=0, scale=1):
+    return ndtr((numpy.asarray(x, dtype=float) - loc) / scale)[()]
+
+def uniform_logpdf(x, loc=0, scale=1):
+    z = (numpy.asarray(x, dtype=float) - loc) / scale
+    return numpy.where((0 <= z) & (z <= 1), -log(scale), -inf)[()]
+def uniform_logcdf(x, loc=0, scale=1):
+    return log_cdf(uniform_cdf(x, loc, scale))[()]
+def uniform_cdf(x, loc=0, scale=1):
+    z = (numpy.asarray(x, dtype=float) - loc) / scale
+    return numpy.clip(z, 0, 1)[()]
+
+def beta_logpdf(x, a, b, loc=0, scale=1):
+    z = (numpy.asarray(x, dtype=float) - loc) / scale
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        lp = xlogy(a - 1, z) + xlog1py(b - 1, -z) - betaln(a, b) - log(scale)
+    return numpy.where((0 <= z) & (z <= 1), lp, -inf)[()]
+def beta_logcdf(x, a, b, loc=0, scale=1):
+    return log_cdf(beta_cdf(x, a, b, loc, scale))[()]
+def beta_cdf(x, a, b, loc=0, scale=1):
+    z = (numpy.asarray(x, dtype=float) - loc) / scale
+    return betainc(a, b, numpy.clip(z, 0, 1))[()]
+
+def gamma_logpdf(x, a, loc=0, scale=1):
+    z = (numpy.asarray(x, dtype=float) - loc) / scale
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        lp = xlogy(a - 1, z) - z - gammaln(a) - log(scale)
+    return numpy.where((0 <= z) & (z < inf), lp, -inf)[()]
+def gamma_logcdf(x, a, loc=0, scale=1):
+    return log_cdf(gamma_cdf(x, a, loc, scale))[()]
+def gamma_cdf(x, a, loc=0, scale=1):
+    z = (numpy.asarray(x, dtype=float) - loc) / scale
+    return gammainc(a, numpy.maximum(z, 0))[()]
+
+# ==============================================================================
+# Discrete families.
+
+def integral_support(k, n):
+    # Mask of finite integers k in {0, ..., n}.
+    return (0 <= k) & (k <= n) & (k < inf) & (numpy.floor(k) == k)
+
+def poisson_logpmf(x, mu, loc=0):
+    k = numpy.asarray(x, dtype=float) - loc
+    with numpy.errstate(invalid='ignore'):
+        lp = xlogy(k, mu) - gammaln(k + 1) - mu
+    return numpy.where(integral_support(k, inf), lp, -inf)[()]
+def poisson_logcdf(x, mu, loc=0):
+    return log_cdf(poisson_cdf(x, mu, loc))[()]
+def poisson_cdf(x, mu, loc=0):
+    k = numpy.floor(numpy.asarray(x, dtype=float) - loc)
+    finite = numpy.where(k < inf, k, 0)
+    return numpy.where(k < 0, 0., numpy.where(k < inf, pdtr(finite, mu), 1.))[()]
+
+def binom_logpmf(x, n, p, loc=0):
+    k = numpy.asarray(x, dtype=float) - loc
+    with numpy.errstate(invalid='ignore'):
+        lp = gammaln(n + 1) - gammaln(k + 1) - gammaln(n - k + 1) \
+            + xlogy(k, p) + xlog1py(n - k, -p)
+    return numpy.where(integral_support(k, n), lp, -inf)[()]
+def binom_logcdf(x, n, p, loc=0):
+    return log_cdf(binom_cdf(x, n, p, loc))[()]
+def binom_cdf(x, n, p, loc=0):
+    k = numpy.floor(numpy.asarray(x, dtype=float) - loc)
+    finite = numpy.clip(k, 0, n)
+    return numpy.where(k < 0, 0., numpy.where(k < n, bdtr(finite, int(n), p), 1.))[()]
+
+def bernoulli_logpmf(x, p, loc=0):
+    return binom_logpmf(x, 1, p, loc)
+def bernoulli_logcdf(x, p, loc=0):
+    return binom_logcdf(x, 1, p, loc)
+def bernoulli_cdf(x, p, loc=0):
+    return binom_cdf(x, 1, p, loc)
+
+KERNELS = {
+    'norm'      : {'logpdf': norm_logpdf, 'logcdf': norm_logcdf, 'cdf': norm_cdf},
+    'uniform'   : {'logpdf': uniform_logpdf, 'logcdf': uniform_logcdf, 'cdf': uniform_cdf},
+    'beta'      : {'logpdf': beta_logpdf, 'logcdf': beta_logcdf, 'cdf': beta_cdf},
+    'gamma'     : {'logpdf': gamma_logpdf, 'logcdf': gamma_logcdf, 'cdf': gamma_cdf},
+    'poisson'   : {'logpmf': poisson_logpmf, 'logcdf': poisson_logcdf, 'cdf': poisson_cdf},
+    'binom'     : {'logpmf': binom_logpmf, 'logcdf': binom_logcdf, 'cdf': binom_cdf},
+    'bernoulli' : {'logpmf': bernoulli_logpmf, 'logcdf': bernoulli_logcdf, 'cdf': bernoulli_cdf},
+}
@@ -1,7 +1,14 @@
 # Copyright 2020 MIT Probabilistic Computing Project.
 # See LICENSE.txt
 
+import os
+import threading
+
+from contextlib import contextmanager
+from itertools import chain
 from math import isinf
+from math import sqrt
+from statistics import NormalDist
 
 import numpy
 
@@ -22,6 +29,21 @@ def logdiffexp(a, b):
         return -float('inf')
     raise ValueError('Negative term in logdiffexp.')
 
+def logdiffexp_array(a, b):
+    a = numpy.asarray(a, dtype=float)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        d = numpy.where(b < a, a + numpy.log(-numpy.expm1(b - a)), -numpy.inf)
+    return d
+
+def wilson_interval(k, n, confidence):
+    # Wilson score interval for a binomial proportion k/n.
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    p = k / n
+    d = 1 + z**2 / n
+    center = (p + z**2 / (2*n)) / d
+    half = z * sqrt(p*(1 - p) / n + z**2 / (4*n**2)) / d
+    return (max(0, center - half), min(1, center + half))
+
 def lognorm(array):
     M = logsumexp(array)
     return [a - M for a in array]
@@ -34,6 +56,36 @@ def flip(p, array, size, rng):
     p = normalize(p)
     return random(rng).choice(array, size=size, p=p)
 
+def make_alias_table(p):
+    # Walker alias table for sampling from p in constant time, built with
+    # the numerically stable method of Vose (1991).
+    p = normalize(p)
+    K = len(p)
+    prob = numpy.zeros(K)
+    alias = numpy.zeros(K, dtype=int)
+    scaled = p * K
+    small = [i for i in range(K) if scaled[i] < 1]
+    large = [i for i in range(K) if scaled[i] >= 1]
+    while small and large:
+        (l, g) = (small.pop(), large.pop())
+        prob[l] = scaled[l]
+        alias[l] = g
+        scaled[g] = (scaled[g] + scaled[l]) - 1
+        if scaled[g] < 1:
+            small.append(g)
+        else:
+            large.append(g)
+    for i in chain(small, large):
+        prob[i] = 1
+        alias[i] = i
+    return (prob, alias)
+
+def sample_alias_table(table, size, rng):
+    (prob, alias) = table
+    prng = random(rng)
+    i = numpy.minimum((prng.random(size) * len(prob)).astype(int), len(prob) - 1)
+    return numpy.where(prng.random(size) < prob[i], i, alias[i])
+
 def normalize(p):
     s = float(sum(p))
     return numpy.asarray(p, dtype=float) / s
@@ -48,8 +100,30 @@ def isinf_neg(x):
     return isinf(x) and x < 0
 
 def random(x):
-    return x or numpy.random
+    # Without an explicit prng, seed a Generator from the global RandomState
+    # so that numpy.random.seed still makes samples reproducible.
+    return x or numpy.random.default_rng(numpy.random.randint(2**32,
+        dtype=numpy.int64))
 
 int_or_isinf_neg = lambda a: isinf_neg(a) or float(a) == int(a)
 int_or_isinf_pos = lambda a: isinf_pos(a) or float(a) == int(a)
 float_to_int = lambda a: a if isinf(a) else int(a)
+
+# In exact mode, solvers return sympy numbers (e.g., symbolic roots of
+# polynomials); otherwise they compute in float64.  The mode is set per
+# thread, and setting the environment variable SPPL_EXACT enables exact
+# mode by default.
+EXACT_DEFAULT = bool(os.environ.get('SPPL_EXACT'))
+EXACT_STATE = threading.local()
+
+def is_exact():
+    return getattr(EXACT_STATE, 'exact', EXACT_DEFAULT)
+
+@contextmanager
+def exact_mode(exact=True):
+    previous = is_exact()
+    EXACT_STATE.exact = exact
+    try:
+        yield
+    finally:
+        EXACT_STATE.exact = previous
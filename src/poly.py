@@ -1,67 +1,216 @@
 # Copyright 2020 MIT Probabilistic Computing Project.
 # See LICENSE.txt
 
+"""Solvers for univariate polynomials with real coefficients.
+
+A polynomial is either a sequence of coefficients in ascending order of
+degree or a univariate sympy expression.  Solutions are computed in float64
+using the roots of the companion matrix, unless exact mode is enabled (see
+math_util.exact_mode), in which case the exact real roots from sympy are
+used for polynomials of small degree when it finds all of them within
+TIMEOUT_SYMBOLIC seconds."""
+
 import os
 
 from itertools import chain
 from math import isinf
 
-import sympy
-
-from sympy import limit
+import numpy
 
+from .deadline import Deadline
+from .deadline import check_deadline
+from .math_util import is_exact
 from .sets import EmptySet
 from .sets import ExtReals
 from .sets import FiniteReal
 from .sets import Interval
 from .sets import Reals
-from .sets import convert_sympy
-from .sets import oo
 from .sets import make_union
+from .sets import oo
 from .sym_util import get_symbols
-from .timeout import timeout
 
 TIMEOUT_SYMBOLIC = 5
 
+# Largest degree of a polynomial that is solved symbolically, with rational
+# and with other (e.g., algebraic) coefficients.  Each sympy step runs to
+# completion, so these limits keep the steps short enough for deadlines.
+DEGREE_SYMBOLIC = 4
+DEGREE_SYMBOLIC_ALGEBRAIC = 3
+
+# Relative tolerances for real roots and for merging repeated roots.
+TOL_IMAG = 1e-7
+TOL_ROOT = 1e-9
+
+# Number of floats on each side of a root to search when snapping it.
+SNAP_ULPS = 16
+
+def check_symbolic(budget):
+    # Check the deadlines between the steps of a symbolic solve, returning
+    # False if the symbolic budget has run out.  Expiry of the query
+    # deadline propagates.
+    check_deadline()
+    return budget.remaining() > 0
+
+def solve_roots_symbolically(expr, b):
+    # Exact real roots of expr - b, sorted, or None if the polynomial is
+    # beyond the symbolic degree limits or sympy does not find all of them
+    # within TIMEOUT_SYMBOLIC seconds.  The solve is split into steps and
+    # the deadlines are checked cooperatively between the steps, so they
+    # are best-effort: a step that has started runs to completion.
+    import sympy
+    budget = Deadline(TIMEOUT_SYMBOLIC)
+    coeffs = get_poly_coeffs(expr)
+    coeffs[0] -= float(b)
+    if len(coeffs) == 1:
+        return None
+    expr = get_poly_expr(expr)
+    poly = sympy.Poly(expr - b, get_poly_symbol(expr))
+    domain = poly.get_domain()
+    degree_max = DEGREE_SYMBOLIC if domain.is_ZZ or domain.is_QQ \
+        else DEGREE_SYMBOLIC_ALGEBRAIC
+    if poly.degree() > degree_max:
+        return None
+    if not check_symbolic(budget):
+        return None
+    roots = sympy.roots(poly, filter='R')
+    if not check_symbolic(budget):
+        return None
+    if len(roots) != len(poly_roots(coeffs)):
+        return None
+    return sorted(roots, key=float)
+
+def use_symbolic():
+    return is_exact() and not os.environ.get('SPPL_NO_SYMBOLIC')
+
 def get_poly_symbol(expr):
     symbols = tuple(get_symbols(expr))
     assert len(symbols) == 1
     return symbols[0]
 
+def get_poly_coeffs(poly):
+    # Float64 coefficients in ascending order, without leading zeros.
+    if isinstance(poly, (list, tuple)):
+        coeffs = poly
+    else:
+        import sympy
+        symX = get_poly_symbol(poly)
+        coeffs = sympy.Poly(poly, symX).all_coeffs()[::-1]
+    coeffs = [float(c) for c in coeffs]
+    while len(coeffs) > 1 and coeffs[-1] == 0:
+        coeffs.pop()
+    return coeffs
+
+def get_poly_expr(poly):
+    # Univariate sympy expression of the polynomial.
+    if not isinstance(poly, (list, tuple)):
+        return poly
+    import sympy
+    from sympy.abc import X as symX
+    return sympy.Add(*[c*symX**i for i, c in enumerate(poly)])
+
+# ==============================================================================
+# Numerical routines on float64 coefficients (ascending order).
+
+def poly_eval(coeffs, x):
+    return numpy.polyval(coeffs[::-1], x)
+
+def poly_derivative(coeffs):
+    return [i*c for i, c in enumerate(coeffs)][1:] or [0.]
+
+def poly_limits(coeffs):
+    # Values at -oo and oo, from the sign of the leading coefficient.
+    degree = len(coeffs) - 1
+    if degree == 0:
+        return (coeffs[0], coeffs[0])
+    lead = oo if coeffs[-1] > 0 else -oo
+    return (lead if degree % 2 == 0 else -lead, lead)
+
+def poly_roots(coeffs):
+    # Sorted distinct real roots, from the eigenvalues of the companion matrix.
+    if len(coeffs) == 1:
+        return []
+    roots = numpy.roots(coeffs[::-1])
+    scale = numpy.maximum(1, numpy.abs(roots))
+    roots = numpy.sort(roots[numpy.abs(roots.imag) <= TOL_IMAG * scale].real)
+    if len(roots) == 0:
+        return []
+    # Polish with Newton steps, skipping near-repeated roots.
+    derivative = poly_derivative(coeffs)
+    for _i in range(2):
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            step = poly_eval(coeffs, roots) / poly_eval(derivative, roots)
+        scale = numpy.maximum(1, numpy.abs(roots))
+        roots = numpy.where(numpy.abs(step) < 1e-6 * scale, roots - step, roots)
+    scale = numpy.maximum(1, numpy.abs(roots))
+    keep = numpy.append(True, numpy.diff(roots) > TOL_ROOT * scale[1:])
+    return roots[keep].tolist()
+
+def poly_snap_root(coeffs, b, x, side):
+    # Move a root x of poly(x) = b to the nearest float at which poly (as
+    # computed by poly_eval, which is also the forward map) equals b, or
+    # else at which poly(x) <= b (side < 0) or poly(x) >= b (side > 0), so
+    # that the root lands inside the target set.
+    xs = [x]
+    for direction in (-oo, oo):
+        y = x
+        for _i in range(SNAP_ULPS):
+            y = numpy.nextafter(y, direction)
+            xs.append(y)
+    xs = numpy.asarray(xs)
+    xs = xs[numpy.argsort(numpy.abs(xs - x), kind='stable')]
+    values = poly_eval(coeffs, xs)
+    for mask in [values == b, values <= b if side < 0 else values >= b]:
+        if numpy.any(mask):
+            return float(xs[numpy.argmax(mask)])
+    return x
+
+def poly_range(coeffs):
+    # Range over the extended reals, from the values at the critical points.
+    coeffs = get_poly_coeffs(coeffs)
+    if len(coeffs) == 1:
+        return FiniteReal(coeffs[0])
+    (val_neg_inf, val_pos_inf) = poly_limits(coeffs)
+    if val_neg_inf != val_pos_inf:
+        return ExtReals
+    critical = poly_roots(poly_derivative(coeffs))
+    values = poly_eval(coeffs, numpy.asarray(critical))
+    if val_pos_inf > 0:
+        return Interval(float(numpy.min(values)), oo) | FiniteReal(oo)
+    return Interval(-oo, float(numpy.max(values))) | FiniteReal(-oo)
+
 # ==============================================================================
 # Solving inequalities.
 
 def solve_poly_inequality(expr, b, strict, extended=None):
+    check_deadline()
     # Handle infinite case.
     if isinf(b):
         return solve_poly_inequality_inf(expr, b, strict, extended=extended)
-    # Bypass symbolic inference.
-    if os.environ.get('SPPL_NO_SYMBOLIC'):
-        return solve_poly_inequality_numerically(expr, b, strict)
-    # Solve symbolically, if possible.
-    try:
-        with timeout(seconds=TIMEOUT_SYMBOLIC):
-            result_symbolic = solve_poly_inequality_symbolically(expr, b, strict)
-    except TimeoutError:
-        result_symbolic = None
-    if result_symbolic is not None:
-        if not isinstance(result_symbolic, (sympy.ConditionSet, sympy.Intersection)):
-            return convert_sympy(result_symbolic)
+    # Solve symbolically, if exact output is requested and possible.
+    if use_symbolic():
+        zeros = solve_roots_symbolically(expr, b)
+        if zeros is not None:
+            return solve_poly_inequality_roots(expr, b, strict, zeros)
     # Solve numerically.
     return solve_poly_inequality_numerically(expr, b, strict)
 
-def solve_poly_inequality_symbolically(expr, b, strict):
-    expr = (expr < b) if strict else (expr <= b)
-    return sympy.solveset(expr, domain=sympy.Reals)
-
 def solve_poly_inequality_numerically(expr, b, strict):
-    poly = expr - b
-    symX = get_poly_symbol(expr)
-    # Obtain numerical roots.
-    roots = sympy.nroots(poly)
-    zeros = sorted([r for r in roots if r.is_real])
+    coeffs = get_poly_coeffs(expr)
+    coeffs_b = [coeffs[0] - float(b)] + coeffs[1:]
+    # Closed endpoints must satisfy the weak inequality and open endpoints
+    # must satisfy the complement of the strict inequality.
+    side = 1 if strict else -1
+    zeros = [poly_snap_root(coeffs, float(b), x, side)
+        for x in poly_roots(coeffs_b)]
+    return solve_poly_inequality_roots(expr, b, strict, zeros)
+
+def solve_poly_inequality_roots(expr, b, strict, zeros):
+    # Solve expr < b (or <=) given the sorted real roots of expr - b.
+    coeffs = get_poly_coeffs(expr)
+    coeffs[0] -= float(b)
     if not zeros:
-        return sympy.EmptySet
+        negative = poly_eval(coeffs, 0) < 0 or (not strict and coeffs == [0.])
+        return Reals if negative else EmptySet
     # Construct intervals around roots.
     mk_intvl = lambda a, b: \
         Interval(a, b, left_open=strict, right_open=strict)
@@ -71,15 +220,16 @@ def solve_poly_inequality_numerically(expr, b, strict):
         [mk_intvl(zeros[-1], oo)]))
     # Define probe points.
     xs_probe = list(chain(
-        [zeros[0] - 1/2],
-        [(i.left + i.right)/2 for i in intervals[1:-1]
-            if isinstance(i, Interval)],
-        [zeros[-1] + 1/2]))
+        [float(zeros[0]) - 1],
+        [(float(x) + float(y))/2 for x, y in zip(zeros, zeros[1:])],
+        [float(zeros[-1]) + 1]))
     # Evaluate poly at the probe points.
-    f_xs_probe = [poly.subs(symX, x) for x in xs_probe]
-    # Return intervals where poly is less than zero.
-    idxs = [i for i, fx in enumerate(f_xs_probe) if fx < 0]
-    return make_union(*[intervals[i] for i in idxs])
+    f_xs_probe = poly_eval(coeffs, numpy.asarray(xs_probe))
+    # Return intervals where poly is less than zero, and the roots if weak.
+    solutions = [intervals[i] for i, fx in enumerate(f_xs_probe) if fx < 0]
+    if not strict:
+        solutions.append(FiniteReal(*zeros))
+    return make_union(*solutions) if solutions else EmptySet
 
 def solve_poly_inequality_inf(expr, b, strict, extended=None):
     # Minimum value of polynomial is negative infinity.
@@ -102,39 +252,32 @@ def solve_poly_inequality_inf(expr, b, strict, extended=None):
 # Solving equalities.
 
 def solve_poly_equality(expr, b):
+    check_deadline()
     # Handle infinite case.
     if isinf(b):
         return solve_poly_equality_inf(expr, b)
-    # Bypass symbolic inference.
-    if os.environ.get('SPPL_NO_SYMBOLIC'):
-        return solve_poly_equality_numerically(expr, b)
-    # Solve symbolically, if possible.
-    try:
-        with timeout(seconds=TIMEOUT_SYMBOLIC):
-            result_symbolic = solve_poly_equality_symbolically(expr, b)
-    except TimeoutError:
-        result_symbolic = None
-    if result_symbolic is not None:
-        if not isinstance(result_symbolic, (sympy.ConditionSet, sympy.Intersection)):
-            return convert_sympy(result_symbolic)
+    # Solve symbolically, if exact output is requested and possible.
+    if use_symbolic():
+        zeros = solve_roots_symbolically(expr, b)
+        if zeros is not None:
+            return FiniteReal(*zeros) if zeros else EmptySet
     # Solve numerically.
     return solve_poly_equality_numerically(expr, b)
 
-def solve_poly_equality_symbolically(expr, b):
-    soln_lt = solve_poly_inequality_symbolically(expr, b, False)
-    soln_gt = solve_poly_inequality_symbolically(-expr, -b, False)
-    return sympy.Intersection(soln_lt, soln_gt)
-
 def solve_poly_equality_numerically(expr, b):
-    roots = sympy.nroots(expr-b)
-    zeros = [r for r in roots if r.is_real]
-    return FiniteReal(*zeros)
+    coeffs = get_poly_coeffs(expr)
+    coeffs_b = [coeffs[0] - float(b)] + coeffs[1:]
+    if coeffs_b == [0.]:
+        return Reals
+    # When no float maps exactly to b, the roots are snapped as the closed
+    # endpoints of poly(x) <= b, so that they are in that solution set.
+    zeros = [poly_snap_root(coeffs, float(b), x, -1)
+        for x in poly_roots(coeffs_b)]
+    return FiniteReal(*zeros) if zeros else EmptySet
 
 def solve_poly_equality_inf(expr, b):
     assert isinf(b)
-    symX = get_poly_symbol(expr)
-    val_pos_inf = limit(expr, symX, oo)
-    val_neg_inf = limit(expr, symX, -oo)
+    (val_neg_inf, val_pos_inf) = poly_limits(get_poly_coeffs(expr))
     check_equal = lambda x: isinf(x) and ((x > 0) if (b > 0) else (x < 0))
     if check_equal(val_pos_inf) and check_equal(val_neg_inf):
         return FiniteReal(oo, -oo)
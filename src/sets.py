@@ -1,10 +1,18 @@
 # Copyright 2020 MIT Probabilistic Computing Project.
 # See LICENSE.txt
 
+from contextlib import contextmanager
+from functools import cached_property
 from functools import reduce
 from itertools import chain
+from math import isinf
+from threading import Lock
+from threading import local
+
+import numpy
 
 from .math_util import int_or_isinf_neg
+from .math_util import is_exact
 from .math_util import int_or_isinf_pos
 from .math_util import isinf_neg
 from .math_util import isinf_pos
@@ -15,12 +23,23 @@ oo = inf
 class Set:
     pass
 
+def normalize_number(x):
+    # Convert a sympy number (e.g., pi/4) to int or float64, so that later
+    # comparisons run natively, unless exact mode is enabled.
+    if isinstance(x, (int, float)) or not getattr(x, 'is_number', False):
+        return x
+    if is_exact():
+        return x
+    return int(x) if x.is_Integer else float(x)
+
 # EmptySetC shall have a single instance.
 class EmptySetC(Set):
     def __init__(self, force=None):
         assert force
     def __contains__(self, x):
         return False
+    def contains_array(self, xs):
+        return numpy.zeros(numpy.shape(xs), dtype=bool)
     def __invert__(self):
         # This case is tricky; by convention, we return Real line.
         # return Union(FiniteNominal(b=True), Interval(-inf, inf))
@@ -43,56 +62,172 @@ class EmptySetC(Set):
     def __str__(self):
         return 'EmptySet'
 
+class Vocabulary():
+    """Interned nominal values, each assigned a fixed bit position."""
+    def __init__(self, values=()):
+        self.values = list(dict.fromkeys(values))
+        self.index = {x: i for i, x in enumerate(self.values)}
+        self.lock = Lock()
+    def __getstate__(self):
+        return {'values': self.values}
+    def __setstate__(self, state):
+        self.__init__(state['values'])
+    def intern(self, x):
+        i = self.index.get(x)
+        if i is None:
+            with self.lock:
+                i = self.index.setdefault(x, len(self.values))
+                if i == len(self.values):
+                    self.values.append(x)
+        return i
+    def to_bits(self, values):
+        return sum(1 << self.intern(x) for x in values)
+    def from_bits(self, bits):
+        # Binary digits of bits, least significant first.
+        digits = bin(bits)[:1:-1]
+        return frozenset(self.values[i]
+            for i, d in enumerate(digits) if d == '1')
+
+# Bitset algebra for FiniteNominal is opt-in: only sets created within a
+# nominal_vocabulary scope carry its vocabulary, which is released along
+# with the last set that refers to it.
+VOCABULARY_STATE = local()
+
+def get_vocabulary():
+    return getattr(VOCABULARY_STATE, 'vocabulary', None)
+
+@contextmanager
+def nominal_vocabulary(vocabulary=None):
+    previous = get_vocabulary()
+    VOCABULARY_STATE.vocabulary = Vocabulary() \
+        if vocabulary is None else vocabulary
+    try:
+        yield VOCABULARY_STATE.vocabulary
+    finally:
+        VOCABULARY_STATE.vocabulary = previous
+
 class FiniteNominal(Set):
-    def __init__(self, *values, b=None):
-        assert values or b
-        self.values = frozenset(values)
+    # Set algebra runs on integer bitsets between two sets that share a
+    # vocabulary, and on frozensets of values otherwise; the values and
+    # bits are each computed lazily from the other.  Sets are equal only
+    # if they also share a vocabulary (or both have none), so that sets
+    # with a vocabulary hash their bits without decoding the values.
+    def __init__(self, *values, b=None, bits=None, vocabulary=None):
+        self.vocabulary = get_vocabulary() if vocabulary is None \
+            else vocabulary
+        if bits is None:
+            assert values or b
+            self.values = frozenset(values)
+        else:
+            assert bits or b
+            assert self.vocabulary is not None
+            self.bits = bits
         self.b = b
+    @cached_property
+    def values(self):
+        return self.vocabulary.from_bits(self.bits)
+    @cached_property
+    def bits(self):
+        return self.vocabulary.to_bits(self.values)
+    def __getstate__(self):
+        # Bit positions are only meaningful within one process.
+        return {'values': self.values, 'b': self.b, 'vocabulary': None}
+    def shares_vocabulary(self, x):
+        return self.vocabulary is not None \
+            and self.vocabulary is x.vocabulary
     def __contains__(self, x):
+        # A cofinite nominal set contains strings only, not numbers.
         if self.b:
-            return x not in self.values
+            return isinstance(x, str) and x not in self.values
         return x in self.values
+    def contains_array(self, xs):
+        xs = numpy.asarray(xs)
+        # Numbers are never nominal values, even in a cofinite set.
+        if is_numeric_array(xs):
+            return numpy.zeros(xs.shape, dtype=bool)
+        mask = numpy.isin(xs, list(self.values))
+        return ~mask if self.b else mask
     def __invert__(self):
-        if not self.values:
+        if self.vocabulary is None:
+            if not self.values:
+                assert self.b
+                return EmptySet
+            return FiniteNominal(*self.values, b=not self.b)
+        if not self.bits:
             assert self.b
             return EmptySet
-        return FiniteNominal(*self.values, b=not self.b)
+        return FiniteNominal(bits=self.bits, b=not self.b,
+            vocabulary=self.vocabulary)
     def __and__(self, x):
         if isinstance(x, FiniteNominal):
-            if not self.b:
-                values = {v for v in self.values if v in x}
-                return FiniteNominal(*values) if values else EmptySet
-            if not x.b:
-                values = {v for v in x.values if v in self}
-                return FiniteNominal(*values) if values else EmptySet
-            values = self.values | x.values
-            return FiniteNominal(*values, b=True)
+            if not self.shares_vocabulary(x):
+                return self.and_values(x)
+            if self.b and x.b:
+                return FiniteNominal(bits=self.bits | x.bits, b=True,
+                    vocabulary=self.vocabulary)
+            if self.b:
+                bits = x.bits & ~self.bits
+            elif x.b:
+                bits = self.bits & ~x.bits
+            else:
+                bits = self.bits & x.bits
+            return FiniteNominal(bits=bits, vocabulary=self.vocabulary) \
+                if bits else EmptySet
         if isinstance(x, (FiniteReal, Interval)):
             return EmptySet
         if isinstance(x, Set):
             return x & self
         return NotImplemented
+    def and_values(self, x):
+        if not self.b:
+            values = {v for v in self.values if v in x}
+            return FiniteNominal(*values) if values else EmptySet
+        if not x.b:
+            values = {v for v in x.values if v in self}
+            return FiniteNominal(*values) if values else EmptySet
+        values = self.values | x.values
+        return FiniteNominal(*values, b=True)
     def __or__(self, x):
         if isinstance(x, FiniteNominal):
-            if self.b:
-                values = {v for v in self.values if v not in x}
-                return FiniteNominal(*values, b=self.b)
-            if x.b:
-                values = {v for v in x.values if v not in self}
-                return FiniteNominal(*values, b=x.b)
-            values = self.values | x.values
-            return FiniteNominal(*values, b=False)
+            if not self.shares_vocabulary(x):
+                return self.or_values(x)
+            if self.b and x.b:
+                bits = self.bits & x.bits
+            elif self.b:
+                bits = self.bits & ~x.bits
+            elif x.b:
+                bits = x.bits & ~self.bits
+            else:
+                bits = self.bits | x.bits
+            return FiniteNominal(bits=bits, b=bool(self.b or x.b),
+                vocabulary=self.vocabulary)
         if isinstance(x, (FiniteReal, Interval)):
             return Union(self, x)
         if isinstance(x, Set):
             return x | self
         return NotImplemented
+    def or_values(self, x):
+        if self.b:
+            values = {v for v in self.values if v not in x}
+            return FiniteNominal(*values, b=self.b)
+        if x.b:
+            values = {v for v in x.values if v not in self}
+            return FiniteNominal(*values, b=x.b)
+        values = self.values | x.values
+        return FiniteNominal(*values, b=False)
     def __eq__(self, x):
-        return isinstance(x, FiniteNominal) \
-            and bool(self.b) == bool(x.b) \
-            and self.values == x.values
+        if not isinstance(x, FiniteNominal) \
+                or bool(self.b) != bool(x.b) \
+                or self.vocabulary is not x.vocabulary:
+            return False
+        if self.vocabulary is None:
+            return self.values == x.values
+        return self.bits == x.bits
     def __hash__(self):
-        x = (self.__class__, self.values, self.b)
+        if self.vocabulary is None:
+            x = (self.__class__, self.values, bool(self.b))
+        else:
+            x = (self.__class__, self.bits, bool(self.b), id(self.vocabulary))
         return hash(x)
     def __repr__(self):
         str_values = ', '.join(repr(x) for x in self.values)
@@ -107,12 +242,39 @@ class FiniteNominal(Set):
 class FiniteReal(Set):
     def __init__(self, *values):
         assert values
-        self.values = frozenset(values)
+        self.values = frozenset(normalize_number(x) for x in values)
+    @cached_property
+    def arrays(self):
+        # Values sorted as a float64 array and an aligned object array of
+        # the original values, or None if some value is symbolic.
+        if not all(isinstance(v, (int, float)) for v in self.values):
+            return None
+        objects = numpy.asarray(sorted(self.values), dtype=object)
+        return (objects.astype(float), objects)
     def __contains__(self, x):
+        if self.arrays is not None and isinstance(x, (int, float)):
+            return bool(self.contains_array(x))
         # inf == oo but hash(inf) != hash(oo)
         return any(x == v for v in self.values)
+    def contains_array(self, xs):
+        xs = numpy.asarray(xs)
+        if not is_numeric_array(xs):
+            return numpy.zeros(xs.shape, dtype=bool)
+        if self.arrays is None:
+            return numpy.isin(xs, [float(v) for v in self.values])
+        (floats, _objects) = self.arrays
+        i = numpy.minimum(numpy.searchsorted(floats, xs), len(floats) - 1)
+        return floats[i] == xs
+    def select(self, x, inside=True):
+        # List the values that are (or are not) in the set x.
+        if self.arrays is None:
+            return [v for v in self.values if (v in x) == inside]
+        (floats, objects) = self.arrays
+        mask = x.contains_array(floats)
+        return list(objects[mask if inside else ~mask])
     def __invert__(self):
-        values = sorted(self.values)
+        values = sorted(self.values) if self.arrays is None \
+            else self.arrays[1].tolist()
         intervals = chain(
             # Left-infinity interval.
             [Interval.Ropen(-inf, values[0])],
@@ -126,7 +288,7 @@ class FiniteReal(Set):
             values = self.values & x.values
             return FiniteReal(*values) if values else EmptySet
         if isinstance(x, Interval):
-            values = {v for v in self.values if v in x}
+            values = self.select(x)
             return FiniteReal(*values) if values else EmptySet
         if isinstance(x, FiniteNominal):
             return EmptySet
@@ -139,20 +301,21 @@ class FiniteReal(Set):
             return FiniteReal(*values)
         if isinstance(x, Interval):
             # Merge endpoints.
-            values = set(self.values)
             interval = x
-            if interval.a in values and interval.left_open:
-                values.remove(interval.a)
+            if interval.left_open and interval.a in self:
                 interval = Interval(interval.a, interval.b,
                     left_open=None,
                     right_open=interval.right_open)
-            if interval.b in values and interval.right_open:
-                values.remove(interval.b)
+            if interval.right_open and interval.b in self:
                 interval = Interval(interval.a, interval.b,
                     left_open=interval.left_open,
                     right_open=None)
-            values = {v for v in values if v not in interval}
+            values = self.select(interval, inside=False)
             return Union(FiniteReal(*values), interval) if values else interval
+        if isinstance(x, Union):
+            # Atoms inside x are absorbed; only the others are merged.
+            values = self.select(x.reals, inside=False)
+            return make_union(x, FiniteReal(*values)) if values else x
         if isinstance(x, FiniteNominal):
             return Union(self, x)
         if isinstance(x, Set):
@@ -175,6 +338,7 @@ class FiniteReal(Set):
 
 class Interval(Set):
     def __init__(self, a, b, left_open=None, right_open=None):
+        (a, b) = (normalize_number(a), normalize_number(b))
         assert a < b
         self.a = a
         self.b = b
@@ -192,6 +356,14 @@ class Interval(Set):
         if not self.left_open and not self.right_open:
             return self.a <= x <= self.b
         assert False
+    def contains_array(self, xs):
+        xs = numpy.asarray(xs)
+        if not is_numeric_array(xs):
+            return numpy.zeros(xs.shape, dtype=bool)
+        (a, b) = (float(self.a), float(self.b))
+        lower = (a < xs) if self.left_open else (a <= xs)
+        upper = (xs < b) if self.right_open else (xs <= b)
+        return lower & upper
     def __invert__(self):
         if isinf_neg(self.a):
             if isinf_pos(self.b):
@@ -290,6 +462,7 @@ class Union(Set):
         self.nominals = nominals[0] if nominals else EmptySet
         self.atoms = atoms[0] if atoms else EmptySet
         self.intervals = frozenset(x for x in valuesne if isinstance(x, Interval))
+        self.blocks = sorted(self.intervals, key=interval_sort_key)
         # Build the values.
         vals = []
         if nominals:
@@ -302,8 +475,18 @@ class Union(Set):
         assert 2 <= len(self.values)
         # SymPy compatibility
         self.args = valuesne
+    @cached_property
+    def reals(self):
+        # Union of the intervals and atoms, without the nominals.
+        if self.nominals is EmptySet:
+            return self
+        values = [v for v in self.args if v is not self.nominals]
+        return values[0] if len(values) == 1 else Union(*values)
     def __contains__(self, x):
         return any(x in v for v in self.values)
+    def contains_array(self, xs):
+        masks = [v.contains_array(xs) for v in self.values]
+        return numpy.logical_or.reduce(masks)
     def __eq__(self, x):
         return isinstance(x, Union) \
             and self.values == x.values
@@ -319,90 +502,158 @@ class Union(Set):
             return EmptySet
         if isinstance(x, FiniteNominal):
             return self.nominals & x
-        if isinstance(x, (FiniteReal, Interval)):
-            atoms = self.atoms & x
-            intervals = [i & x for i in self.intervals]
-            intervalsne = [i for i in intervals if i is not EmptySet]
-            if atoms is EmptySet:
-                if not intervalsne:
-                    return EmptySet
-                if len(intervalsne) == 1:
-                    return intervalsne[0]
-            if not intervalsne:
-                return atoms
-            return Union(atoms, *intervalsne)
-        if isinstance(x, Union):
-            terms = [self & v for v in x.values]
-            return reduce(lambda a,b: a |b, terms)
+        if isinstance(x, (FiniteReal, Interval, Union)):
+            (nominals, intervals, atoms) = get_set_parts(x)
+            (intervals_both, atoms_both) = intersect_intervals(
+                self.blocks, intervals)
+            # Select atoms against the real parts only, since a cofinite
+            # nominal set does not contain any number.
+            reals_x = x.reals if isinstance(x, Union) else x
+            atoms_self = [] if self.atoms is EmptySet \
+                else self.atoms.select(reals_x)
+            atoms_x = [] if atoms is EmptySet else atoms.select(self.reals)
+            return make_set(self.nominals & nominals, intervals_both,
+                atoms_both + atoms_self + atoms_x)
     def __or__(self, x):
         if x is EmptySet:
             return self
         if isinstance(x, FiniteNominal):
             nominals = self.nominals | x
             return Union(nominals, self.atoms, *self.intervals)
-        if isinstance(x, FiniteReal):
-            atoms = self.atoms | x
-            blocks = union_intervals_finite(self.intervals, atoms)
-            assert blocks
-            if len(blocks) == 1 and self.nominals is EmptySet:
-                return blocks[0]
-            return Union(self.nominals, *blocks)
-        if isinstance(x, Interval):
-            intervals = list(self.intervals) + [x]
-            blocks = union_intervals_finite(intervals, self.atoms)
-            assert blocks
-            if len(blocks) == 1 and self.nominals is EmptySet:
-                return blocks[0]
-            return Union(self.nominals, *blocks)
-        if isinstance(x, Union):
-            return reduce(lambda a,b: a | b, x.values, self)
+        if isinstance(x, (FiniteReal, Interval, Union)):
+            return make_union(self, x)
         return NotImplemented
     def __invert__(self):
+        if self.nominals is EmptySet:
+            atoms = [] if self.atoms is EmptySet else self.atoms.values
+            return make_set(EmptySet, *complement_intervals(self.blocks, atoms))
         inversions = [~x for x in self.values]
-        return reduce(lambda a,b: a&b, inversions)
+        return make_intersection(*inversions)
     def __iter__(self):
         return iter(self.args)
 
-def union_intervals(intervals):
-    intervals_sorted = sorted(intervals, key=lambda i:i.a)
-    blocks = [intervals_sorted[0]]
-    for interval in intervals_sorted[1:]:
-        interval_union = blocks[-1] | interval
-        if isinstance(interval_union, Interval):
-            blocks[-1] = interval_union
-        elif isinstance(interval_union, Union):
-            blocks.append(interval)
-        else:
-            assert False
-    return blocks
+def is_numeric_array(xs):
+    return xs.dtype.kind in 'biuf'
 
-def union_intervals_finite(intervals, finite):
-    if finite is EmptySet:
-        return union_intervals(intervals)
+# ==============================================================================
+# Linear-time algebra on sorted lists of disjoint intervals.
+
+interval_sort_key = lambda i: (i.a, i.left_open)
+
+def get_set_parts(x):
+    # Split a set into (nominals, sorted intervals, atoms).
+    if isinstance(x, FiniteNominal):
+        return (x, [], EmptySet)
+    if isinstance(x, Interval):
+        return (EmptySet, [x], EmptySet)
+    if isinstance(x, FiniteReal):
+        return (EmptySet, [], x)
+    if isinstance(x, Union):
+        return (x.nominals, x.blocks, x.atoms)
+    assert x is EmptySet
+    return (EmptySet, [], EmptySet)
+
+def make_set(nominals, intervals, atoms):
+    atoms = FiniteReal(*atoms) if atoms else EmptySet
+    values = [v for v in [nominals, atoms] + intervals if v is not EmptySet]
+    if not values:
+        return EmptySet
+    return values[0] if len(values) == 1 else Union(*values)
+
+def union_intervals_atoms(intervals, atoms):
+    # Merge intervals and finite atoms into disjoint, non-adjacent blocks in
+    # one sweep over the sorted left endpoints.  Infinite atoms cannot be
+    # absorbed by an interval, so they are kept as atoms.
+    items = [(i.a, i.left_open, i.b, i.right_open) for i in intervals]
+    items.extend((v, False, v, False) for v in atoms if not isinf(v))
+    items.sort(key=lambda t: (t[0], t[1]))
     blocks = []
-    finite_current = finite
-    for interval in intervals:
-        interval_union = interval | finite_current
-        if isinstance(interval_union, Interval):
-            blocks.append(interval_union)
-            finite_current = EmptySet
-        elif isinstance(interval_union, Union):
-            assert interval_union.atoms is not EmptySet
-            assert len(interval_union.intervals) == 1
-            interval_part = next(iter(interval_union.intervals))
-            blocks.append(interval_part)
-            finite_current = interval_union.atoms
+    for (a, lo, b, ro) in items:
+        if blocks:
+            (a0, lo0, b0, ro0) = blocks[-1]
+            if a < b0 or (a == b0 and not (ro0 and lo)):
+                if b0 < b:
+                    blocks[-1] = (a0, lo0, b, ro)
+                elif b0 == b:
+                    blocks[-1] = (a0, lo0, b0, ro0 and ro)
+                continue
+        blocks.append((a, lo, b, ro))
+    intervals = [Interval(a, b, lo, ro) for (a, lo, b, ro) in blocks if a != b]
+    points = [a for (a, _lo, b, _ro) in blocks if a == b]
+    return (intervals, points + [v for v in atoms if isinf(v)])
+
+def intersect_intervals(xs, ys):
+    # Intersect two lists of intervals in one sweep over their sorted,
+    # disjoint blocks, since a Union built directly may hold overlaps.
+    (xs, _points) = union_intervals_atoms(xs, [])
+    (ys, _points) = union_intervals_atoms(ys, [])
+    intervals = []
+    atoms = []
+    (i, j) = (0, 0)
+    while i < len(xs) and j < len(ys):
+        (x, y) = (xs[i], ys[j])
+        (a, lo) = max((x.a, x.left_open), (y.a, y.left_open))
+        end_x = (x.b, not x.right_open)
+        end_y = (y.b, not y.right_open)
+        (b, rc) = min(end_x, end_y)
+        if a < b:
+            intervals.append(Interval(a, b, lo, not rc))
+        elif a == b and not lo and rc:
+            atoms.append(a)
+        if end_x < end_y:
+            i += 1
         else:
-            assert False
-    blocks_merged = union_intervals(blocks)
-    if finite_current is not EmptySet:
-        blocks_merged.append(finite_current)
-    return blocks_merged
+            j += 1
+    return (intervals, atoms)
+
+def complement_intervals(intervals, atoms):
+    # Complement (in the reals) of a union of intervals and atoms, which are
+    # swept in sorted order to emit the gaps between consecutive blocks.
+    (intervals, atoms) = union_intervals_atoms(intervals, atoms)
+    items = [(i.a, i.left_open, i.b, i.right_open) for i in intervals]
+    items.extend((v, False, v, False) for v in atoms if not isinf(v))
+    items.sort(key=lambda t: (t[0], t[1]))
+    gaps = []
+    points = []
+    (left, left_open) = (-inf, True)
+    for (a, lo, b, ro) in items + [(inf, True, inf, True)]:
+        if left < a:
+            gaps.append(Interval(left, a, left_open, not lo))
+        elif left == a and not left_open and lo:
+            points.append(a)
+        (left, left_open) = (b, not ro)
+    return (gaps, points)
 
 def make_union(*args):
-    return reduce(lambda a,b: a|b, args)
+    if len(args) == 1:
+        return args[0]
+    parts = [get_set_parts(x) for x in args]
+    nominals = reduce(lambda a,b: a|b, [n for n, _i, _a in parts])
+    intervals = list(chain.from_iterable(i for _n, i, _a in parts))
+    atoms = list(chain.from_iterable(
+        a.values for _n, _i, a in parts if a is not EmptySet))
+    return make_set(nominals, *union_intervals_atoms(intervals, atoms))
 def make_intersection(*args):
-    return reduce(lambda a,b: a&b, args)
+    if len(args) == 1:
+        return args[0]
+    if any(x is EmptySet for x in args):
+        return EmptySet
+    parts = [get_set_parts(x) for x in args]
+    nominals = reduce(lambda a,b: a&b, [n for n, _i, _a in parts])
+    # Sweep the sorted intervals of each set in turn, collecting the
+    # points where closed endpoints touch as candidate atoms.
+    intervals = parts[0][1]
+    atoms = [v for _n, _i, a in parts if a is not EmptySet for v in a.values]
+    for (_n, i, _a) in parts[1:]:
+        (intervals, points) = intersect_intervals(intervals, i)
+        atoms.extend(points)
+    # Keep the candidate atoms in the real part of every set.
+    for x in args:
+        if not atoms:
+            break
+        reals = x.reals if isinstance(x, Union) else x
+        atoms = FiniteReal(*atoms).select(reals)
+    return make_set(nominals, *union_intervals_atoms(intervals, atoms))
 
 EmptySet = EmptySetC(force=1)
 Reals = Interval(-inf, inf)
@@ -3,29 +3,43 @@
 
 from collections import ChainMap
 from collections import Counter
-from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from fractions import Fraction
+from functools import cached_property
 from functools import reduce
 from inspect import getfullargspec
 from itertools import chain
 from math import exp
 from math import log
 
+import numpy
+
+from .deadline import check_deadline
+from .deadline import deadline_scope
+
+from .diagram import TRUE
+from .diagram import compile_diagram
+
+from .dnf import dnf_count_clauses
 from .dnf import dnf_factor
 from .dnf import dnf_normalize
 from .dnf import dnf_to_disjoint_union
 
+from .kernels import get_kernel
+
 from .math_util import allclose
-from .math_util import flip
 from .math_util import float_to_int
 from .math_util import int_or_isinf_neg
 from .math_util import int_or_isinf_pos
 from .math_util import isinf_neg
 from .math_util import logdiffexp
-from .math_util import logflip
+from .math_util import logdiffexp_array
 from .math_util import lognorm
+from .math_util import make_alias_table
 from .math_util import logsumexp
 from .math_util import random
+from .math_util import sample_alias_table
+from .math_util import wilson_interval
 
 from .sym_util import are_disjoint
 from .sym_util import are_identical
@@ -36,6 +50,8 @@ from .sym_util import sympify_number
 
 from .transforms import EventOr
 from .transforms import Id
+from .transforms import make_environment
+from .transforms import make_event_template
 
 from .sets import EmptySet
 from .sets import FiniteNominal
@@ -43,13 +59,19 @@ from .sets import FiniteReal
 from .sets import Interval
 from .sets import Range
 from .sets import Union
+from .sets import Vocabulary
+from .sets import get_set_parts
 
 inf = float('inf')
 
+# Events whose DNF has more clauses are compiled to decision diagrams.
+DNF_CLAUSES_MAX = 64
+
 def memoize(f):
     table = f.__name__.split('_')[0]
     def f_(*args):
         (spe, event_factor, memo) = args
+        check_deadline()
         if memo is False:
             return f(spe, event_factor_to_event, memo)
         m = getattr(memo, table)
@@ -59,6 +81,16 @@ def memoize(f):
         return m[key]
     return f_
 
+def with_deadline(f):
+    # Run a query under a Deadline (or number of seconds), which is checked
+    # cooperatively during the traversal and in the solvers.
+    def f_(spe, x, memo=None, deadline=None):
+        if deadline is None:
+            return f(spe, x, memo)
+        with deadline_scope(deadline):
+            return f(spe, x, memo)
+    return f_
+
 # ==============================================================================
 # SPE (base class).
 
@@ -68,22 +100,45 @@ class SPE():
         raise NotImplementedError()
     def size(self):
         raise NotImplementedError
-    def sample(self, N, prng=None):
+    def sample(self, N, prng=None, workers=None):
+        return spe_sample_workers(self, N, prng, workers)
+    def sample_block(self, N, prng):
         raise NotImplementedError()
     def sample_subset(self, symbols, N, prng=None):
         raise NotImplementedError()
     def sample_func(self, func, N, prng=None):
         raise NotImplementedError()
+    def sample_columns(self, N, symbols=None, prng=None):
+        if symbols is None:
+            symbols = self.get_symbols()
+        columns = self.sample_subset_columns(symbols, N, prng=prng)
+        return encode_columns(columns, spe_nominal_labels(self))
+    def sample_iter(self, N, chunk_size, prng=None, symbols=None):
+        # Yield N samples as SampleColumns with at most chunk_size rows,
+        # which share one label table for the nominal symbols.
+        if symbols is None:
+            symbols = self.get_symbols()
+        labels = spe_nominal_labels(self)
+        prng = random(prng)
+        for start in range(0, N, chunk_size):
+            n = min(chunk_size, N - start)
+            columns = self.sample_subset_columns(symbols, n, prng=prng)
+            yield encode_columns(columns, labels)
+    def sample_subset_columns(self, symbols, N, prng=None):
+        raise NotImplementedError()
     def transform(self, symbol, expr):
         raise NotImplementedError()
-    def logprob(self, event, memo=None):
+    def logprob(self, event, memo=None, deadline=None):
         raise NotImplementedError()
-    def condition(self, event, memo=None):
+    def condition(self, event, memo=None, deadline=None):
         raise NotImplementedError()
     def logpdf(self, assignment, memo=None):
         raise NotImplementedError()
-    def constrain(self, assignment, memo=None):
+    def constrain(self, assignment, memo=None, deadline=None):
         raise NotImplementedError()
+    def compile(self, kind='logpdf', symbols=None):
+        from .compilers.spe_to_numpy import compile_numpy
+        return compile_numpy(self, kind, symbols)
     def mutual_information(self, A, B, memo=None):
         if memo is None:
             memo = Memo()
@@ -104,9 +159,40 @@ class SPE():
     def prob(self, event):
         lp = self.logprob(event)
         return exp(lp)
+    def estimate_prob(self, event, N, confidence=.95, prng=None):
+        # Monte Carlo estimate of prob(event) with a Wilson interval.
+        if N <= 0:
+            raise ValueError('Number of samples must be positive: %s' % (N,))
+        columns = self.sample_subset_columns(event.get_symbols(), N, prng=prng)
+        k = int(numpy.count_nonzero(event.evaluate_array(columns)))
+        return (k / N, wilson_interval(k, N, confidence))
     def pdf(self, assignment):
         lp = self.logpdf(assignment)
         return exp(lp)
+    def logprob_template(self, func, ts, memo=None):
+        # Return [logprob(func(t)) for t in ts], solving func only once
+        # when func(t) is a comparison such as X < t, X >= t, etc.
+        ts = numpy.asarray(ts, dtype=float)
+        template = make_event_template(func)
+        if template is None:
+            if memo is None:
+                memo = Memo()
+            logps = [self.logprob(func(t), memo) for t in ts.tolist()]
+            return numpy.asarray(logps, dtype=float)
+        return self.logprob_template_mem(template, ts, {})
+    def logprob_template_mem(self, template, ts, memo):
+        raise NotImplementedError()
+    def cdf(self, symbol, ts):
+        lps = self.logprob_template(lambda t: symbol <= t, ts)
+        return numpy.exp(lps)
+    def pdf_grid(self, symbol, xs):
+        logpdf = self.compile('logpdf', [symbol])
+        return numpy.exp(logpdf(xs))
+    def pdf_grid2d(self, symbol_x, symbol_y, xs, ys):
+        # Entry [i, j] is the density at {symbol_x: xs[i], symbol_y: ys[j]}.
+        logpdf = self.compile('logpdf', [symbol_x, symbol_y])
+        (grid_x, grid_y) = numpy.meshgrid(xs, ys, indexing='ij')
+        return numpy.exp(logpdf(grid_x, grid_y))
 
     def __rmul__number(self, x):
         x_val = sympify_number(x)
@@ -156,17 +242,29 @@ class BranchSPE(SPE):
         return self.symbols
     def size(self):
         return 1 + sum(c.size() for c in self.children)
+    @with_deadline
     def logprob(self, event, memo=None):
         if memo is None:
             memo = Memo()
+        if dnf_count_clauses(event) > DNF_CLAUSES_MAX:
+            key = (id(self), event)
+            if key not in memo.logprob:
+                memo.logprob[key] = self.logprob_diagram(event, memo)
+            return memo.logprob[key]
         event_dnf = dnf_normalize(event)
         if event_dnf is None:
             return -inf
         event_factor = dnf_factor(event_dnf)
         return self.logprob_mem(event_factor, memo)
+    @with_deadline
     def condition(self, event, memo=None):
         if memo is None:
             memo = Memo()
+        if dnf_count_clauses(event) > DNF_CLAUSES_MAX:
+            key = (id(self), event)
+            if key not in memo.condition:
+                memo.condition[key] = self.condition_diagram(event, memo)
+            return memo.condition[key]
         event_dnf = dnf_normalize(event)
         if event_dnf is None:
             raise ValueError('Zero probability event: %s' % (event,))
@@ -184,6 +282,7 @@ class BranchSPE(SPE):
         if memo is None:
             memo = Memo()
         return self.logpdf_mem(assignment, memo)[1]
+    @with_deadline
     def constrain(self, assignment, memo=None):
         if memo is None:
             memo = Memo()
@@ -192,6 +291,10 @@ class BranchSPE(SPE):
         raise NotImplementedError()
     def condition_mem(self, event_factor, memo):
         raise NotImplementedError()
+    def logprob_diagram(self, event, memo):
+        raise NotImplementedError()
+    def condition_diagram(self, event, memo):
+        raise NotImplementedError()
     def logpdf_mem(self, assignment, memo):
         raise NotImplementedError()
     def constrain_mem(self, assignment, memo):
@@ -218,6 +321,7 @@ class SumSPE(BranchSPE):
         # Derived attributes.
         self.indexes = tuple(range(len(self.weights)))
         assert allclose(float(logsumexp(weights)),  0)
+        self.alias_table = None
 
         symbols = [spe.get_symbols() for spe in self.children]
         if not are_identical(symbols):
@@ -225,8 +329,8 @@ class SumSPE(BranchSPE):
             raise ValueError('Mixture must have identical symbols:\n%s' % (syms,))
         self.symbols = self.children[0].get_symbols()
 
-    def sample(self, N, prng=None):
-        f_sample = lambda i, n: self.children[i].sample(n, prng=prng)
+    def sample_block(self, N, prng):
+        f_sample = lambda i, n: self.children[i].sample_block(n, prng)
         return self.sample_many(f_sample, N, prng=prng)
 
     def sample_subset(self, symbols, N, prng=None):
@@ -239,12 +343,31 @@ class SumSPE(BranchSPE):
         return self.sample_many(f_sample, N, prng=prng)
 
     def sample_many(self, func, N, prng=None):
-        selections = logflip(self.weights, self.indexes, N, prng)
+        selections = self.sample_selections(N, prng)
         counts = Counter(selections)
         samples = [func(i, counts[i]) for i in counts]
         random(prng).shuffle(samples)
         return list(chain.from_iterable(samples))
 
+    def sample_selections(self, N, prng=None):
+        # The alias table is built once and reused across calls.
+        if self.alias_table is None:
+            self.alias_table = make_alias_table(numpy.exp(lognorm(self.weights)))
+        return sample_alias_table(self.alias_table, N, prng)
+
+    def sample_subset_columns(self, symbols, N, prng=None):
+        # Scatter the samples of each child into the rows that selected it.
+        selections = self.sample_selections(N, prng)
+        counts = numpy.bincount(selections, minlength=len(self.indexes))
+        order = numpy.argsort(selections, kind='stable')
+        rows = numpy.split(order, numpy.cumsum(counts)[:-1])
+        samples = [
+            (rows[i], self.children[i].sample_subset_columns(
+                symbols, counts[i], prng=prng))
+            for i in self.indexes if counts[i]
+        ]
+        return scatter_columns(samples, symbols, N)
+
     def transform(self, symbol, expr):
         children = [spe.transform(symbol, expr) for spe in self.children]
         return SumSPE(children, self.weights)
@@ -255,6 +378,15 @@ class SumSPE(BranchSPE):
         logp = logsumexp([p + w for (p, w) in zip(logps, self.weights)])
         return logp
 
+    def logprob_template_mem(self, template, ts, memo):
+        if id(self) not in memo:
+            logps = [spe.logprob_template_mem(template, ts, memo)
+                for spe in self.children]
+            weights = numpy.reshape(self.weights, (-1,) + (1,)*ts.ndim)
+            with numpy.errstate(divide='ignore'):
+                memo[id(self)] = logsumexp(logps + weights, axis=0)
+        return memo[id(self)]
+
     @memoize
     def condition_mem(self, event_factor, memo):
         logps_condt = [spe.logprob_mem(event_factor, memo) for spe in self.children]
@@ -266,6 +398,20 @@ class SumSPE(BranchSPE):
         weights = lognorm(logps_joint)
         return SumSPE(children, weights) if len(indexes) > 1 else children[0]
 
+    def logprob_diagram(self, event, memo):
+        logps = [spe.logprob(event, memo) for spe in self.children]
+        return logsumexp([p + w for (p, w) in zip(logps, self.weights)])
+
+    def condition_diagram(self, event, memo):
+        logps_condt = [spe.logprob(event, memo) for spe in self.children]
+        indexes = [i for i, lp in enumerate(logps_condt) if not isinf_neg(lp)]
+        if not indexes:
+            raise ValueError('Conditioning event "%s" has probability zero' % (str(event),))
+        logps_joint = [logps_condt[i] + self.weights[i] for i in indexes]
+        children = [self.children[i].condition(event, memo) for i in indexes]
+        weights = lognorm(logps_joint)
+        return SumSPE(children, weights) if len(indexes) > 1 else children[0]
+
     @memoize
     def logpdf_mem(self, assignment, memo):
         logps = [spe.logpdf_mem(assignment, memo) for spe in self.children]
@@ -434,18 +580,12 @@ class ProductSPE(BranchSPE):
         self.lookup = {s:i for i, syms in enumerate(symbols) for s in syms}
         self.symbols = frozenset(get_union(symbols))
 
-    def sample(self, N, prng=None):
-        samples = [spe.sample(N, prng=prng) for spe in self.children]
+    def sample_block(self, N, prng):
+        samples = [spe.sample_block(N, prng) for spe in self.children]
         return merge_samples(samples)
 
     def sample_subset(self, symbols, N, prng=None):
-        # Partition symbols by lookup.
-        index_to_symbols = {}
-        for symbol in symbols:
-            key = self.lookup[symbol]
-            if key not in index_to_symbols:
-                index_to_symbols[key] = []
-            index_to_symbols[key].append(symbol)
+        index_to_symbols = self.partition_symbols(symbols)
         # Obtain the samples.
         samples = [
             self.children[i].sample_subset(symbols_i, N, prng=prng)
@@ -454,6 +594,24 @@ class ProductSPE(BranchSPE):
         # Merge the samples.
         return merge_samples(samples)
 
+    def sample_subset_columns(self, symbols, N, prng=None):
+        index_to_symbols = self.partition_symbols(symbols)
+        columns = {}
+        for i, symbols_i in index_to_symbols.items():
+            columns.update(
+                self.children[i].sample_subset_columns(symbols_i, N, prng=prng))
+        return columns
+
+    def partition_symbols(self, symbols):
+        # Partition symbols by lookup.
+        index_to_symbols = {}
+        for symbol in symbols:
+            key = self.lookup[symbol]
+            if key not in index_to_symbols:
+                index_to_symbols[key] = []
+            index_to_symbols[key].append(symbol)
+        return index_to_symbols
+
     def sample_func(self, func, N, prng=None):
         symbols = func_symbols(self, func)
         samples = self.sample_subset(symbols, N, prng=prng)
@@ -508,6 +666,11 @@ class ProductSPE(BranchSPE):
         logp_neg = logsumexp(logps_neg) if logps_neg else -inf
         return logdiffexp(logp_pos, logp_neg)
 
+    def logprob_template_mem(self, template, ts, memo):
+        [symbol] = template.get_symbols()
+        spe = self.children[self.lookup[symbol]]
+        return spe.logprob_template_mem(template, ts, memo)
+
     @memoize
     def condition_mem(self, event_factor, memo):
         logps = [self.logprob_conjunction([c], [0], memo) for c in event_factor]
@@ -548,6 +711,58 @@ class ProductSPE(BranchSPE):
             return -inf
         return self.children[key].logprob_mem((clause,), memo)
 
+    def get_diagram(self, event, memo):
+        # Return the diagram of the event and the log probabilities of its
+        # nodes, which condition_diagram reuses from logprob_diagram.
+        key = (id(self), event)
+        if key not in memo.diagram:
+            factors = [spe.get_symbols() for spe in self.children]
+            diagram = compile_diagram(event, factors)
+            logprob_factor = lambda k, e: self.children[k].logprob(e, memo)
+            memo.diagram[key] = (diagram, diagram.logprobs(logprob_factor))
+        return memo.diagram[key]
+
+    def logprob_diagram(self, event, memo):
+        (diagram, logps) = self.get_diagram(event, memo)
+        return logps[diagram.root]
+
+    def condition_diagram(self, event, memo):
+        # Mixture over the edges of each node of the diagram, whose children
+        # are shared by all the paths that reach the same node.
+        (diagram, logps) = self.get_diagram(event, memo)
+        logprob_factor = lambda k, e: self.children[k].logprob(e, memo)
+        if isinf_neg(logps[diagram.root]):
+            raise ValueError('Conditioning event "%s" has probability zero'
+                % (str(event),))
+        cache = {}
+        def condition_node(node, start):
+            # Conditioned SPEs of the children from index start onward.
+            if (node, start) not in cache:
+                if node == TRUE:
+                    (level, spes) = (len(self.children), [])
+                else:
+                    (level, edges) = diagram.nodes[node]
+                    spe = self.children[level]
+                    (branches, weights) = ([], [])
+                    for e, target in edges:
+                        # The targets of zero probability edges are never
+                        # visited by logprobs.
+                        logp = logprob_factor(level, e)
+                        if isinf_neg(logp):
+                            continue
+                        logp += logps[target]
+                        if isinf_neg(logp):
+                            continue
+                        rest = condition_node(target, level + 1)
+                        branches.append(
+                            spe_list_to_product([spe.condition(e, memo)] + rest))
+                        weights.append(logp)
+                    spes = [SumSPE(branches, lognorm(weights))
+                        if len(branches) > 1 else branches[0]]
+                cache[(node, start)] = list(self.children[start:level]) + spes
+            return cache[(node, start)]
+        return spe_list_to_product(condition_node(diagram.root, 0))
+
     def condition_clause(self, clause, memo):
         # Return children conditioned on a clause (one conjunction).
         children = []
@@ -603,28 +818,36 @@ class LeafSPE(SPE):
         return frozenset(self.env)
     def size(self):
         return 1
-    def sample(self, N, prng=None):
+    def sample_block(self, N, prng):
         return self.sample_subset(self.get_symbols(), N, prng=prng)
     def sample_subset(self, symbols, N, prng=None):
         assert all(s in self.get_symbols() for s in symbols)
-        samples = self.sample__(N, prng)
         if symbols == {self.symbol}:
-            return samples
-        simulations = [{}] * N
-        for i, sample in enumerate(samples):
-            simulations[i] = dict()
-            # Topological order guaranteed by OrderedDict.
-            for symbol in self.env:
-                sample[symbol] = self.env[symbol].evaluate(sample)
-                if symbol in symbols:
-                    simulations[i][symbol] = sample[symbol]
-        return simulations
+            return self.sample__(N, prng)
+        xs = self.sample_array__(N, prng)
+        columns = self.evaluate_columns(xs, symbols)
+        rows = zip(*[columns[symbol].tolist() for symbol in columns])
+        return [dict(zip(columns, row)) for row in rows] if columns \
+            else [{} for _i in range(N)]
     def sample_func(self, func, N, prng=None):
-        samples = self.sample(N, prng=prng)
+        samples = self.sample_block(N, prng)
         return func_evaluate(self, func, samples)
+    def sample_subset_columns(self, symbols, N, prng=None):
+        assert all(s in self.get_symbols() for s in symbols)
+        xs = self.sample_array__(N, prng)
+        return self.evaluate_columns(xs, symbols)
+    def evaluate_columns(self, xs, symbols):
+        columns = {self.symbol: xs}
+        if any(symbol != self.symbol for symbol in symbols):
+            # Topological order guaranteed by Environment.
+            for symbol in self.env:
+                if symbol != self.symbol:
+                    columns[symbol] = self.env[symbol].evaluate_array(columns)
+        return {symbol: columns[symbol] for symbol in symbols}
+    @with_deadline
     def logprob(self, event, memo=None):
-        event_subs = event.substitute(self.env)
-        assert all(s in self.env for s in event.get_symbols())
+        check_deadline()
+        event_subs = self.env.substitute(event)
         assert event_subs.get_symbols() == {self.symbol}
         if memo is None or memo is False:
             return self.logprob__(event_subs)
@@ -632,9 +855,10 @@ class LeafSPE(SPE):
         if key not in memo.logprob:
             memo.logprob[key] = self.logprob__(event_subs)
         return memo.logprob[key]
+    @with_deadline
     def condition(self, event, memo=None):
-        event_subs = event.substitute(self.env)
-        assert all(s in self.env for s in event.get_symbols())
+        check_deadline()
+        event_subs = self.env.substitute(event)
         assert event_subs.get_symbols() == {self.symbol}
         if memo is None or memo is False:
             return self.condition__(event_subs)
@@ -646,10 +870,21 @@ class LeafSPE(SPE):
         if memo is None:
             memo = Memo()
         return self.logpdf_mem(assignment, memo)[1]
+    @with_deadline
     def constrain(self, assignment, memo=None):
         if memo is None:
             memo = Memo()
         return self.constrain_mem(assignment, memo)
+    def logprob_template_mem(self, template, ts, memo):
+        if id(self) not in memo:
+            template_subs = self.env.substitute(template)
+            if template_subs.subexpr == self.symbol:
+                logps = self.logprob_template__(template_subs, ts)
+            else:
+                logps = [self.logprob(template.instantiate(t))
+                    for t in ts.tolist()]
+            memo[id(self)] = numpy.asarray(logps, dtype=float)
+        return memo[id(self)]
     def logprob_mem(self, event_factor, memo):
         if memo is False:
             event = event_factor_to_event(event_factor)
@@ -677,14 +912,20 @@ class LeafSPE(SPE):
         return (1 - self.atomic, w)
     @memoize
     def constrain_mem(self, assignment, memo):
+        check_deadline()
         assert len(assignment) == 1
         [(k, v)] = assignment.items()
         assert k == self.symbol
         return self.constrain__(v)
     def sample__(self, N, prng):
+        xs = self.sample_array__(N, prng)
+        return [{self.symbol : x} for x in xs]
+    def sample_array__(self, N, prng):
         raise NotImplementedError()
     def logprob__(self, event):
         raise NotImplementedError()
+    def logprob_template__(self, template, ts):
+        raise NotImplementedError()
     def condition__(self, event):
         raise NotImplementedError()
     def logpdf__(self, x):
@@ -702,28 +943,39 @@ class RealLeaf(LeafSPE):
         assert isinstance(symbol, Id)
         assert isinstance(support, Interval)
         self.symbol = symbol
-        self.dist = dist
+        self.kernel = get_kernel(dist)
+        self.dist = self.kernel.dist
         self.support = support
         self.conditioned = conditioned
-        self.env = env or OrderedDict([(symbol, symbol)])
+        self.env = make_environment(symbol, env)
         # Attributes to be populated by child classes.
         self.xl = None
         self.xu = None
-        self.Fl = None
-        self.Fu = None
-        self.logFl = None
-        self.logFu = None
-        self.logZ = None
+        self.xl_cdf = None      # Largest point below the support.
+
+    # The normalizers of a conditioned leaf are computed on first use.
+    @cached_property
+    def Fl(self):
+        return self.kernel.cdf(self.xl_cdf) if self.conditioned else 0
+    @cached_property
+    def Fu(self):
+        return self.kernel.cdf(self.xu) if self.conditioned else 1
+    @cached_property
+    def logFl(self):
+        return self.kernel.logcdf(self.xl_cdf) if self.conditioned else -inf
+    @cached_property
+    def logFu(self):
+        return self.kernel.logcdf(self.xu) if self.conditioned else 0
+    @cached_property
+    def logZ(self):
+        return logdiffexp(self.logFu, self.logFl) if self.conditioned else 1
 
     def transform(self, symbol, expr):
-        assert symbol not in self.env
-        assert all(s in self.env for s in expr.get_symbols())
-        env = OrderedDict(self.env)
-        env[symbol] = expr
+        env = self.env.extend(symbol, expr)
         return (type(self))(self.symbol, self.dist, self.support,
             self.conditioned, env)
 
-    def sample__(self, N, prng):
+    def sample_array__(self, N, prng):
         if self.conditioned:
             # XXX Method not guaranteed to be numerically stable, see e.g,.
             # https://www.iro.umontreal.ca/~lecuyer/myftp/papers/truncated-normal-book-chapter.pdf
@@ -734,25 +986,42 @@ class RealLeaf(LeafSPE):
             xs = self.dist.ppf(u_interval)
         else:
             # Simulation by vanilla inversion sampling.
-            xs = self.dist.rvs(size=N, random_state=prng)
-        # Wrap result in a dictionary.
-        return [{self.symbol : x} for x in xs]
+            xs = self.dist.rvs(size=N, random_state=random(prng))
+        return xs
 
     def logcdf(self, x):
         if not self.conditioned:
-            return self.dist.logcdf(x)
+            return self.kernel.logcdf(x)
+        if numpy.ndim(x) > 0:
+            return self.logcdf_array(numpy.asarray(x, dtype=float))
         if self.xu < x:
             return 0
         elif x < self.xl:
             return -inf
-        p = logdiffexp(self.dist.logcdf(x), self.logFl)
+        p = logdiffexp(self.kernel.logcdf(x), self.logFl)
         return p - self.logZ
 
+    def logcdf_array(self, xs):
+        inside = (self.xl <= xs) & (xs <= self.xu)
+        logps = numpy.full(xs.shape, -inf)
+        logps[self.xu < xs] = 0
+        logps[inside] = logdiffexp_array(
+            self.kernel.logcdf(xs[inside]), self.logFl) - self.logZ
+        return logps
+
     def logprob__(self, event):
         interval = event.solve()
         values = self.support & interval
         return self.logprob_values__(values)
 
+    def logprob_template__(self, template, ts):
+        # Write each comparison in terms of X <= t or X < t, where
+        # X < t is X <= ceil(t) - 1 for integral distributions.
+        closed = template.upper != template.strict
+        xs = ts if (closed or not self.atomic) else numpy.ceil(ts) - 1
+        logps = self.logcdf(xs)
+        return logps if template.upper else logdiffexp_array(0, logps)
+
     def logprob_values__(self, values):
         if values is EmptySet:
             return -inf
@@ -768,6 +1037,17 @@ class RealLeaf(LeafSPE):
     def logprob_finite__(self, values):
         raise NotImplementedError()
     def logprob_interval__(self, values):
+        (xl, xu) = self.interval_to_cdf_points(values)
+        logFl = self.logcdf(xl)
+        logFu = self.logcdf(xu)
+        return logdiffexp(logFu, logFl)
+    def logprob_intervals__(self, intervals):
+        # Batched logprob_interval__ using one logcdf over all endpoints.
+        points = [self.interval_to_cdf_points(v) for v in intervals]
+        xs = numpy.asarray(points, dtype=float)
+        logps = self.logcdf(xs.ravel()).reshape(xs.shape)
+        return logdiffexp_array(logps[:,1], logps[:,0])
+    def interval_to_cdf_points(self, values):
         raise NotImplementedError()
 
     def flatten_values_contiguous(self, values):
@@ -800,7 +1080,7 @@ class RealLeaf(LeafSPE):
             return (type(self))(self.symbol, self.dist, values[0], True, self.env)
         # Condition on a union of contiguous set.
         else:
-            weights_unorm = [self.logprob_values__(v) for v in values]
+            weights_unorm = self.logprob_intervals__(values)
             indexes = [i for i, w in enumerate(weights_unorm) if not isinf_neg(w)]
             if not indexes:
                 raise ValueError('Conditioning event "%s" has probability zero'
@@ -821,16 +1101,14 @@ class RealLeaf(LeafSPE):
         return AtomicLeaf(self.symbol, x)
 
     def __hash__(self):
-        d = (self.dist.dist.name, self.dist.args, tuple(self.dist.kwds.items()))
+        d = self.kernel.descriptor
         e = tuple(self.env.items())
         x = (self.__class__, self.symbol, d, self.support, self.conditioned, e)
         return hash(x)
     def __eq__(self, x):
         return isinstance(x, type(self)) \
             and self.symbol == x.symbol \
-            and self.dist.dist.name == x.dist.dist.name \
-            and self.dist.args == x.dist.args \
-            and self.dist.kwds == x.dist.kwds \
+            and self.kernel.descriptor == x.kernel.descriptor \
             and self.support == x.support \
             and self.conditioned == x.conditioned \
             and self.env == x.env
@@ -845,38 +1123,23 @@ class ContinuousLeaf(RealLeaf):
         super().__init__(symbol, dist, support, conditioned, env)
         self.xl = float(support.left)
         self.xu = float(support.right)
-        if conditioned:
-            self.Fl = self.dist.cdf(self.xl)
-            self.Fu = self.dist.cdf(self.xu)
-            self.logFl = self.dist.logcdf(self.xl)
-            self.logFu = self.dist.logcdf(self.xu)
-            self.logZ = logdiffexp(self.logFu, self.logFl)
-        else:
-            self.logFl = -inf
-            self.logFu = 0
-            self.Fl = 0
-            self.Fu = 1
-            self.logZ = 1
+        self.xl_cdf = self.xl
 
     def logpdf__(self, x):
         if isinstance(x, str):
             return -float('inf')
         xf = float(x)
         if not self.conditioned:
-            return self.dist.logpdf(xf)
+            return self.kernel.logpdf(xf)
         if x not in self.support:
             return -inf
-        return self.dist.logpdf(xf) - self.logZ
+        return self.kernel.logpdf(xf) - self.logZ
 
     def logprob_finite__(self, values):
         return -inf
 
-    def logprob_interval__(self, values):
-        xl = float(values.left)
-        xu = float(values.right)
-        logFl = self.logcdf(xl)
-        logFu = self.logcdf(xu)
-        return logdiffexp(logFu, logFl)
+    def interval_to_cdf_points(self, values):
+        return (float(values.left), float(values.right))
 
 # ==============================================================================
 # Discrete RealLeaf.
@@ -890,40 +1153,35 @@ class DiscreteLeaf(RealLeaf):
         assert int_or_isinf_pos(support.right)
         self.xl = float_to_int(support.left) + 1*bool(support.left_open)
         self.xu = float_to_int(support.right) - 1*bool(support.right_open)
-        if conditioned:
-            self.Fl = self.dist.cdf(self.xl - 1)
-            self.Fu = self.dist.cdf(self.xu)
-            self.logFl = self.dist.logcdf(self.xl - 1)
-            self.logFu = self.dist.logcdf(self.xu)
-            self.logZ = logdiffexp(self.logFu, self.logFl)
-        else:
-            self.logFl = -inf
-            self.logFu = 0
-            self.Fl = 0
-            self.Fu = 1
-            self.logZ = 1
+        self.xl_cdf = self.xl - 1
 
     def logpdf__(self, x):
         if isinstance(x, str):
             return -float('inf')
         xf = float(x)
         if not self.conditioned:
-            return self.dist.logpmf(xf)
+            return self.kernel.logpmf(xf)
         if (x < self.xl) or (self.xu < x):
             return -inf
-        return self.dist.logpmf(xf) - self.logZ
+        return self.kernel.logpmf(xf) - self.logZ
+
+    def logpdf_array(self, xs):
+        logps = self.kernel.logpmf(xs)
+        if not self.conditioned:
+            return logps
+        inside = (self.xl <= xs) & (xs <= self.xu)
+        return numpy.where(inside, logps - self.logZ, -inf)
 
     def logprob_finite__(self, values):
-        logps = [self.logpdf__(x) for x in values]
+        xs = numpy.asarray([float(x) for x in values])
+        logps = self.logpdf_array(xs)
         return logps[0] if len(logps) == 1 else logsumexp(logps)
-    def logprob_interval__(self, values):
+    def interval_to_cdf_points(self, values):
         offsetl = not values.left_open and int_or_isinf_neg(values.left)
         offsetr = values.right_open and int_or_isinf_pos(values.right)
         xl = float_to_int(values.left) - offsetl
         xu = float_to_int(values.right) - offsetr
-        logFl = self.logcdf(xl)
-        logFu = self.logcdf(xu)
-        return logdiffexp(logFu, logFl)
+        return (xl, xu)
 
 # ==============================================================================
 # Atomic RealLeaf.
@@ -935,20 +1193,26 @@ class AtomicLeaf(LeafSPE):
         self.symbol = symbol
         self.support = FiniteReal(value)
         self.value = value
-        self.env = env or OrderedDict([(symbol, symbol)])
+        self.env = make_environment(symbol, env)
 
     def transform(self, symbol, expr):
-        assert symbol not in self.env
-        assert all(s in self.env for s in expr.get_symbols())
-        env = OrderedDict(self.env)
-        env[symbol] = expr
+        env = self.env.extend(symbol, expr)
         return AtomicLeaf(self.symbol, self.value, env=env)
 
     def sample__(self, N, prng):
         return [{self.symbol : self.value}] * N
+    def sample_array__(self, N, prng):
+        return numpy.full(N, self.value)
     def logprob__(self, event):
         interval = event.solve()
         return 0 if self.value in interval else -inf
+    def logprob_template__(self, template, ts):
+        x = float(self.value)
+        if template.upper:
+            mask = (x < ts) if template.strict else (x <= ts)
+        else:
+            mask = (x > ts) if template.strict else (x >= ts)
+        return numpy.where(mask, 0., -inf)
     def condition__(self, event):
         interval = event.solve()
         assert self.value in interval, 'Measure zero condition %s' % (event,)
@@ -974,10 +1238,12 @@ class NominalLeaf(LeafSPE):
         self.symbol = symbol
         self.dist = {x: Fraction(w) for x, w in dist.items()}
         # Derived attributes.
-        self.env = {symbol: symbol}
+        self.env = make_environment(symbol)
         self.support = FiniteNominal(*dist.keys())
         self.outcomes = list(self.dist.keys())
         self.weights = list(self.dist.values())
+        self.alias_table = None
+        self.outcomes_array = None
         assert allclose(float(sum(self.weights)),  1)
 
     def logpdf__(self, x):
@@ -989,10 +1255,11 @@ class NominalLeaf(LeafSPE):
     def transform(self, symbol, expr):
         raise ValueError('Cannot transform Nominal: %s %s' % (symbol, expr))
 
-    def sample__(self, N, prng):
-        # TODO: Replace with FLDR.
-        xs = flip(self.weights, self.outcomes, N, prng)
-        return [{self.symbol: x} for x in xs]
+    def sample_array__(self, N, prng):
+        if self.alias_table is None:
+            self.alias_table = make_alias_table(self.weights)
+            self.outcomes_array = numpy.asarray(self.outcomes)
+        return self.outcomes_array[sample_alias_table(self.alias_table, N, prng)]
 
     def logprob__(self, event):
         solution = event.solve()
@@ -1001,22 +1268,25 @@ class NominalLeaf(LeafSPE):
             return -inf
         if values == FiniteNominal(b=True):
             return 0
-        p_event = sum(self.dist[x] for x in values)
+        p_event = sum(self.dist[x] for x in values.values)
         return log(p_event) if p_event != 0 else -inf
 
+    def logprob_template__(self, template, ts):
+        return numpy.full(numpy.shape(ts), -inf)
+
     def condition__(self, event):
         solution = event.solve()
         values = self.support & solution
         if values is EmptySet:
             raise ValueError('Zero probability condition %s' % (event,))
-        p_event = sum([self.dist[x] for x in values])
+        p_event = sum([self.dist[x] for x in values.values])
         if p_event == 0:
             raise ValueError('Zero probability condition %s' % (event,))
         if p_event == 1:
             return self
         dist = {
             str(x) : (self.dist[x] / p_event) if x in values else 0
-            for x in self.support
+            for x in self.dist
         }
         return NominalLeaf(self.symbol, dist)
 
@@ -1032,6 +1302,99 @@ class NominalLeaf(LeafSPE):
             and self.symbol == x.symbol \
             and self.dist == x.dist
 
+class CategoricalLeaf(NominalLeaf):
+    """Nominal distribution over a shared category index with float64
+    log weights, for variables with many outcomes."""
+    def __init__(self, symbol, categories, logweights, vocabulary=None):
+        # NominalLeaf.__init__ is not called: the arrays are the source of
+        # truth, and the support and dist are built only on demand, so that
+        # condition and constrain run in vectorized time.
+        assert isinstance(symbol, Id)
+        assert len(categories) == len(logweights)
+        self.symbol = symbol
+        self.categories = tuple(categories)
+        self.logweights = numpy.asarray(logweights, dtype=float)
+        # The vocabulary interns the categories in order, so that the bit
+        # position of each category is its index in logweights.  It is
+        # shared by the leaves derived from this one rather than global,
+        # so that memory is released along with the model.
+        self.vocabulary = Vocabulary(self.categories) \
+            if vocabulary is None else vocabulary
+        # Derived attributes.
+        self.env = make_environment(symbol)
+        self.alias_table = None
+        self.outcomes_array = None
+        assert allclose(logsumexp(self.logweights), 0)
+
+    @cached_property
+    def support(self):
+        finite = numpy.isfinite(self.logweights)
+        return FiniteNominal(*(x for x, f in zip(self.categories, finite) if f))
+    @cached_property
+    def dist(self):
+        weights = numpy.exp(self.logweights).tolist()
+        return dict(zip(self.categories, weights))
+
+    def get_mask(self, values):
+        # Boolean mask of the categories that are in the given set.
+        (nominals, _intervals, _atoms) = get_set_parts(values)
+        mask = numpy.zeros(len(self.categories), dtype=bool)
+        if nominals is EmptySet:
+            return mask
+        if nominals.vocabulary is self.vocabulary:
+            # Binary digits of the bits, least significant first.
+            digits = bin(nominals.bits)[:1:-1][:len(mask)].encode()
+            mask[:len(digits)] = numpy.frombuffer(digits, dtype='S1') == b'1'
+        else:
+            index = self.vocabulary.index
+            mask[[index[x] for x in nominals.values if x in index]] = True
+        return ~mask if nominals.b else mask
+
+    def logpdf__(self, x):
+        i = self.vocabulary.index.get(x)
+        return -inf if i is None else float(self.logweights[i])
+
+    def sample_array__(self, N, prng):
+        if self.alias_table is None:
+            self.alias_table = make_alias_table(numpy.exp(self.logweights))
+            self.outcomes_array = numpy.asarray(self.categories)
+        return self.outcomes_array[sample_alias_table(self.alias_table, N, prng)]
+
+    def logprob__(self, event):
+        mask = self.get_mask(event.solve())
+        if not numpy.any(mask):
+            return -inf
+        return float(logsumexp(self.logweights[mask]))
+
+    def condition__(self, event):
+        mask = self.get_mask(event.solve())
+        logp_event = logsumexp(self.logweights[mask]) \
+            if numpy.any(mask) else -inf
+        if isinf_neg(logp_event):
+            raise ValueError('Zero probability condition %s' % (event,))
+        if numpy.all(numpy.isneginf(self.logweights[~mask])):
+            return self
+        logweights = numpy.where(mask, self.logweights - logp_event, -inf)
+        return CategoricalLeaf(self.symbol, self.categories, logweights,
+            self.vocabulary)
+
+    def constrain__(self, x):
+        assert not isinf_neg(self.logpdf__(x))
+        logweights = numpy.full(len(self.categories), -inf)
+        logweights[self.vocabulary.index[x]] = 0
+        return CategoricalLeaf(self.symbol, self.categories, logweights,
+            self.vocabulary)
+
+    def __hash__(self):
+        x = (self.__class__, self.symbol, self.categories,
+            self.logweights.tobytes())
+        return hash(x)
+    def __eq__(self, x):
+        return isinstance(x, type(self)) \
+            and self.symbol == x.symbol \
+            and self.categories == x.categories \
+            and numpy.array_equal(self.logweights, x.logweights)
+
 # ==============================================================================
 # Utilities.
 
@@ -1041,6 +1404,7 @@ class Memo():
         self.condition = {}
         self.logpdf = {}
         self.constrain = {}
+        self.diagram = {}
 
 def spe_cache_duplicate_subtrees(spe, memo):
     if isinstance(spe, LeafSPE):
@@ -1071,11 +1435,80 @@ def func_symbols(spe, func):
             % (unknown, symbols))
     return args
 
+SAMPLE_BLOCK_SIZE = 2**14
+
+def spe_sample_workers(spe, N, prng, workers):
+    # Samples are drawn in fixed-size blocks, each from an independent
+    # stream spawned from one seed, so the output depends only on prng
+    # and not on the number of workers (or whether there are any).  The
+    # one Generator of each block is passed down the whole traversal.
+    entropy = int.from_bytes(random(prng).bytes(16), 'little')
+    sizes = [min(SAMPLE_BLOCK_SIZE, N - i)
+        for i in range(0, N, SAMPLE_BLOCK_SIZE)]
+    seeds = numpy.random.SeedSequence(entropy).spawn(len(sizes))
+    args = [(spe, n, seed) for n, seed in zip(sizes, seeds)]
+    if workers is None or workers == 1 or len(args) < 2:
+        blocks = [spe_sample_block(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            blocks = list(executor.map(spe_sample_block, *zip(*args)))
+    return list(chain.from_iterable(blocks))
+
+def spe_sample_block(spe, N, seed):
+    return spe.sample_block(N, numpy.random.default_rng(seed))
+
 def merge_samples(samples):
     # input [[{X:1, Y:2}, {X:0, Y:1}], [{Z:0}, {Z:1}]] (N=2)
     # output [{X:1, Y:2, Z:0}, {X:0, Y:1, Z:1}]
     return [dict(ChainMap(*sample_list)) for sample_list in zip(*samples)]
 
+class SampleColumns(dict):
+    """Dictionary mapping each symbol to a column of samples."""
+    def __init__(self, columns, labels):
+        # Nominal columns contain integer codes into the label table.
+        super().__init__(columns)
+        self.labels = labels
+    def decode(self, symbol):
+        if symbol not in self.labels:
+            return self[symbol]
+        return numpy.asarray(self.labels[symbol], dtype=object)[self[symbol]]
+
+def scatter_columns(samples, symbols, N):
+    # input [(rows_1, {X: xs_1, Y: ys_1}), (rows_2, {X: xs_2, Y: ys_2})]
+    # output {X: xs, Y: ys} where xs[rows_i] = xs_i and ys[rows_i] = ys_i
+    if not samples:
+        return {symbol: numpy.empty(N) for symbol in symbols}
+    columns = {}
+    for symbol in symbols:
+        dtype = numpy.result_type(*[c[symbol] for _rows, c in samples])
+        columns[symbol] = numpy.empty(N, dtype=dtype)
+        for rows, c in samples:
+            columns[symbol][rows] = c[symbol]
+    return columns
+
+def encode_columns(columns, labels_all):
+    labels = {s: labels_all[s] for s in columns if s in labels_all}
+    codes = {
+        symbol: numpy.searchsorted(labels[symbol], column)
+            if symbol in labels else column
+        for symbol, column in columns.items()
+    }
+    return SampleColumns(codes, labels)
+
+def spe_nominal_labels(spe):
+    # Return dictionary mapping each nominal symbol to its sorted outcomes.
+    if isinstance(spe, NominalLeaf):
+        return {spe.symbol: tuple(spe.support)}
+    if isinstance(spe, LeafSPE):
+        return {}
+    labels = [spe_nominal_labels(c) for c in spe.children]
+    symbols = set(chain.from_iterable(labels))
+    return {
+        symbol: tuple(sorted(set(chain.from_iterable(
+            l[symbol] for l in labels if symbol in l))))
+        for symbol in symbols
+    }
+
 def event_factor_to_event(event_factor):
     conjunctions = (
         reduce(lambda x, e: x & e, conjunction.values())
@@ -4,17 +4,22 @@
 from collections import OrderedDict
 from itertools import chain
 from itertools import combinations
+from fractions import Fraction
+from math import e
 from math import isinf
+from math import log
+from math import pi
+from math import sqrt
 
 import numpy
-import sympy
 
-from sympy.core.relational import Relational
+from .math_util import is_exact
 
 from .sets import FiniteReal
 from .sets import Interval
 
 def get_symbols(expr):
+    import sympy
     atoms = expr.atoms()
     return [a for a in atoms if isinstance(a, sympy.Symbol)]
 
@@ -55,18 +60,14 @@ def partition_finite_real_contiguous(x):
     # Convert FiniteReal to list of FiniteReal, each with contiguous values.
     assert isinstance(x, FiniteReal)
     values = sorted(x.values)
-    blocks = [[values[0]]]
-    for y in values[1:]:
-        expected = blocks[-1][-1] + 1
-        if y == expected:
-            blocks[-1].append(y)
-        else:
-            blocks.append([y])
-    return [FiniteReal(*v) for v in blocks]
+    gaps = numpy.diff(numpy.asarray(values, dtype=float)) != 1
+    bounds = [0] + list(numpy.flatnonzero(gaps) + 1) + [len(values)]
+    return [FiniteReal(*values[i:j]) for i, j in zip(bounds, bounds[1:])]
 
 def sympify_number(x):
     if isinstance(x, (int, float)):
         return x
+    import sympy
     msg = 'Expected a numeric term, not %s' % (x,)
     try:
         # String fallback in sympify has been deprecated since SymPy 1.6. Use
@@ -81,6 +82,7 @@ def sympify_number(x):
         raise TypeError(msg)
 
 def sym_log(x):
+    import sympy
     assert 0 <= x
     if x == 0:
         return -float('inf')
@@ -88,8 +90,50 @@ def sym_log(x):
         return float('inf')
     return sympy.log(x)
 
+# Constants and functions that return sympy numbers in exact mode and
+# float64 otherwise.
+
+def sym_pi():
+    if is_exact():
+        import sympy
+        return sympy.pi
+    return pi
+
+def sym_sqrt(x):
+    if is_exact():
+        import sympy
+        return sympy.sqrt(x)
+    return sqrt(x)
+
+def sym_pow(x, y):
+    if is_exact():
+        import sympy
+        return sympy.Pow(x, y)
+    # Prefer the correctly rounded special cases to numpy.power.
+    x = numpy.float64(x)
+    with numpy.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        if x == e:
+            result = numpy.exp(float(y))
+        elif y == -1:
+            result = 1 / x
+        elif y == Fraction(1, 2):
+            result = numpy.sqrt(x)
+        elif y == Fraction(1, 3) and x >= 0:
+            result = numpy.cbrt(x)
+        else:
+            result = numpy.power(x, float(y))
+    return float(result)
+
+def sym_logb(x, base):
+    if is_exact():
+        import sympy
+        return sympy.log(x, base)
+    return log(float(x), float(base))
+
 def sympy_solver(expr):
     # Sympy is buggy and slow.  Use Transforms.
+    import sympy
+    from sympy.core.relational import Relational
     symbols = get_symbols(expr)
     if len(symbols) != 1:
         raise ValueError('Expression "%s" needs exactly one symbol.' % (expr,))
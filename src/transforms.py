@@ -1,25 +1,25 @@
 # Copyright 2020 MIT Probabilistic Computing Project.
 # See LICENSE.txt
 
+from collections import OrderedDict
+from collections import namedtuple
 from collections.abc import Callable
+from collections.abc import Mapping
+from fractions import Fraction
+from functools import cached_property
 from functools import reduce
 from itertools import chain
 from itertools import product
+from math import e
 from math import isinf
+from threading import Lock
 
-import sympy
-
-from sympy import limit
-from sympy.abc import X as symX
-
-from sympy.calculus.util import function_range
+import numpy
 
+from .math_util import is_exact
 from .math_util import isinf_neg
 from .math_util import isinf_pos
 
-from .poly import solve_poly_equality
-from .poly import solve_poly_inequality
-
 from .sets import EmptySet
 from .sets import ExtReals
 from .sets import ExtRealsPos
@@ -35,14 +35,56 @@ from .sets import make_union
 from .sets import oo
 
 from .sym_util import get_union
+from .sym_util import sym_logb
+from .sym_util import sym_pow
 from .sym_util import sympify_number
 
+# ==============================================================================
+# Cache of preimages under Transforms.
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+class InvertCache():
+    """Bounded LRU cache of Transform.invert, keyed by (transform, ys)."""
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.table = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+    def get(self, key):
+        with self.lock:
+            result = self.table.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.table.move_to_end(key)
+            return result
+    def put(self, key, result):
+        with self.lock:
+            self.table[key] = result
+            self.table.move_to_end(key)
+            while len(self.table) > self.maxsize:
+                self.table.popitem(last=False)
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.table))
+    def cache_clear(self):
+        with self.lock:
+            self.table.clear()
+            self.hits = 0
+            self.misses = 0
+
+INVERT_CACHE = InvertCache(maxsize=4096)
+
 # ==============================================================================
 # Transform base class.
 
 class Transform():
     subexpr = None
     symbols = None
+    # Whether to store the results of invert in INVERT_CACHE.
+    cache_invert = True
 
     def get_symbols(self):
         return self.symbols
@@ -69,7 +111,23 @@ class Transform():
     def finv(self, y):
         raise NotImplementedError()
 
+    def evaluate_array(self, columns):
+        x = self.subexpr.evaluate_array(columns)
+        return self.ffwd_array(x)
+    def ffwd_array(self, x):
+        raise NotImplementedError()
+
     def invert(self, ys):
+        if not self.cache_invert:
+            return self.invert_uncached(ys)
+        # Exact and float solutions of the same preimage differ.
+        key = (self, ys, is_exact())
+        result = INVERT_CACHE.get(key)
+        if result is None:
+            result = self.invert_uncached(ys)
+            INVERT_CACHE.put(key, result)
+        return result
+    def invert_uncached(self, ys):
         intersection = self.range() & ys
         if intersection is EmptySet:
             return EmptySet
@@ -102,10 +160,7 @@ class Transform():
         if poly_x.subexpr != poly_self.subexpr:
             raise ValueError('Incompatible subexpressions in "%s + %s"'
                 % (str(self), x))
-        sym_poly_a = sympy.Poly(poly_self.symexpr)
-        sym_poly_b = sympy.Poly(poly_x.symexpr)
-        sym_poly_c = sym_poly_a + sym_poly_b
-        coeffs = sym_poly_c.all_coeffs()[::-1]
+        coeffs = add_coeffs(poly_self.coeffs, poly_x.coeffs)
         return Poly(poly_self.subexpr, coeffs)
     def __add__(self, x):
         # Try to add x as a number.
@@ -144,10 +199,7 @@ class Transform():
         if poly_x.subexpr != poly_self.subexpr:
             raise ValueError('Incompatible subexpressions in "%s * %s"'
                 % (str(self), x))
-        sym_poly_a = sympy.Poly(poly_self.symexpr, symX)
-        sym_poly_b = sympy.Poly(poly_x.symexpr, symX)
-        sym_poly_c = sym_poly_a * sym_poly_b
-        coeffs = sym_poly_c.all_coeffs()[::-1]
+        coeffs = mul_coeffs(poly_self.coeffs, poly_x.coeffs)
         return Poly(poly_self.subexpr, coeffs)
     def __mul__(self, x):
         # Try to multiply x as a number.
@@ -175,6 +227,7 @@ class Transform():
 
     # Division by x.
     def __truediv__number(self, x):
+        import sympy
         x_val = sympify_number(x)
         return sympy.Rational(1, x_val) * self
     def __truediv__(self, x):
@@ -229,6 +282,7 @@ class Transform():
         # TODO: Consider default choice x**(a/b) = (x**(a))**(1/b)
         raise ValueError('Cannot raise %s to %s' % (str(self), x))
     def __pow__number(self, x):
+        import sympy
         x_val = sympify_number(x)
         if isinstance(x_val, (sympy.Integer, int)):
             return self.__pow__integer(x_val)
@@ -244,6 +298,7 @@ class Transform():
     def __pow__tuple(self, x):
         if not isinstance(x, tuple):
             raise TypeError
+        import sympy
         numer = sympify_number(x[0])
         denom = sympify_number(x[1])
         return self.__pow__rational(sympy.Rational(numer, denom))
@@ -355,6 +410,7 @@ class Injective(Transform):
         return self.subexpr.invert(ys_prime)
 
 class Identity(Injective):
+    cache_invert = False
     def __init__(self, token):
         assert isinstance(token, str)
         self.subexpr = self
@@ -376,6 +432,14 @@ class Identity(Injective):
     def ffwd(self, x):
         # assert x in self.domain()
         return x
+    def evaluate_array(self, columns):
+        if self not in columns:
+            raise ValueError('Cannot evaluate %s on %s' % (str(self), columns))
+        x = numpy.asarray(columns[self])
+        # Nominal columns are returned as is.
+        return x.astype(float) if x.dtype.kind in 'biuf' else x
+    def ffwd_array(self, x):
+        return x
     def finv(self, y):
         if not y in self.range():
             return EmptySet
@@ -392,6 +456,8 @@ class Identity(Injective):
         return self.token
     def __hash__(self):
         return self.hash
+    def __reduce__(self):
+        return (self.__class__, (self.token,))
     def __rshift__(self, f):
         if isinstance(f, Callable):
             return f(self)
@@ -419,13 +485,15 @@ class Radical(Injective):
         return self.ffwd(x)
     def ffwd(self, x):
         assert x in self.domain()
-        return sympy.Pow(x, sympy.Rational(1, self.degree))
+        return sym_pow(x, Fraction(1, self.degree))
+    def ffwd_array(self, x):
+        return numpy.power(x, 1 / float(self.degree))
     def finv(self, y):
         if y not in self.range():
             return EmptySet
         if isinf_pos(y):
             return FiniteReal(oo)
-        return FiniteReal(sympy.Pow(y, sympy.Rational(self.degree, 1)))
+        return FiniteReal(sym_pow(y, self.degree))
     def __eq__(self, x):
         return isinstance(x, Radical) \
             and self.subexpr == x.subexpr \
@@ -458,7 +526,10 @@ class Exponential(Injective):
         return self.ffwd(x)
     def ffwd(self, x):
         assert x in self.domain()
-        return sympy.Pow(self.base, x)
+        return sym_pow(self.base, x)
+    def ffwd_array(self, x):
+        base = float(self.base)
+        return numpy.exp(x) if base == e else numpy.power(base, x)
     def finv(self, y):
         if not y in self.range():
             return EmptySet
@@ -466,7 +537,7 @@ class Exponential(Injective):
             return FiniteReal(oo)
         if y <= 0:
             return FiniteReal(-oo)
-        return FiniteReal(sympy.log(y, self.base))
+        return FiniteReal(sym_logb(y, self.base))
     def __eq__(self, x):
         return isinstance(x, Exponential) \
             and self.subexpr == x.subexpr \
@@ -475,6 +546,7 @@ class Exponential(Injective):
         return 'Exponential(%s, base=%s)' \
             % (repr(self.subexpr), repr(self.base),)
     def __str__(self):
+        import sympy
         if self.base == sympy.E:
             return 'exp(%s)' % (str(self.subexpr),)
         return '%s**(%s)' % (self.base, str(self.subexpr))
@@ -501,13 +573,16 @@ class Logarithm(Injective):
         return self.ffwd(x)
     def ffwd(self, x):
         assert x in self.domain()
-        return {sympy.log(x, self.base) if x > 0 else -oo}
+        return {sym_logb(x, self.base) if x > 0 else -oo}
+    def ffwd_array(self, x):
+        with numpy.errstate(divide='ignore'):
+            return numpy.log(x) / numpy.log(float(self.base))
     def finv(self, y):
         if not y in self.range():
             return EmptySet
         if isinf_pos(y):
             return FiniteReal(oo)
-        return FiniteReal(sympy.Pow(self.base, y))
+        return FiniteReal(sym_pow(self.base, y))
     def __eq__(self, x):
         return isinstance(x, Logarithm) \
             and self.subexpr == x.subexpr \
@@ -516,6 +591,7 @@ class Logarithm(Injective):
         return 'Logarithm(%s, base=%s)' \
             % (repr(self.subexpr), repr(self.base))
     def __str__(self):
+        import sympy
         if self.base == sympy.E:
             return 'ln(%s)' % (str(self.subexpr),)
         if self.base == 2:
@@ -546,6 +622,8 @@ class Abs(Transform):
     def ffwd(self, x):
         assert x in self.domain()
         return x if x > 0 else -x
+    def ffwd_array(self, x):
+        return numpy.abs(x)
     def finv(self, y):
         if not y in self.range():
             return EmptySet
@@ -590,13 +668,16 @@ class Reciprocal(Transform):
         return self.ffwd(x)
     def ffwd(self, x):
         assert x in self.domain()
-        return 0 if isinf(x) else sympy.Pow(x, -1)
+        return 0 if isinf(x) else sym_pow(x, -1)
+    def ffwd_array(self, x):
+        with numpy.errstate(divide='ignore'):
+            return numpy.where(numpy.isinf(x), 0., 1 / x)
     def finv(self, y):
         if y not in self.range():
             return EmptySet
         if y == 0:
             return FiniteReal(-oo, oo)
-        return FiniteReal(sympy.Pow(y, -1))
+        return FiniteReal(sym_pow(y, -1))
     def invert_finite(self, ys):
         ys_prime = make_union(*[self.finv(y) for y in ys])
         return self.subexpr.invert(ys_prime)
@@ -604,14 +685,14 @@ class Reciprocal(Transform):
         (a, b) = (ys.left, ys.right)
         if (0 <= a < b):
             assert 0 < a or ys.left_open
-            a_inv = sympy.Pow(a, -1) if 0 < a else oo
-            b_inv = sympy.Pow(b, -1) if (not isinf(b)) else 0
+            a_inv = sym_pow(a, -1) if 0 < a else oo
+            b_inv = sym_pow(b, -1) if (not isinf(b)) else 0
             ys_prime = transform_interval(ys, b_inv, a_inv, flip=True)
             return self.subexpr.invert(ys_prime)
         if (a < b <= 0):
             assert b < 0 or ys.right_open
-            a_inv = sympy.Pow(a, -1) if (not isinf(a)) else 0
-            b_inv = sympy.Pow(b, -1) if b < 0 else -oo
+            a_inv = sym_pow(a, -1) if (not isinf(a)) else 0
+            b_inv = sym_pow(b, -1) if b < 0 else -oo
             ys_prime = transform_interval(ys, b_inv, a_inv, flip=True)
             return self.subexpr.invert(ys_prime)
         assert False, 'Impossible Reciprocal interval: %s ' % (ys,)
@@ -632,10 +713,18 @@ class Poly(Transform):
         self.subexpr = make_subexpr(subexpr, self)
         self.coeffs = tuple(coeffs)
         self.degree = len(coeffs) - 1
-        self.symexpr = make_sympy_polynomial(coeffs)
+    @cached_property
+    def symexpr(self):
+        return make_sympy_polynomial(self.coeffs)
     def domain(self):
         return ExtReals
     def range(self):
+        if not is_exact():
+            from .poly import poly_range
+            return poly_range(self.coeffs)
+        import sympy
+        from sympy.abc import X as symX
+        from sympy.calculus.util import function_range
         result = function_range(self.symexpr, symX, sympy.Reals)
         if isinstance(result, sympy.FiniteSet):
             return FiniteReal(*[float(x) for x in result.args])
@@ -652,21 +741,36 @@ class Poly(Transform):
         return self.ffwd(x)
     def ffwd(self, x):
         assert x in self.domain()
+        if not is_exact():
+            return float(self.ffwd_array(float(x)))
+        from sympy import limit
+        from sympy.abc import X as symX
         return self.symexpr.subs(symX, x) \
             if not isinf(x) else limit(self.symexpr, symX, x)
+    def ffwd_array(self, x):
+        coeffs = [float(c) for c in self.coeffs]
+        # Limits at infinity are determined by the leading term.
+        degree = max([i for i, c in enumerate(coeffs) if c != 0], default=0)
+        with numpy.errstate(invalid='ignore'):
+            y = numpy.polyval(coeffs[::-1], x)
+            limit_x = coeffs[0] if degree == 0 else \
+                numpy.sign(coeffs[degree]) * numpy.sign(x)**degree * oo
+        return numpy.where(numpy.isinf(x), limit_x, y)
     def finv(self, y):
+        from .poly import solve_poly_equality
         if not y in self.range():
             return EmptySet
-        return solve_poly_equality(self.symexpr, y)
+        return solve_poly_equality(self.coeffs, y)
     def invert_finite(self, ys):
         ys_prime = make_union(*[self.finv(y) for y in ys])
         return self.subexpr.invert(ys_prime)
     def invert_interval(self, ys):
+        from .poly import solve_poly_inequality
         assert isinstance(ys, Interval)
         (a, b) = (ys.left, ys.right)
         (lo, ro) = (not ys.left_open, ys.right_open)
-        ys_prime_a = solve_poly_inequality(self.symexpr, a, lo, extended=False)
-        ys_prime_b = solve_poly_inequality(self.symexpr, b, ro, extended=False)
+        ys_prime_a = solve_poly_inequality(self.coeffs, a, lo, extended=False)
+        ys_prime_b = solve_poly_inequality(self.coeffs, b, ro, extended=False)
         ys_prime = ys_prime_b & (~ys_prime_a)
         return self.subexpr.invert(ys_prime)
     def __eq__(self, x):
@@ -720,6 +824,19 @@ class Piecewise(Transform):
         return Piecewise(subexprs_prime, events_prime)
     def evaluate(self, assignment):
         raise NotImplementedError()
+    def evaluate_array(self, columns):
+        [symbol] = self.symbols
+        x = symbol.evaluate_array(columns)
+        y = numpy.full(len(x), numpy.nan)
+        covered = numpy.zeros(len(x), dtype=bool)
+        for subexpr, domain in zip(self.subexprs, self.domains):
+            mask = domain.contains_array(x)
+            y[mask] = subexpr.evaluate_array({symbol: x[mask]})
+            covered |= mask
+        if not numpy.all(covered):
+            raise ValueError('Cannot evaluate %s on %s'
+                % (str(self), x[~covered].tolist()))
+        return y
     def ffwd(self, x):
         index = next(i for i, domain in enumerate(self.domains) if x in domain)
         return self.subexprs[index].ffwd(x)
@@ -755,7 +872,7 @@ class Piecewise(Transform):
         ]
         return ' + '.join(strings)
     def __hash__(self):
-        x = (self.__class__, self.subexprs, self.events)
+        x = (self.__class__, tuple(self.subexprs), tuple(self.events))
         return hash(x)
 
 def get_piecewise_symbol(subexprs, events):
@@ -847,6 +964,8 @@ class EventBasic(Event):
         return self.ffwd(x)
     def ffwd(self, x):
         return x in self.values
+    def ffwd_array(self, x):
+        return self.values.contains_array(x)
 
     # Disable < on Events.
     def __gt__(self, x):
@@ -932,12 +1051,8 @@ class EventInterval(EventBasic):
         if not isinf_neg(self.values.left):
             raise ValueError('cannot compute %s < %s' % (x, str(self)))
         xn = sympify_number(x)
-        # TODO: Replace interval_tmp
-        interval_tmp = sympy.Interval(
-            xn, self.values.right,
-            left_open=left_open,
-            right_open=self.values.right_open)
-        interval = convert_sympy(interval_tmp)
+        interval = make_interval(xn, self.values.right,
+            left_open, self.values.right_open)
         if isinstance(interval, Interval):
             return EventInterval(self.subexpr, interval)
         if isinstance(interval, FiniteReal) or interval is EmptySet:
@@ -948,12 +1063,8 @@ class EventInterval(EventBasic):
         if not isinf_pos(self.values.right):
             raise ValueError('cannot compute %s < %s' % (str(self), x))
         xn = sympify_number(x)
-        # TODO: Replace interval_tmp
-        interval_tmp = sympy.Interval(
-            self.values.left, xn,
-            left_open=self.values.left_open,
-            right_open=right_open)
-        interval = convert_sympy(interval_tmp)
+        interval = make_interval(self.values.left, xn,
+            self.values.left_open, right_open)
         if isinstance(interval, Interval):
             return EventInterval(self.subexpr, interval)
         if isinstance(interval, FiniteReal) or interval is EmptySet:
@@ -1094,6 +1205,9 @@ class EventOr(EventCompound):
     def evaluate(self, assignment):
         ys = [event.evaluate(assignment) for event in self.subexprs]
         return any(ys)
+    def evaluate_array(self, columns):
+        ys = [event.evaluate_array(columns) for event in self.subexprs]
+        return numpy.logical_or.reduce(ys)
     def ffwd(self, x):
         # Cannot asses on multi-symbol Event.
         ys = [event.ffwd(x) for event in self.subexprs]
@@ -1144,6 +1258,9 @@ class EventAnd(EventCompound):
     def evaluate(self, assignment):
         ys = [event.evaluate(assignment) for event in self.subexprs]
         return all(ys)
+    def evaluate_array(self, columns):
+        ys = [event.evaluate_array(columns) for event in self.subexprs]
+        return numpy.logical_and.reduce(ys)
     def ffwd(self, x):
         # Cannot asses on multi-symbol Event.
         ys = [event.ffwd(x) for event in self.subexprs]
@@ -1193,14 +1310,146 @@ class EventAnd(EventCompound):
         x = (self.__class__, self.subexprs)
         return hash(x)
 
+# ==============================================================================
+# Parametric Events.
+
+class Threshold():
+    """Placeholder for the threshold t in a parametric Event, e.g., X < t."""
+    # Comparisons with a Transform on the left are reflected, e.g.,
+    # X < t calls t > X once Transform.__lt__ fails to sympify t.
+    def __gt__(self, x):
+        return EventTemplate(x, True, True)
+    def __ge__(self, x):
+        return EventTemplate(x, True, False)
+    def __lt__(self, x):
+        return EventTemplate(x, False, True)
+    def __le__(self, x):
+        return EventTemplate(x, False, False)
+    def __str__(self):
+        return 't'
+    def __repr__(self):
+        return 'Threshold()'
+
+class EventTemplate():
+    """Event subexpr < t (upper) or t < subexpr (not upper), for varying t."""
+    def __init__(self, subexpr, upper, strict):
+        self.subexpr = make_subexpr(subexpr)
+        self.upper = upper
+        self.strict = strict
+    def get_symbols(self):
+        return self.subexpr.get_symbols()
+    def substitute(self, env):
+        subexpr = self.subexpr.substitute(env)
+        return EventTemplate(subexpr, self.upper, self.strict)
+    def instantiate(self, t):
+        if self.upper:
+            return (self.subexpr < t) if self.strict else (self.subexpr <= t)
+        return (self.subexpr > t) if self.strict else (self.subexpr >= t)
+    def __eq__(self, x):
+        return isinstance(x, EventTemplate) \
+            and self.subexpr == x.subexpr \
+            and self.upper == x.upper \
+            and self.strict == x.strict
+    def __hash__(self):
+        x = (self.__class__, self.subexpr, self.upper, self.strict)
+        return hash(x)
+    def __repr__(self):
+        return 'EventTemplate(%s, upper=%s, strict=%s)' \
+            % (repr(self.subexpr), repr(self.upper), repr(self.strict))
+    def __str__(self):
+        comp = '<' if self.strict else '<='
+        if self.upper:
+            return '%s %s t' % (str(self.subexpr), comp)
+        return 't %s %s' % (comp, str(self.subexpr))
+
+def make_event_template(func):
+    # Return the EventTemplate obtained by calling func on a Threshold,
+    # or None if func(t) is not a single comparison with t.
+    try:
+        template = func(Threshold())
+    except TypeError:
+        return None
+    return template if isinstance(template, EventTemplate) else None
+
+# ==============================================================================
+# Environments of derived symbols.
+
+class Environment(Mapping):
+    """Immutable ordered map from the symbols of a leaf to their transforms.
+
+    Each symbol is also stored with its transform composed down to the base
+    symbol, so substituting the environment into an event takes one pass.
+    Extending the most recently created environment shares its storage, so
+    adding k derived symbols costs O(k).  Use make_environment to create."""
+    def __init__(self, order, table, composed, size, lock):
+        self.order = order          # Symbols in topological order (shared).
+        self.table = table          # Map from symbol to (position, expr).
+        self.composed = composed    # Map from symbol to composed expr.
+        self.size = size            # Number of symbols in this environment.
+        self.lock = lock
+    def __getitem__(self, symbol):
+        (position, expr) = self.table[symbol]
+        if self.size <= position:
+            raise KeyError(symbol)
+        return expr
+    def __contains__(self, symbol):
+        entry = self.table.get(symbol)
+        return entry is not None and entry[0] < self.size
+    def __iter__(self):
+        return iter(self.order[:self.size])
+    def __len__(self):
+        return self.size
+    def extend(self, symbol, expr):
+        assert symbol not in self
+        assert all(s in self for s in expr.get_symbols())
+        composed = expr.subs(self.composed)
+        with self.lock:
+            if self.size == len(self.order):
+                (order, table, composed_all, lock) = \
+                    (self.order, self.table, self.composed, self.lock)
+            else:
+                # Another environment extends this one; copy the prefix.
+                order = self.order[:self.size]
+                table = {s: self.table[s] for s in order}
+                composed_all = {s: self.composed[s] for s in order}
+                lock = Lock()
+            order.append(symbol)
+            table[symbol] = (self.size, expr)
+            composed_all[symbol] = composed
+        return Environment(order, table, composed_all, self.size + 1, lock)
+    def substitute(self, expr):
+        # Rewrite expr in terms of the base symbol.
+        assert all(s in self for s in expr.get_symbols())
+        return expr.substitute(self.composed)
+    def __repr__(self):
+        items = ', '.join('%s: %s' % (repr(k), repr(v)) for k, v in self.items())
+        return 'Environment({%s})' % (items,)
+    def __reduce__(self):
+        return (make_environment, (self.order[0], dict(self.items())))
+
+def make_environment(symbol, env=None):
+    # Environment of a base symbol, extended by the derived symbols in the
+    # mapping env (in topological order), if any.
+    if isinstance(env, Environment):
+        assert env.order[0] == symbol
+        return env
+    result = Environment([symbol], {symbol: (0, symbol)}, {symbol: symbol},
+        1, Lock())
+    for s, expr in (env or {}).items():
+        if s != symbol:
+            result = result.extend(s, expr)
+    return result
+
 # ==============================================================================
 # Utilities.
 
 # Some useful constructors.
 Id = Identity
 def Exp(subexpr):
+    import sympy
     return Exponential(subexpr, sympy.exp(1))
 def Log(subexpr):
+    import sympy
     return Logarithm(subexpr, sympy.exp(1))
 def Sqrt(subexpr):
     return Radical(subexpr, 2)
@@ -1218,7 +1467,36 @@ def transform_interval(interval, a, b, flip=None):
         if not flip else \
         Interval(a, b, interval.right_open, interval.left_open) \
 
+def make_interval(a, b, left_open, right_open):
+    if a < b:
+        return Interval(a, b, left_open, right_open)
+    if a == b and not (left_open or right_open):
+        return FiniteReal(a)
+    return EmptySet
+
+def add_coeffs(a, b):
+    n = max(len(a), len(b))
+    a = list(a) + [0] * (n - len(a))
+    b = list(b) + [0] * (n - len(b))
+    return normalize_coeffs([x + y for x, y in zip(a, b)])
+
+def mul_coeffs(a, b):
+    c = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            c[i + j] += x * y
+    return normalize_coeffs(c)
+
+def normalize_coeffs(coeffs):
+    # Expand symbolic coefficients and drop zeros of the highest degrees.
+    coeffs = [c.expand() if hasattr(c, 'expand') else c for c in coeffs]
+    while len(coeffs) > 1 and coeffs[-1] == 0:
+        coeffs = coeffs[:-1]
+    return coeffs
+
 def make_sympy_polynomial(coeffs):
+    import sympy
+    from sympy.abc import X as symX
     terms = [c*symX**i for (i,c) in enumerate(coeffs)]
     return sympy.Add(*terms)
 
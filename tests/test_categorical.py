@@ -0,0 +1,99 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+from fractions import Fraction
+from math import log
+
+import numpy
+import pytest
+
+from sppl.compilers.spe_to_dict import spe_from_dict
+from sppl.compilers.spe_to_dict import spe_to_dict
+from sppl.distributions import choice
+from sppl.distributions import norm
+from sppl.math_util import allclose
+from sppl.math_util import isinf_neg
+from sppl.sets import FiniteNominal
+from sppl.sets import nominal_vocabulary
+from sppl.spe import CategoricalLeaf
+from sppl.spe import NominalLeaf
+from sppl.spe import SumSPE
+from sppl.transforms import Id
+
+X = Id('X')
+Y = Id('Y')
+
+def test_categorical_matches_nominal():
+    dist = {'a': Fraction(1, 5), 'b': Fraction(1, 5), 'c': Fraction(3, 5)}
+    spe_exact = X >> choice(dist)
+    spe = X >> choice(dist, exact=False)
+    assert isinstance(spe_exact, NominalLeaf)
+    assert isinstance(spe, CategoricalLeaf)
+    assert spe.support == spe_exact.support
+    for event in [
+            X << {'a'},
+            X << {'a', 'c'},
+            ~(X << {'b'}),
+            (X << {'a', 'b'}) & ~(X << {'b'}),
+            (X << {'a', 'z'}) | (X << {'c'}),
+        ]:
+        assert allclose(spe.logprob(event), spe_exact.logprob(event))
+    assert isinf_neg(spe.logprob(X << {'d'}))
+    assert isinf_neg(spe.logprob(X << ()))
+    assert isinf_neg(spe.logprob(X**2 << {1}))
+    assert allclose(spe.logpdf({X: 'c'}), log(.6))
+    assert isinf_neg(spe.logpdf({X: 'd'}))
+
+def test_categorical_condition_constrain():
+    spe = X >> choice({'a': .2, 'b': .2, 'c': .6}, exact=False)
+    spe_condition = spe.condition(X << {'a', 'b'})
+    assert isinstance(spe_condition, CategoricalLeaf)
+    assert spe_condition.vocabulary is spe.vocabulary
+    assert spe_condition.support == FiniteNominal('a', 'b')
+    assert allclose(spe_condition.logprob(X << {'a'}), -log(2))
+    assert isinf_neg(spe_condition.logprob(X << {'c'}))
+    assert spe_condition.condition(~(X << {'c'})) is spe_condition
+    assert spe.condition(~(X << {'python'})) is spe
+    with pytest.raises(ValueError):
+        spe.condition(X << {'python'})
+    with pytest.raises(ValueError):
+        spe_condition.condition(X << {'c'})
+
+    spe_constrain = spe.constrain({X: 'b'})
+    assert spe_constrain.support == FiniteNominal('b')
+    assert spe_constrain.logprob(X << {'b'}) == 0
+    with pytest.raises(Exception):
+        spe_condition.constrain({X: 'c'})
+
+def test_categorical_many_categories():
+    n = 50000
+    categories = ['p%d' % (i,) for i in range(n)]
+    weights = numpy.random.default_rng(1).dirichlet(numpy.ones(n))
+    spe = X >> choice(dict(zip(categories, weights)), exact=False)
+    values = set(categories[::7])
+    expected = numpy.sum(weights[::7])
+    assert allclose(spe.prob(X << values), expected)
+    spe_condition = spe.condition(X << values)
+    # Conditioning does not build the support or dist of the leaf.
+    assert 'support' not in spe_condition.__dict__
+    assert 'dist' not in spe_condition.__dict__
+    assert allclose(spe_condition.prob(X << {'p7'}), weights[7] / expected)
+    assert spe_condition.prob(X << {'p1'}) == 0
+    samples = spe_condition.sample(100, prng=numpy.random.default_rng(1))
+    assert all(s[X] in values for s in samples)
+    # Events over sets that share the vocabulary of the leaf.
+    with nominal_vocabulary(spe.vocabulary):
+        event = X << values
+    assert event.values.vocabulary is spe.vocabulary
+    assert allclose(spe.prob(event), expected)
+    assert allclose(spe.prob(~event), 1 - expected)
+
+def test_categorical_mixture_serialize():
+    spe = 0.3 * (X >> choice({'a': .5, 'b': .5}, exact=False)) \
+        | 0.7 * (X >> choice({'b': .1, 'c': .9}, exact=False))
+    spe = spe & (Y >> norm(loc=0, scale=1))
+    assert isinstance(spe.children[0], SumSPE)
+    assert allclose(spe.prob(X << {'b'}), .3*.5 + .7*.1)
+    spe_condition = spe.condition((X << {'b'}) & (Y > 0))
+    assert allclose(spe_condition.prob(X << {'b'}), 1)
+    assert spe_from_dict(spe_to_dict(spe_condition)) == spe_condition
@@ -0,0 +1,75 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+import numpy
+import pytest
+
+from sppl.distributions import atomic
+from sppl.distributions import choice
+from sppl.distributions import gamma
+from sppl.distributions import norm
+from sppl.distributions import poisson
+from sppl.math_util import allclose
+from sppl.transforms import Id
+
+X = Id('X')
+Y = Id('Y')
+Z = Id('Z')
+
+xs = numpy.linspace(-3, 6, 37)
+
+def test_compile_logpdf_mixture():
+    spe = X >> (.3*norm() | .7*gamma(a=1))
+    logpdf = spe.compile()
+    assert allclose(logpdf(xs), [spe.logpdf({X: x}) for x in xs])
+    assert allclose(logpdf(0.5), spe.logpdf({X: 0.5}))
+    assert 'logaddexp' in logpdf.source
+
+def test_compile_logpdf_product_marginal():
+    spe = (X >> norm()) & (Y >> poisson(mu=2)) & (Z >> choice({'a': .2, 'b': .8}))
+    logpdf = spe.compile('logpdf', [X, Z])
+    zs = numpy.array(['a', 'b', 'c'] * 12 + ['a'])
+    expected = [spe.logpdf({X: x, Z: z}) for x, z in zip(xs, zs)]
+    assert allclose(logpdf(xs, zs), expected)
+    logpdf = spe.compile('logpdf', [Y])
+    assert allclose(logpdf([0, 1, 2.5]), [spe.logpdf({Y: y}) for y in [0, 1, 2.5]])
+
+def test_compile_logpdf_conditioned():
+    spe = (X >> norm()).condition((X < -1) | (X > 1))
+    spe = spe & (Y >> poisson(mu=2)).condition(Y << {1, 2, 3})
+    logpdf = spe.compile('logpdf', [X, Y])
+    ys = numpy.arange(len(xs)) % 5
+    expected = [spe.logpdf({X: x, Y: y}) for x, y in zip(xs, ys)]
+    assert allclose(logpdf(xs, ys), expected)
+
+def test_compile_logpdf_mixed_base_measure():
+    spe = X >> (.4*norm() | .6*atomic(loc=1))
+    logpdf = spe.compile()
+    values = [-1, 0, 1, 2]
+    assert allclose(logpdf(values), [spe.logpdf({X: x}) for x in values])
+
+def test_compile_logcdf():
+    spe = ((X >> (.3*norm() | .7*gamma(a=1))) & (Y >> poisson(mu=2)))
+    spe = spe.condition(X < 2)
+    logcdf = spe.compile('logcdf', [X, Y])
+    ys = numpy.arange(len(xs)) % 5
+    expected = [spe.logprob((X <= x) & (Y <= y)) for x, y in zip(xs, ys)]
+    assert allclose(logcdf(xs, ys), expected)
+
+def test_compile_errors():
+    spe = (X >> norm()).transform(Z, X**2)
+    with pytest.raises(ValueError):
+        spe.compile('logpdf', [Z])
+    with pytest.raises(ValueError):
+        spe.compile('logpdf', [Y])
+    with pytest.raises(ValueError):
+        spe.compile('sample', [X])
+    with pytest.raises(ValueError):
+        (X >> choice({'a': .5, 'b': .5})).compile('logcdf')
+
+def test_compile_cache():
+    spe_a = X >> (.3*norm() | .7*gamma(a=1))
+    spe_b = X >> (.3*norm() | .7*gamma(a=1))
+    assert spe_a is not spe_b
+    assert spe_a.compile() is spe_b.compile()
+    assert spe_a.compile('logcdf') is not spe_b.compile()
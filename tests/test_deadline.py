@@ -0,0 +1,80 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import sympy
+
+from sympy import Rational as Rat
+
+import sppl.poly
+
+from sppl.deadline import Deadline
+from sppl.deadline import DeadlineExceeded
+from sppl.deadline import get_deadline
+from sppl.distributions import choice
+from sppl.distributions import norm
+from sppl.math_util import allclose
+from sppl.math_util import exact_mode
+from sppl.poly import solve_poly_equality
+from sppl.transforms import Id
+
+X = Id('X')
+Y = Id('Y')
+
+def test_deadline_query():
+    spe = (X >> norm(loc=0, scale=1)) & (Y >> choice({'a': .5, 'b': .5}))
+    event = (X > 0) | (Y << {'a'})
+    assert allclose(spe.logprob(event, deadline=10), spe.logprob(event))
+    for deadline in [0, Deadline(0)]:
+        with pytest.raises(DeadlineExceeded):
+            spe.logprob(event, deadline=deadline)
+        with pytest.raises(DeadlineExceeded):
+            spe.condition(event, deadline=deadline)
+        with pytest.raises(DeadlineExceeded):
+            spe.constrain({X: 1}, deadline=deadline)
+        with pytest.raises(TimeoutError):
+            spe.children[0].logprob(X > 0, deadline=deadline)
+    assert get_deadline() is None
+
+def test_deadline_checked_between_symbolic_steps(monkeypatch):
+    # Expire the query deadline at the second check, without timing.
+    checks = []
+    def check_deadline():
+        checks.append(get_deadline())
+        if len(checks) > 1:
+            raise DeadlineExceeded(checks[-1])
+    monkeypatch.setattr(sppl.poly, 'check_deadline', check_deadline)
+    Z = (X - sympy.sqrt(2)/10) * (X + Rat(10, 7)) * (X - sympy.sqrt(5))
+    spe = X >> norm(loc=0, scale=1)
+    with exact_mode(), pytest.raises(DeadlineExceeded):
+        spe.logprob(Z << {1}, deadline=10)
+    assert len(checks) == 2
+    assert all(isinstance(d, Deadline) for d in checks)
+    assert get_deadline() is None
+
+def test_deadline_symbolic_degree_limits(monkeypatch):
+    # Polynomials beyond the degree limits are never passed to sympy.
+    monkeypatch.setattr(sympy, 'roots', None)
+    x = sympy.Symbol('x')
+    for expr in [x**5 - 3*x + 1, sympy.sqrt(2)*x**4 - x]:
+        with exact_mode():
+            roots = solve_poly_equality(expr, 1)
+        assert roots and all(isinstance(v, float) for v in roots.values)
+
+def test_deadline_symbolic_fallback_thread(monkeypatch):
+    # The symbolic budget runs out in worker threads (without any timers)
+    # and the numerical solver is used instead.
+    monkeypatch.setattr(sppl.poly, 'TIMEOUT_SYMBOLIC', 0)
+    expr = sympy.Poly(
+        (sympy.Symbol('x') - sympy.sqrt(2)/10)
+            * (sympy.Symbol('x') + Rat(10, 7))
+            * (sympy.Symbol('x') - sympy.sqrt(5))).args[0]
+    with exact_mode(), ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(solve_poly_equality, expr, 1)
+            for _i in range(2)]
+        results = [f.result(timeout=30) for f in futures]
+    for roots in results:
+        assert len(roots) == 3
+        assert all(isinstance(x, float) for x in roots.values)
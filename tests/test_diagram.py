@@ -0,0 +1,153 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+import random
+
+from functools import reduce
+from math import log
+
+import pytest
+
+from sppl.diagram import compile_diagram
+from sppl.diagram import get_complement
+from sppl.distributions import choice
+from sppl.distributions import norm
+from sppl.distributions import poisson
+from sppl.distributions import uniform
+from sppl.dnf import dnf_count_clauses
+from sppl.math_util import allclose
+from sppl.math_util import logsumexp
+from sppl.sets import ExtReals
+from sppl.sets import FiniteNominal
+from sppl.sets import FiniteReal
+from sppl.sets import Interval
+from sppl.sets import Strings
+from sppl.spe import Memo
+from sppl.transforms import Id
+
+X = [Id('X%d' % (i,)) for i in range(12)]
+Y = [Id('Y%d' % (i,)) for i in range(12)]
+N = Id('N')
+Z = Id('Z')
+
+def test_complement():
+    assert get_complement(FiniteNominal('a')) \
+        == FiniteNominal('a', b=True) | ExtReals
+    assert get_complement(Interval(0, 1) | FiniteReal(-float('inf'))) \
+        == Strings | Interval.Ropen(-float('inf'), 0) \
+            | Interval.Lopen(1, float('inf')) | FiniteReal(float('inf'))
+    assert get_complement(Strings | ExtReals) is not None
+
+def test_logprob_cnf_polynomial():
+    k = 12
+    spe = reduce(lambda a, b: a & b, [
+        (X[i] >> norm(loc=0, scale=1)) & (Y[i] >> norm(loc=0, scale=1))
+        for i in range(k)
+    ])
+    event = reduce(lambda a, b: a & b,
+        [(X[i] > 0) | (Y[i] > 1) for i in range(k)])
+    assert dnf_count_clauses(event) == 2**k
+    factors = [c.get_symbols() for c in spe.children]
+    diagram = compile_diagram(event, factors)
+    assert diagram.size() <= 2*k
+    p_clause = 1 - .5 * spe.prob(Y[0] <= 1)
+    assert allclose(spe.logprob(event), k * log(p_clause))
+    # Conditioning shares the subtrees of the diagram.
+    spe_condition = spe.condition(event)
+    for i in [0, k - 1]:
+        assert allclose(spe_condition.prob(X[i] > 0), .5 / p_clause)
+        assert allclose(spe_condition.prob((X[i] <= 0) & (Y[i] <= 1)), 0)
+
+events = [
+    (X[0] > 0) | (X[1] < 1),
+    ((X[0] > 0) | (N << {'a'})) & ((X[1] < 1) | (N << {'b', 'c'})),
+    ((X[0] > 0) | ~(N << {'a'})) & ((Z < 1) | (X[1] > 2)),
+    ((X[0] > 0) & (Z < 2)) | ((X[1]**2 < 1) & (N << {'a'})),
+    ((X[0] > 0) & (X[1] << {1, 2})) | ((X[0] < 1) & (X[1] >= 1)),
+    (X[0] > 0) & (X[0] < -1),
+    ~((X[0] > 0) & (N << {'a'})),
+]
+@pytest.mark.parametrize('event', events)
+def test_diagram_agrees_with_dnf(event):
+    spe = (X[0] >> norm(loc=0, scale=2)) \
+        & (.3 * ((X[1] >> poisson(mu=2)) & (N >> choice({'a': .5, 'b': .5})))
+            | .7 * ((X[1] >> norm(loc=1, scale=1))
+                & (N >> choice({'a': .2, 'b': .3, 'c': .5}))))
+    spe = spe.transform(Z, X[0]**2 - 1)
+    logp = spe.logprob(event)
+    assert allclose(spe.logprob_diagram(event, Memo()), logp)
+    if logp == -float('inf'):
+        with pytest.raises(ValueError):
+            spe.condition_diagram(event, Memo())
+        return
+    spe_condition = spe.condition_diagram(event, Memo())
+    for query in [X[0] > .5, N << {'a'}, (X[1] < 1.5) & (N << {'b'})]:
+        logp_joint = spe.logprob(query & event)
+        assert allclose(spe_condition.logprob(query), logp_joint - logp)
+
+def test_diagram_agrees_with_dnf_random():
+    U = Id('U')
+    spe = (X[0] >> norm(loc=0, scale=2)) \
+        & (U >> uniform(loc=0, scale=1)) \
+        & (.3 * ((X[1] >> poisson(mu=2)) & (N >> choice({'a': .5, 'b': .5})))
+            | .7 * ((X[1] >> norm(loc=1, scale=1))
+                & (N >> choice({'a': .2, 'b': .3, 'c': .5}))))
+    spe = spe.transform(Z, X[0]**2 - 1)
+    # Several literals on each symbol; those on U > 2 have probability zero.
+    literals = [
+        X[0] > 0, X[0] < -1, X[0] < 1,
+        X[1] << {1, 2}, X[1] >= 1, X[1] < 2,
+        N << {'a'}, ~(N << {'b'}),
+        U > 2, U < .5, U > .25,
+        Z < 1,
+    ]
+    prng = random.Random(1)
+    make_clause = lambda: reduce(lambda a, b: a & b,
+        prng.sample(literals, prng.randint(1, 3)))
+    queries = [X[0] > .5, U < .3, N << {'a'}, (X[1] < 1.5) & (N << {'b'})]
+    for _trial in range(30):
+        event = reduce(lambda a, b: a | b,
+            [make_clause() for _i in range(prng.randint(2, 4))])
+        logp = spe.logprob(event)
+        assert allclose(spe.logprob_diagram(event, Memo()), logp)
+        if logp == -float('inf'):
+            with pytest.raises(ValueError):
+                spe.condition_diagram(event, Memo())
+            continue
+        spe_condition = spe.condition_diagram(event, Memo())
+        for query in queries:
+            logp_joint = spe.logprob(query & event)
+            assert allclose(spe_condition.logprob(query), logp_joint - logp)
+
+def test_condition_diagram_zero_edge():
+    U = Id('U')
+    spe = (U >> uniform(loc=0, scale=1)) & (Y[0] >> norm())
+    event = ((U > 2) & (Y[0] > 0)) | ((U < .5) & (Y[0] < 1))
+    memo = Memo()
+    logp = spe.logprob_diagram(event, memo)
+    spe_condition = spe.condition_diagram(event, memo)
+    assert len(memo.diagram) == 1
+    assert allclose(logp, log(.5) + spe.logprob(Y[0] < 1))
+    assert allclose(spe_condition.prob(U < .5), 1)
+    assert allclose(spe_condition.prob(Y[0] < 1), 1)
+    # Through the public interface, with more clauses than the DNF limit.
+    pad = reduce(lambda a, b: a & b,
+        [(Y[0] < 5 + i) | (U < 2 + i) for i in range(7)])
+    spe_condition = spe.condition(event & pad)
+    assert allclose(spe_condition.prob(U < .5), 1)
+
+def test_logprob_sum_of_products():
+    k = 8
+    make_product = lambda loc: reduce(lambda a, b: a & b, [
+        (X[i] >> norm(loc=loc, scale=1)) & (Y[i] >> norm(loc=loc, scale=1))
+        for i in range(k)
+    ])
+    spe = .4 * make_product(0) | .6 * make_product(1)
+    event = reduce(lambda a, b: a & b,
+        [(X[i] > 0) | (Y[i] > 1) for i in range(k)])
+    logps = [
+        k * log(1 - child.prob(X[0] <= 0) * child.prob(Y[0] <= 1))
+        for child in spe.children
+    ]
+    assert allclose(spe.logprob(event),
+        logsumexp([log(.4) + logps[0], log(.6) + logps[1]]))
@@ -1,11 +1,25 @@
 # Copyright 2020 MIT Probabilistic Computing Project.
 # See LICENSE.txt
 
+import random
+
+from functools import reduce
+from itertools import combinations
+
 import pytest
 
+from sppl.distributions import choice
+from sppl.distributions import norm
+from sppl.dnf import SIMPLIFY_STATS
 from sppl.dnf import dnf_factor
 from sppl.dnf import dnf_non_disjoint_clauses
+from sppl.dnf import dnf_normalize
 from sppl.dnf import dnf_to_disjoint_union
+from sppl.math_util import allclose
+from sppl.math_util import logsumexp
+from sppl.sets import EmptySet
+from sppl.sets import Reals
+from sppl.spe import Memo
 
 from sppl.transforms import EventOr
 from sppl.transforms import Exp
@@ -281,3 +295,66 @@ def test_event_to_disjoint_union_five():
     E5 = ((5 < X) < 7) & ((7 < Y) < 10)
     event = E1 | E2 | E3 | E4 | E5
     dnf_to_disjoint_union(event)
+
+def test_dnf_non_disjoint_clauses_indexed():
+    # The indexed overlaps agree with comparing all pairs of clauses.
+    X = Id('X')
+    Y = Id('Y')
+    Z = Id('Z')
+    rng = random.Random(1)
+    def make_literal(symbol):
+        if symbol is Z:
+            return Z << set(rng.sample(['a', 'b', 'c', 'd'], 2))
+        a = rng.randint(0, 20)
+        return (a < symbol) < a + rng.randint(1, 4)
+    clauses = [
+        reduce(lambda a, b: a & b,
+            [make_literal(s) for s in rng.sample([X, Y, Z], rng.randint(1, 3))])
+        for _i in range(60)
+    ]
+    event = EventOr(clauses)
+    solutions = [dnf_factor(c)[0] for c in clauses]
+    solutions = [{s: e.solve() for s, e in c.items()} for c in solutions]
+    expected = {}
+    for i, j in combinations(range(len(clauses)), 2):
+        if all(solutions[i][s] & solutions[j][s] is not EmptySet
+                for s in solutions[i] if s in solutions[j]):
+            expected.setdefault(j, []).append(i)
+    overlaps = dnf_non_disjoint_clauses(event)
+    assert overlaps == expected
+    event_disjoint = dnf_to_disjoint_union(event)
+    assert not dnf_non_disjoint_clauses(event_disjoint)
+    spe = (X >> norm(loc=10, scale=5)) & (Y >> norm(loc=10, scale=5)) \
+        & (Z >> choice({'a': .1, 'b': .2, 'c': .3, 'd': .4}))
+    logps = [spe.logprob(c) for c in event_disjoint.subexprs]
+    assert allclose(spe.logprob_diagram(event, Memo()), logsumexp(logps))
+
+def test_dnf_normalize_simplify():
+    X = Id('X')
+    Y = Id('Y')
+    # Duplicate clauses.
+    event = ((X > 0) & (Y < 1)) | ((Y < 1) & (X > 0))
+    assert dnf_normalize(event) == (X > 0) & (Y < 1)
+    # Subsumed clauses.
+    event = ((X > 0) & (Y < 1)) | ((X > 1) & (Y < 0)) | (Y < -1)
+    assert dnf_normalize(event) == ((X > 0) & (Y < 1)) | (Y < -1)
+    event = (X > 0) | ((X > 1) & (Y < 0))
+    assert dnf_normalize(event) == (X > 0)
+    # Clauses that differ on one symbol.
+    event = (((0 < X) < 1) & (Y < 0)) | (((1 <= X) < 2) & (Y < 0))
+    assert dnf_normalize(event) == ((0 < X) < 2) & (Y < 0)
+    event = ((X << {'a'}) & (Y < 0)) | ((X << {'b'}) & (Y < 0))
+    assert dnf_normalize(event) == (X << {'a', 'b'}) & (Y < 0)
+    # Merging clauses exposes a subsumed clause.
+    event = ((X < 1) & (Y < 0)) | ((X >= 1) & (Y < 0)) | ((X > 2) & (Y < -1))
+    assert dnf_normalize(event) == (X << Reals) & (Y < 0)
+
+def test_dnf_normalize_simplify_stats():
+    X = Id('X')
+    Y = Id('Y')
+    SIMPLIFY_STATS.clear()
+    dnf_normalize(((X > 0) & (Y < 1)) | ((X > 1) & (Y < 0)) | (X > 2))
+    dnf_normalize((X > 0) & (X < -1) & (Y < 1))
+    assert SIMPLIFY_STATS.info() == (2, 4, 2)
+    SIMPLIFY_STATS.clear()
+    assert SIMPLIFY_STATS.info() == (0, 0, 0)
@@ -0,0 +1,71 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+import numpy
+import pytest
+
+from sppl.distributions import choice
+from sppl.distributions import gamma
+from sppl.distributions import norm
+from sppl.distributions import poisson
+from sppl.sets import FiniteNominal
+from sppl.sets import FiniteReal
+from sppl.sets import Interval
+from sppl.sets import inf as oo
+from sppl.transforms import Id
+
+X = Id('X')
+Y = Id('Y')
+Z = Id('Z')
+W = Id('W')
+
+def test_contains_array():
+    xs = numpy.array([-oo, -1, 0, 1, 2.5, oo])
+    for s in [
+            Interval(0, 1),
+            Interval.open(-oo, 1),
+            Interval.Lopen(0, oo),
+            FiniteReal(1, 2.5, oo),
+            FiniteReal(1) | Interval.open(-1, 0),
+            ]:
+        assert list(s.contains_array(xs)) == [x in s for x in xs.tolist()]
+    names = numpy.array(['a', 'b', 'c'])
+    for s in [FiniteNominal('a', 'c'), FiniteNominal('a', b=True)]:
+        assert list(s.contains_array(names)) == [x in s for x in names]
+    assert not any(Interval(0, 1).contains_array(names))
+    # Numbers are not in any nominal set, including a cofinite one.
+    assert not any(FiniteNominal('a', b=True).contains_array(xs))
+    assert not any(FiniteNominal(b=True).contains_array(xs))
+
+def test_event_evaluate_array():
+    columns = {
+        X: numpy.array([-2, 0, 1, 3]),
+        Y: numpy.array(['a', 'b', 'a', 'c']),
+    }
+    for event in [
+            X**2 < 2,
+            (X > 0) & (Y << {'a'}),
+            (X < 0) | ~(Y << {'a'}),
+            ]:
+        expected = [
+            event.evaluate({X: x, Y: y})
+            for x, y in zip(columns[X].tolist(), columns[Y].tolist())
+        ]
+        assert list(event.evaluate_array(columns)) == expected
+
+def test_estimate_prob():
+    spe = (X >> (.3*norm() | .7*gamma(a=2))) \
+        & (Y >> choice({'a': .2, 'b': .8})) \
+        & (Z >> poisson(mu=3))
+    spe = spe.transform(W, X**2)
+    prng = numpy.random.default_rng(1)
+    for event in [
+            (X > 1) & (Y << {'a'}),
+            (W < 1) | ((Y << {'b'}) & (Z << {2, 3})),
+            ]:
+        (p, (lo, hi)) = spe.estimate_prob(event, 10**4, prng=prng)
+        assert lo <= p <= hi
+        assert hi - lo < .05
+        assert abs(p - spe.prob(event)) < .02
+    with pytest.raises(ValueError):
+        spe.estimate_prob(X > 1, 0)
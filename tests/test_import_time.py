@@ -0,0 +1,52 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+import subprocess
+import sys
+
+# Modules that should load only when a symbolic path or a specific
+# distribution family is first used.
+HEAVY_MODULES = ('sympy', 'scipy.stats')
+
+# Generous bound on the cumulative cost of the imports, in microseconds.
+IMPORT_BUDGET = 2 * 10**6
+
+def get_import_times(code):
+    # Parse python -X importtime into {module: (depth, cumulative)}.
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        (_self, cumulative, name) = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        times[name.strip()] = (depth, int(cumulative))
+    return times
+
+def test_import_lazy():
+    code = '\n'.join([
+        'import sppl.distributions',
+        'import sppl.spe',
+        'import sppl.transforms',
+        'import sppl.compilers.sppl_to_python',
+    ])
+    times = get_import_times(code)
+    heavy = [m for m in times if m.startswith(HEAVY_MODULES)]
+    assert not heavy, heavy
+    cost = sum(t for (depth, t) in times.values() if depth == 0)
+    assert 0 < cost < IMPORT_BUDGET, cost
+
+def test_import_lazy_numeric_query():
+    code = '\n'.join([
+        'import sys',
+        'from sppl.distributions import norm',
+        'from sppl.transforms import Id',
+        'X = Id("X")',
+        'spe = X >> norm(loc=0, scale=1)',
+        'assert spe.prob((0 < X) < 1) > 0',
+        'assert "scipy.stats" in sys.modules',
+        'assert "sympy" not in sys.modules',
+    ])
+    get_import_times(code)
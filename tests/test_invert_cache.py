@@ -0,0 +1,67 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+from concurrent.futures import ThreadPoolExecutor
+
+from sppl.math_util import exact_mode
+from sppl.math_util import is_exact
+from sppl.sets import FiniteReal
+from sppl.sets import Interval
+from sppl.transforms import INVERT_CACHE
+from sppl.transforms import Id
+from sppl.transforms import InvertCache
+
+X = Id('X')
+
+def test_invert_cache_hits():
+    INVERT_CACHE.cache_clear()
+    expr = X**3 - 2*X
+    ys = Interval(0, 3)
+    solution = expr.invert(ys)
+    info = INVERT_CACHE.cache_info()
+    assert info.hits == 0 and info.misses > 0
+    assert expr.invert(ys) is solution
+    assert (X**3 - 2*X).invert(ys) is solution
+    assert INVERT_CACHE.cache_info().hits == 2
+    # Events are solved through the same cache.
+    event = (0 <= expr) <= 3
+    assert event.solve() == solution
+    assert event.solve() == solution
+    assert INVERT_CACHE.cache_info().hits >= 3
+
+def test_invert_cache_piecewise():
+    INVERT_CACHE.cache_clear()
+    expr = (X**2) * (X < 0) + (1/X) * (X >= 0)
+    solution = expr.invert(Interval(1, 4))
+    assert expr.invert(Interval(1, 4)) is solution
+    assert INVERT_CACHE.cache_info().hits == 1
+
+def test_invert_cache_exact():
+    INVERT_CACHE.cache_clear()
+    expr = X**2
+    solution = expr.invert(FiniteReal(2))
+    with exact_mode():
+        solution_exact = expr.invert(FiniteReal(2))
+    assert solution != solution_exact
+    assert INVERT_CACHE.cache_info().hits == 0
+
+def test_invert_cache_exact_thread():
+    # Exact mode in another thread does not change the mode of this one.
+    INVERT_CACHE.cache_clear()
+    expr = X**2
+    with exact_mode(), ThreadPoolExecutor(max_workers=1) as executor:
+        assert not executor.submit(is_exact).result()
+        solution = executor.submit(expr.invert, FiniteReal(2)).result()
+        solution_exact = expr.invert(FiniteReal(2))
+    assert solution == expr.invert(FiniteReal(2))
+    assert solution != solution_exact
+
+def test_invert_cache_bounded():
+    cache = InvertCache(maxsize=2)
+    for i in range(3):
+        cache.put(i, FiniteReal(i))
+    assert cache.get(0) is None
+    assert cache.get(2) == FiniteReal(2)
+    assert cache.cache_info() == (1, 1, 2, 2)
+    cache.cache_clear()
+    assert cache.cache_info() == (0, 0, 2, 0)
@@ -0,0 +1,85 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+import pytest
+import scipy.stats
+
+from sppl.distributions import norm
+from sppl.distributions import poisson
+from sppl.kernels import Kernel
+from sppl.kernels import get_kernel
+from sppl.math_util import allclose
+from sppl.transforms import Id
+
+inf = float('inf')
+
+xs = numpy.array([-2, -1, -.5, 0, .3, .5, 1, 1.5, 2, 3, 4, 7, 10, inf, -inf])
+
+@pytest.mark.parametrize('dist', [
+    scipy.stats.norm(loc=1, scale=2),
+    scipy.stats.uniform(loc=-1, scale=3),
+    scipy.stats.beta(a=2, b=.5),
+    scipy.stats.beta(a=1, b=3, loc=-1, scale=2),
+    scipy.stats.gamma(a=1),
+    scipy.stats.gamma(a=.5, scale=2),
+    scipy.stats.poisson(mu=3),
+    scipy.stats.poisson(mu=2, loc=1),
+    scipy.stats.binom(n=5, p=.3),
+    scipy.stats.bernoulli(p=.4),
+])
+def test_kernel_matches_scipy(dist):
+    kernel = Kernel(dist)
+    methods = ['logcdf', 'cdf']
+    methods += ['logpdf'] if hasattr(dist.dist, 'pdf') else ['logpmf']
+    for method in methods:
+        assert method in kernel.__dict__
+        # SciPy returns nan at infinity where the kernel returns the limit.
+        expected = getattr(dist, method)(xs[:-2])
+        assert allclose(getattr(kernel, method)(xs[:-2]), expected)
+        assert numpy.ndim(getattr(kernel, method)(1.5)) == 0
+    assert kernel.cdf(inf) == 1
+    assert kernel.cdf(-inf) == 0
+
+def test_kernel_fallback():
+    dist = scipy.stats.laplace(loc=1)
+    kernel = Kernel(dist)
+    assert 'logpdf' not in kernel.__dict__
+    assert kernel.logpdf(.5) == dist.logpdf(.5)
+    kernel = Kernel(scipy.stats.norm())
+    assert kernel.ppf(.5) == 0
+    custom = scipy.stats.rv_discrete(name='poisson', values=((1, 2), (.5, .5)))
+    assert 'logpmf' not in Kernel(custom()).__dict__
+
+def test_kernel_flyweight():
+    X = Id('X')
+    spe_a = X >> norm(loc=1, scale=2)
+    spe_b = X >> norm(scale=2, loc=1)
+    assert spe_a.dist is spe_b.dist
+    assert spe_a.kernel.descriptor == ('norm', ((), (('loc', 1), ('scale', 2))))
+    assert spe_a.condition(X > 0).kernel is spe_a.kernel
+    assert (X >> norm(loc=2)).dist is not spe_a.dist
+    # Custom distributions with the same name are distinguished.
+    values_a = scipy.stats.rv_discrete(name='d', values=((1, 2), (.5, .5)))
+    values_b = scipy.stats.rv_discrete(name='d', values=((1, 2), (.1, .9)))
+    assert get_kernel(values_a()) is not get_kernel(values_b())
+
+def test_kernel_flyweight_threads():
+    dists = [scipy.stats.norm(loc=i % 8, scale=3) for i in range(64)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        kernels = list(executor.map(get_kernel, dists))
+    for dist, kernel in zip(dists, kernels):
+        assert kernel is get_kernel(dist)
+    assert len({id(kernel) for kernel in kernels}) == 8
+
+def test_kernel_lazy_normalizers():
+    X = Id('X')
+    spe = (X >> norm()).condition(X > 1)
+    assert 'logZ' not in spe.__dict__
+    assert allclose(spe.logZ, scipy.stats.norm.logsf(1))
+    assert 'logZ' in spe.__dict__
+    spe = (X >> poisson(mu=2)).condition(X << {1, 2, 3})
+    assert allclose(spe.Fu - spe.Fl, scipy.stats.poisson(mu=2).cdf(3)
+        - scipy.stats.poisson(mu=2).cdf(0))
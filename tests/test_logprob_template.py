@@ -0,0 +1,63 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+import numpy
+import pytest
+
+from sppl.distributions import atomic
+from sppl.distributions import choice
+from sppl.distributions import gamma
+from sppl.distributions import norm
+from sppl.distributions import poisson
+from sppl.math_util import allclose
+from sppl.transforms import EventTemplate
+from sppl.transforms import Id
+from sppl.transforms import Threshold
+from sppl.transforms import make_event_template
+
+X = Id('X')
+Y = Id('Y')
+Z = Id('Z')
+N = Id('N')
+
+ts = numpy.linspace(-4, 8, 49)
+
+def check_template(spe, func):
+    expected = [spe.logprob(func(t)) for t in ts.tolist()]
+    assert allclose(spe.logprob_template(func, ts), expected)
+
+def test_event_template():
+    t = Threshold()
+    assert (X < t) == EventTemplate(X, True, True)
+    assert (X <= t) == EventTemplate(X, True, False)
+    assert (t < X) == EventTemplate(X, False, True)
+    assert (X >= t) == EventTemplate(X, False, False)
+    assert str(X**2 < t) == '(X)**2 < t'
+    assert make_event_template(lambda t: X < t) == EventTemplate(X, True, True)
+    assert make_event_template(lambda t: (X < t) | (Y < t)) is None
+    assert make_event_template(lambda t: (0 < X) < t) is None
+    assert (X < t).instantiate(1) == (X < 1)
+
+@pytest.mark.parametrize('func', [
+    lambda t: X < t,
+    lambda t: X <= t,
+    lambda t: X > t,
+    lambda t: t <= X,
+])
+def test_logprob_template_mixture(func):
+    spe = X >> (.2*norm() | .3*gamma(a=1) | .1*atomic(loc=2) | .4*poisson(mu=3))
+    check_template(spe, func)
+    check_template(spe.condition((X < 1) | (X > 4)), func)
+
+def test_logprob_template_product():
+    spe = (X >> norm()) & (N >> choice({'a': .5, 'b': .5}))
+    spe = spe.transform(Z, X**2)
+    check_template(spe, lambda t: X < t)
+    check_template(spe, lambda t: Z < t)
+    check_template(spe, lambda t: N < t)
+    check_template(spe, lambda t: (X < t) & (N << {'a'}))
+
+def test_cdf():
+    spe = (X >> poisson(mu=3)) & (Y >> norm(loc=1))
+    assert allclose(spe.cdf(X, ts), [spe.prob(X <= t) for t in ts])
+    assert allclose(spe.cdf(Y, ts), [spe.prob(Y <= t) for t in ts])
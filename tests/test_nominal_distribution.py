@@ -10,6 +10,8 @@ import pytest
 from sppl.distributions import choice
 from sppl.math_util import allclose
 from sppl.math_util import isinf_neg
+from sppl.math_util import make_alias_table
+from sppl.math_util import sample_alias_table
 from sppl.sets import FiniteNominal
 from sppl.transforms import Id
 
@@ -68,3 +70,15 @@ def test_nominal_distribution():
     with pytest.raises(ValueError):
         spe.condition(X << {'python'})
     assert spe.condition(~(X << {'python'})) == spe
+
+def test_nominal_sample_alias_table():
+    p = [.5, .25, .125, .125, 0]
+    table = make_alias_table(p)
+    xs = sample_alias_table(table, 10**5, numpy.random.default_rng(1))
+    assert all(abs(numpy.bincount(xs, minlength=5) / 10**5 - p) < .01)
+    X = Id('X')
+    spe = X >> choice({'a': .6, 'b': .3, 'c': .1})
+    assert spe.alias_table is None
+    samples = spe.sample(10**4, prng=numpy.random.RandomState(1))
+    assert spe.alias_table is not None
+    assert abs(sum(s[X] == 'a' for s in samples) / 10**4 - .6) < .02
@@ -0,0 +1,47 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+import numpy
+
+from sppl.distributions import choice
+from sppl.distributions import gamma
+from sppl.distributions import norm
+from sppl.distributions import poisson
+from sppl.math_util import allclose
+from sppl.transforms import Id
+
+X = Id('X')
+Y = Id('Y')
+Z = Id('Z')
+
+def make_spe():
+    spe_a = (X >> norm(loc=-1)) & (Y >> gamma(a=2)) & (Z >> choice({'a': .3, 'b': .7}))
+    spe_b = (X >> norm(loc=2)) & (Y >> norm()) & (Z >> choice({'a': .9, 'b': .1}))
+    return .4*spe_a | .6*spe_b
+
+def test_pdf_grid():
+    spe = make_spe()
+    xs = numpy.linspace(-5, 5, 101)
+    assert allclose(spe.pdf_grid(X, xs), [spe.pdf({X: x}) for x in xs])
+    assert allclose(spe.pdf_grid(Z, ['a', 'b', 'c']), [.66, .34, 0])
+    # Density integrates to one over a fine grid.
+    xs = numpy.linspace(-15, 15, 10**5)
+    assert allclose(numpy.trapz(spe.pdf_grid(X, xs), xs), 1)
+
+def test_pdf_grid_discrete():
+    spe = Y >> (.5*poisson(mu=2) | .5*poisson(mu=5))
+    ys = numpy.arange(-2, 30)
+    assert allclose(spe.pdf_grid(Y, ys), [spe.pdf({Y: y}) for y in ys])
+    assert allclose(spe.pdf_grid(Y, ys).sum(), 1)
+
+def test_pdf_grid2d():
+    spe = make_spe()
+    xs = numpy.linspace(-3, 3, 7)
+    ys = numpy.linspace(-1, 4, 11)
+    grid = spe.pdf_grid2d(X, Y, xs, ys)
+    assert grid.shape == (7, 11)
+    for i, x in enumerate(xs):
+        for j, y in enumerate(ys):
+            assert allclose(grid[i, j], spe.pdf({X: x, Y: y}))
+    grid = spe.pdf_grid2d(X, Z, xs, ['a', 'b'])
+    assert allclose(grid.sum(axis=1), spe.pdf_grid(X, xs))
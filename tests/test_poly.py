@@ -6,10 +6,14 @@ from sympy import Rational
 from sympy import sqrt as SymSqrt
 from sympy.abc import x
 
+from sppl.poly import poly_eval
+from sppl.poly import poly_range
+from sppl.poly import poly_roots
 from sppl.poly import solve_poly_equality
 from sppl.poly import solve_poly_inequality
 
 from sppl.math_util import allclose
+from sppl.math_util import exact_mode
 
 from sppl.sets import EmptySet
 from sppl.sets import ExtReals
@@ -44,13 +48,21 @@ def test_solve_poly_inequaltiy_neg_inf():
 p_quadratic = SymPoly((x-SymSqrt(2)/10)*(x+Rational(10, 7)), x)
 expr_quadratic = p_quadratic.args[0]
 def test_solve_poly_equality_quadratic_zero():
+    with exact_mode():
+        roots = solve_poly_equality(expr_quadratic, 0)
+        assert roots == FiniteReal(SymSqrt(2)/10, -Rational(10,7))
     roots = solve_poly_equality(expr_quadratic, 0)
-    assert roots == FiniteReal(SymSqrt(2)/10, -Rational(10,7))
+    assert roots == FiniteReal(float(SymSqrt(2)/10), -10/7)
 def test_solve_poly_inequality_quadratic_zero():
-    interval = solve_poly_inequality(expr_quadratic, 0, False)
-    assert interval == Interval(-Rational(10,7), SymSqrt(2)/10)
+    with exact_mode():
+        interval = solve_poly_inequality(expr_quadratic, 0, False)
+        assert interval == Interval(-Rational(10,7), SymSqrt(2)/10)
+        interval = solve_poly_inequality(expr_quadratic, 0, True)
+        assert interval == Interval.open(-Rational(10,7), SymSqrt(2)/10)
     interval = solve_poly_inequality(expr_quadratic, 0, True)
-    assert interval == Interval.open(-Rational(10,7), SymSqrt(2)/10)
+    assert allclose(interval.left, -10/7)
+    assert allclose(interval.right, float(SymSqrt(2)/10))
+    assert interval.left_open and interval.right_open
 
 xe1_quad0 = -5/7 + SymSqrt(2)/20 + SymSqrt(2)*SymSqrt(700*SymSqrt(2) + 14849)/140
 xe1_quad1 = -SymSqrt(2)*SymSqrt(700*SymSqrt(2) + 14849)/140 - 5/7 + SymSqrt(2)/20
@@ -111,7 +123,8 @@ def test_solve_poly_inequality_cubic_int_one():
 p_cubic_irrat = SymPoly((x-SymSqrt(2)/10)*(x+Rational(10, 7))*(x-SymSqrt(5)), x)
 expr_cubic_irrat = p_cubic_irrat.args[0]
 def test_solve_poly_equality_cubic_irrat_zero():
-    roots = solve_poly_equality(expr_cubic_irrat, 0)
+    with exact_mode():
+        roots = solve_poly_equality(expr_cubic_irrat, 0)
     # Confirm that roots contains symbolic elements (no timeout).
     assert -Rational(10,7) in roots
     # SymPy is not smart enough to simplify irrational roots symbolically
@@ -130,3 +143,39 @@ def test_solve_poly_equality_cubic_irrat_one():
     assert any(allclose(float(x), xe1_cubic_irrat0) for x in roots)
     assert any(allclose(float(x), xe1_cubic_irrat1) for x in roots)
     assert any(allclose(float(x), xe1_cubic_irrat2) for x in roots)
+
+def test_poly_roots_numerical():
+    # Coefficients are in ascending order of degree.
+    assert allclose(poly_roots([0, -2, 0, 1]), [-2**.5, 0, 2**.5])
+    assert allclose(poly_roots([1, -2, 1]), [1])
+    assert poly_roots([1, 0, 1]) == []
+    assert poly_roots([3]) == []
+
+def test_poly_range_numerical():
+    assert poly_range([3]) == FiniteReal(3)
+    assert poly_range([0, -2, 0, 1]) == ExtReals
+    assert poly_range([1, -2, 1]) == Interval(0, oo) | FiniteReal(oo)
+    assert poly_range([-1, 2, -1]) == Interval(-oo, 0) | FiniteReal(-oo)
+
+def test_solve_poly_numerical_double_root():
+    # (x-1)**2 touches zero without changing sign.
+    assert solve_poly_inequality([1, -2, 1], 0, True) is EmptySet
+    assert solve_poly_inequality([1, -2, 1], 0, False) == FiniteReal(1)
+    assert solve_poly_inequality([-1, 2, -1], 0, True) \
+        == Interval.open(-oo, 1) | Interval.open(1, oo)
+    assert solve_poly_inequality([-1, 2, -1], 0, False) == Reals
+    assert solve_poly_equality([1, -2, 1], 0) == FiniteReal(1)
+    assert solve_poly_equality([0], 0) == Reals
+    assert solve_poly_equality([1], 0) is EmptySet
+
+def test_solve_poly_numerical_snap_roots():
+    # Roots of x**2 + 10*x = 100 are snapped into the solution sets.
+    coeffs = [0, 10, 1]
+    roots = solve_poly_equality(coeffs, 100)
+    assert all(poly_eval(coeffs, x) <= 100 for x in roots)
+    # The positive root is an exact preimage.
+    assert 100 in [poly_eval(coeffs, x) for x in roots]
+    interval = solve_poly_inequality(coeffs, 100, False)
+    assert all(poly_eval(coeffs, x) <= 100 for x in [interval.a, interval.b])
+    interval = solve_poly_inequality(coeffs, 100, True)
+    assert all(poly_eval(coeffs, x) >= 100 for x in [interval.a, interval.b])
@@ -132,3 +132,19 @@ def test_randint():
     assert spe_condition.children[idx1].xu == 4
     assert allclose(spe_condition.children[idx0].logprob(X<<{1,2}), 0)
     assert allclose(spe_condition.children[idx1].logprob(X<<{4}), 0)
+
+def test_logprob_finite_many_blocks():
+    X = Id('X')
+    spe = X >> poisson(mu=50)
+    values = set(range(0, 200, 3)) | set(range(40, 60)) | {.5, oo}
+    expected = logsumexp([spe.logprob(X << {v}) for v in values])
+    assert allclose(spe.logprob(X << values), expected)
+    values = values - {.5}
+    spe_condition = spe.condition(X << values)
+    assert isinstance(spe_condition, SumSPE)
+    assert allclose(spe_condition.logprob(X << values), 0)
+    assert allclose(spe_condition.logprob(X << {45}),
+        spe.logprob(X << {45}) - expected)
+    assert allclose(
+        spe_condition.condition(X > 50).logprob(X << {51, 52}),
+        spe.logprob(X << {51, 52}) - spe.logprob((X << values) & (X > 50)))
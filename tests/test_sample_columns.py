@@ -0,0 +1,64 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+import numpy
+
+from sppl.distributions import atomic
+from sppl.distributions import choice
+from sppl.distributions import norm
+from sppl.distributions import poisson
+from sppl.spe import SampleColumns
+from sppl.transforms import Id
+
+X = Id('X')
+Y = Id('Y')
+Z = Id('Z')
+W = Id('W')
+
+def make_spe():
+    spe_a = (X >> norm(loc=-10)) & (Y >> choice({'a': .9, 'b': .1}))
+    spe_b = (X >> norm(loc=10)) & (Y >> choice({'c': .5, 'b': .5}))
+    spe = .3*spe_a | .7*spe_b
+    return spe & (Z >> (.5*atomic(loc=1) | .5*poisson(mu=4)))
+
+def test_sample_columns():
+    spe = make_spe()
+    prng = numpy.random.RandomState(1)
+    samples = spe.sample_columns(10**5, prng=prng)
+    assert isinstance(samples, SampleColumns)
+    assert set(samples) == {X, Y, Z}
+    assert all(len(v) == 10**5 for v in samples.values())
+    assert samples.labels == {Y: ('a', 'b', 'c')}
+    assert samples[Y].dtype.kind == 'i'
+    # Rows are consistent with the mixture components.
+    ys = samples.decode(Y)
+    assert all(ys[samples[X] < 0] != 'c')
+    assert all(ys[samples[X] > 0] != 'a')
+    # Marginal frequencies match the probabilities.
+    assert abs(numpy.mean(samples[X] < 0) - .3) < .01
+    assert abs(numpy.mean(ys == 'b') - spe.prob(Y << {'b'})) < .01
+    assert abs(numpy.mean(samples[Z] == 1) - spe.prob(Z << {1})) < .01
+
+def test_sample_columns_subset():
+    spe = make_spe().transform(W, X**2 + 1)
+    samples = spe.sample_columns(100, symbols=[W, Y])
+    assert set(samples) == {W, Y}
+    assert all(samples[W] >= 1)
+    assert spe.sample_columns(100, symbols=[]) == {}
+
+def test_sample_columns_reproducible():
+    spe = make_spe()
+    samples_a = spe.sample_columns(50, prng=numpy.random.RandomState(4))
+    samples_b = spe.sample_columns(50, prng=numpy.random.RandomState(4))
+    assert all(numpy.array_equal(samples_a[s], samples_b[s]) for s in samples_a)
+
+def test_sample_iter():
+    spe = make_spe()
+    chunks = list(spe.sample_iter(2500, 1000, prng=numpy.random.RandomState(1)))
+    assert [len(c[X]) for c in chunks] == [1000, 1000, 500]
+    assert all(c.labels == {Y: ('a', 'b', 'c')} for c in chunks)
+    # Alias tables are built once and then reused.
+    assert spe.children[0].alias_table is not None
+    ys = numpy.concatenate([c.decode(Y) for c in chunks])
+    assert abs(numpy.mean(ys == 'b') - spe.prob(Y << {'b'})) < .05
+    assert list(spe.sample_iter(0, 10)) == []
@@ -0,0 +1,62 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+import pickle
+
+import numpy
+
+from sppl.distributions import choice
+from sppl.distributions import gamma
+from sppl.distributions import norm
+from sppl.spe import SAMPLE_BLOCK_SIZE
+from sppl.transforms import Id
+
+X = Id('X')
+Y = Id('Y')
+
+def test_sample_generator():
+    spe = (X >> (.3*norm() | .7*gamma(a=1))) & (Y >> choice({'a': .5, 'b': .5}))
+    samples_a = spe.sample(20, prng=numpy.random.default_rng(1))
+    samples_b = spe.sample(20, prng=numpy.random.default_rng(1))
+    assert samples_a == samples_b
+    assert len(spe.sample(20, prng=numpy.random.RandomState(1))) == 20
+    assert len(spe.sample(20)) == 20
+
+def test_sample_global_seed():
+    spe = (X >> (.3*norm() | .7*gamma(a=1))) & (Y >> choice({'a': .5, 'b': .5}))
+    numpy.random.seed(0)
+    samples_a = spe.sample(20)
+    numpy.random.seed(0)
+    samples_b = spe.sample(20)
+    assert samples_a == samples_b
+    numpy.random.seed(0)
+    samples_b = spe.sample(20, workers=1)
+    assert samples_a == samples_b
+    numpy.random.seed(0)
+    samples_a = spe.sample(20, workers=2)
+    numpy.random.seed(0)
+    samples_b = spe.sample(20, workers=2)
+    assert samples_a == samples_b
+
+def test_sample_workers_reproducible():
+    spe = (X >> (.3*norm() | .7*gamma(a=1))) & (Y >> choice({'a': .5, 'b': .5}))
+    N = 2*SAMPLE_BLOCK_SIZE + 10
+    samples = [
+        spe.sample(N, prng=numpy.random.default_rng(2), workers=workers)
+        for workers in [None, 1, 3]
+    ]
+    assert len(samples[0]) == N
+    assert samples[0] == samples[1] == samples[2]
+    assert spe.sample(0, workers=2) == []
+
+def test_sample_workers_categorical():
+    spe = (X >> norm()) & (Y >> choice({'a': .2, 'b': .8}, exact=False))
+    spe_copy = pickle.loads(pickle.dumps(spe))
+    assert spe_copy == spe
+    N = SAMPLE_BLOCK_SIZE + 10
+    samples = [
+        spe.sample(N, prng=numpy.random.default_rng(3), workers=workers)
+        for workers in [1, 2]
+    ]
+    assert samples[0] == samples[1]
+    assert {s[Y] for s in samples[0]} == {'a', 'b'}
@@ -1,16 +1,27 @@
 # Copyright 2020 MIT Probabilistic Computing Project.
 # See LICENSE.txt
 
+import math
+import pickle
+
+from functools import reduce
+
+import numpy
 import pytest
+import sympy
 
+from sppl.math_util import exact_mode
 from sppl.sets import EmptySet
 from sppl.sets import FiniteNominal as FN
 from sppl.sets import FiniteReal as FR
 from sppl.sets import Interval
+from sppl.sets import Strings
 from sppl.sets import Union
+from sppl.sets import Vocabulary
 from sppl.sets import inf
-from sppl.sets import union_intervals
-from sppl.sets import union_intervals_finite
+from sppl.sets import make_intersection
+from sppl.sets import nominal_vocabulary
+from sppl.sets import union_intervals_atoms
 
 def test_FiniteNominal_in():
     with pytest.raises(Exception):
@@ -69,6 +80,47 @@ def test_FiniteNominal_or():
     # Interval
     assert FN('a') | Interval(0,1) == Union(FN('a'), Interval(0,1))
 
+def test_FiniteNominal_bits():
+    words = ['w%d' % (i,) for i in range(1000)]
+    with nominal_vocabulary() as vocabulary:
+        x = FN(*words[:600])
+        y = FN(*words[400:])
+        middle = FN(*words[400:600], b=True)
+        full = FN(*words, b=True)
+    assert x.vocabulary is y.vocabulary is vocabulary
+    assert (x & y).values == frozenset(words[400:600])
+    assert (x | y).values == frozenset(words)
+    assert (x & ~y).values == frozenset(words[:400])
+    assert (~x | ~y) == ~(x & y) == middle
+    assert (~x & ~y) == ~(x | y) == full
+    assert x & FN(*words[600:]) is EmptySet
+    # Bits are set only at the positions of the given values.
+    assert Vocabulary(words).to_bits(['w3', 'w5']) == 0b101000
+    assert len(vocabulary.values) == 1000
+    # Sets built from bits and from values agree, and hash by their bits.
+    z = FN(bits=x.bits, vocabulary=vocabulary)
+    assert z == x and hash(z) == hash(x)
+    assert 'values' not in z.__dict__
+    assert 'w1' in z and 'w700' not in z
+    assert vocabulary.from_bits(x.bits) == x.values
+    # Sets from other scopes, or no scope, combine by values but are
+    # only equal to sets with the same vocabulary.
+    u = FN(*words[:600])
+    assert u.vocabulary is None and 'bits' not in u.__dict__
+    with nominal_vocabulary():
+        v = FN(*words[400:])
+    assert u != x and u.values == x.values
+    assert (u & v).values == (x & y).values
+    assert x | v == u | y == FN(*words)
+    # Bits are not pickled, only values.
+    w = pickle.loads(pickle.dumps(x & y))
+    assert 'bits' not in w.__dict__ and w.vocabulary is None
+    assert w == FN(*words[400:600])
+    # Vocabularies are pickled without their lock.
+    vocabulary_copy = pickle.loads(pickle.dumps(vocabulary))
+    assert vocabulary_copy.values == vocabulary.values
+    assert vocabulary_copy.intern('w1000') == 1000
+
 def test_FiniteReal_in():
     with pytest.raises(Exception):
         FR()
@@ -83,6 +135,12 @@ def test_FiniteReal_invert():
         Interval.Ropen(-inf,-1),
         Interval.open(-1, 0),
         Interval.Lopen(0, inf))
+    assert all(type(i.b) is int for i in (~FR(1, 2)).blocks[:2])
+    with exact_mode():
+        assert ~FR(sympy.sqrt(2), 1) == Union(
+            Interval.Ropen(-inf, 1),
+            Interval.open(1, sympy.sqrt(2)),
+            Interval.Lopen(sympy.sqrt(2), inf))
 
 def test_FiniteReal_and():
     assert FR(1) & FR(2) is EmptySet
@@ -107,6 +165,13 @@ def test_FiniteReal_or():
     assert FR(0,2) | Interval.Lopen(2.5,10) == Union(Interval.Lopen(2.5,10), FR(0,2))
     assert FR(-1,1) | Interval(-10,10) == Interval(-10,10)
     assert FR(-1,11) | Interval(-10,10) == Union(Interval(-10, 10), FR(11))
+    # Union
+    x = Interval.open(0,1) | Interval.Lopen(5,6) | FN('a')
+    assert FR(0.5, 6) | x == x
+    assert FR(1, 5, 20) | x \
+        == Union(Interval.Lopen(0,1), Interval(5,6), FR(20), FN('a'))
+    assert FR(1, 5) | (Interval.open(0,1) | Interval.open(1,2)) \
+        == Union(Interval.open(0,2), FR(5))
 
 def test_Interval_in():
     with pytest.raises(Exception):
@@ -201,52 +266,52 @@ def test_Interval_or():
     assert Interval(-10,10) | FR(-1,11) == Union(Interval(-10, 10), FR(11))
     assert Interval(-inf, -3, right_open=True) | Interval(-inf, inf) == Interval(-inf, inf)
 
-def test_union_intervals():
-    assert union_intervals([
+def test_union_intervals_atoms():
+    assert union_intervals_atoms([
         Interval(0,1),
         Interval(2,3),
         Interval(1,2)
-    ]) == [Interval(0,3)]
-    assert union_intervals([
+    ], []) == ([Interval(0,3)], [])
+    assert union_intervals_atoms([
         Interval.open(0,1),
         Interval(2,3),
         Interval(1,2)
-    ]) == [Interval.Lopen(0,3)]
-    assert union_intervals([
+    ], []) == ([Interval.Lopen(0,3)], [])
+    assert union_intervals_atoms([
         Interval.open(0,1),
         Interval(2,3),
         Interval.Lopen(1,2)
-    ]) == [Interval.open(0,1), Interval.Lopen(1,3)]
-    assert union_intervals([
+    ], []) == ([Interval.open(0,1), Interval.Lopen(1,3)], [])
+    assert union_intervals_atoms([
         Interval.open(0,1),
         Interval.Ropen(0,3),
         Interval.Lopen(1,2)
-    ]) == [Interval.Ropen(0,3)]
-    assert union_intervals([
+    ], []) == ([Interval.Ropen(0,3)], [])
+    assert union_intervals_atoms([
         Interval.open(-2,-1),
         Interval.Ropen(0,3),
         Interval.Lopen(1,2)
-    ]) == [Interval.open(-2,-1), Interval.Ropen(0,3)]
+    ], []) == ([Interval.open(-2,-1), Interval.Ropen(0,3)], [])
 
-def test_union_intervals_finite():
-    assert union_intervals_finite([
+def test_union_intervals_atoms_finite():
+    assert union_intervals_atoms([
             Interval.open(0,1),
             Interval(2,3),
             Interval.Lopen(1,2)
-        ], FR(1)) \
-        == [Interval.Lopen(0, 3)]
-    assert union_intervals_finite([
+        ], [1]) \
+        == ([Interval.Lopen(0, 3)], [])
+    assert union_intervals_atoms([
             Interval.open(0,1),
             Interval.open(2, 3),
             Interval.open(1,2)
-        ], FR(1, 3)) \
-        == [Interval.open(0, 2), Interval.Lopen(2, 3)]
-    assert union_intervals_finite([
+        ], [1, 3]) \
+        == ([Interval.open(0, 2), Interval.Lopen(2, 3)], [])
+    assert union_intervals_atoms([
             Interval.open(0,1),
             Interval.open(1, 3),
             Interval.open(11,15)
-        ], FR(1, -11, -19, 3)) \
-        == [Interval.Lopen(0, 3), Interval.open(11,15), FR(-11, -19)]
+        ], [1, -11, -19, 3]) \
+        == ([Interval.Lopen(0, 3), Interval.open(11,15)], [-19, -11])
 
 def test_Union_or():
     x = Interval(0,1) | Interval(5,6) | Interval(10,11)
@@ -284,3 +349,97 @@ def test_Union_and():
     assert x == FR(1,2)
     x = (FR(1,12) | Interval(0, 5) | Interval(7,10)) & Interval(4, 12)
     assert x == Union(Interval(4,5), Interval(7,10), FR(12))
+
+def test_FiniteReal_arrays():
+    values = FR(*range(0, 10**5, 2), -inf, 1.5)
+    assert 4 in values
+    assert 5 not in values
+    assert -inf in values
+    assert inf not in values
+    assert str(FR(1, 2) & Interval(0, 1)) == '{1}'
+    assert values & Interval.Lopen(0, 7) == FR(1.5, 2, 4, 6)
+    assert values & Interval(-inf, -1) is EmptySet
+    assert (values | Interval(1, 10**5)) == (FR(-inf, 0) | Interval(1, 10**5))
+    assert FR(1, 2, 3).select(Interval(1, 2), inside=False) == [3]
+    # Symbolic values fall back to exact comparison.
+    with exact_mode():
+        symbolic = FR(sympy.sqrt(2), 1)
+        assert symbolic.arrays is None
+        assert sympy.sqrt(2) in symbolic
+        assert float(sympy.sqrt(2)) not in symbolic
+        assert symbolic & Interval(1, 2) == symbolic
+
+def test_sympy_numbers_normalized():
+    interval = Interval(-sympy.pi/4, sympy.pi/4)
+    assert isinstance(interval.a, float) and isinstance(interval.b, float)
+    assert interval == Interval(-math.pi/4, math.pi/4)
+    values = FR(sympy.Integer(2), sympy.sqrt(2), sympy.oo)
+    assert values == FR(2, math.sqrt(2), inf)
+    assert all(type(x) in (int, float) for x in values)
+    assert values.arrays is not None
+    with exact_mode():
+        interval = Interval(-sympy.pi/4, sympy.pi/4)
+        assert interval.b == sympy.pi/4
+        assert interval != Interval(-math.pi/4, math.pi/4)
+
+def test_Union_canonical_sweep():
+    prng = numpy.random.RandomState(1)
+    def random_set(n):
+        intervals = []
+        for _i in range(n):
+            (a, b) = sorted(prng.choice(20, size=2, replace=False))
+            opens = prng.choice([True, False], size=2)
+            intervals.append(Interval(a, b, opens[0], opens[1]))
+        atoms = FR(*prng.choice(21, size=3))
+        return reduce(lambda x, y: x | y, intervals, atoms)
+    grid = [x/2 for x in range(-2, 43)]
+    for _trial in range(20):
+        (x, y, z) = (random_set(4), random_set(4), random_set(2))
+        for result, check in [
+                (x | y, lambda v: v in x or v in y),
+                (x & y, lambda v: v in x and v in y),
+                (~x, lambda v: v not in x),
+                (make_intersection(x, y, ~z),
+                    lambda v: v in x and v in y and v not in z),
+                ]:
+            assert all((v in result) == check(v) for v in grid)
+        assert make_intersection(x, y, ~z) == x & y & ~z
+        # Blocks are disjoint and not adjacent.
+        blocks = (x | y).blocks if isinstance(x | y, Union) else []
+        for i, j in zip(blocks, blocks[1:]):
+            assert i.b < j.a or (i.b == j.a and i.right_open and j.left_open)
+
+def test_Union_intersect_strings():
+    # Real atoms are not members of a cofinite nominal set.
+    assert FR(7, 10) & (Interval(3, 4) | Strings) is EmptySet
+    assert (Interval(3, 4) | Strings) & FR(7, 10) is EmptySet
+    x = Interval(3, 4) | FR(-inf, inf) | Strings
+    y = FR(7, -inf, inf) | Strings
+    assert x & y == Union(FR(-inf, inf), Strings)
+    assert 7 not in x & y
+    with exact_mode():
+        assert FR(sympy.sqrt(2)) & (Interval(3, 4) | Strings) is EmptySet
+    assert make_intersection(
+        Interval(3, 4) | Strings,
+        FR(7, 10) | FN('a'),
+        FN('a', 'b') | Interval(0, 10)) == FN('a')
+    assert make_intersection(x, EmptySet, y) is EmptySet
+
+def test_Union_intersect_overlapping():
+    # A Union built with the constructor may hold overlapping intervals.
+    x = Union(Interval(0, 2), Interval(1, 3), FR(5))
+    assert x & Interval(1.5, 2.5) == Interval(1.5, 2.5)
+    assert x & Union(Interval.Ropen(-1, 1), Interval.Lopen(2, 6)) \
+        == Union(Interval.Ropen(0, 1), Interval.Lopen(2, 3), FR(5))
+
+def test_Union_canonical_infinite_atoms():
+    assert Interval(-inf, 1) | FR(-inf) == Union(FR(-inf), Interval(-inf, 1))
+    x = Union(FR(-inf, 3), Interval(0, 1), Interval.open(1, 2))
+    assert ~x == Union(Interval.open(-inf, 0),
+        Interval.Ropen(2, 3), Interval.open(3, inf))
+    assert ~Union(FR(1), Interval.open(0, 1), Interval.open(1, 2)) \
+        == Union(Interval(-inf, 0), Interval(2, inf))
+    assert ~Union(FR(0), Interval.open(0, 1), Interval.open(1, 2)) \
+        == Union(FR(1), Interval.open(-inf, 0), Interval(2, inf))
+    assert x & Interval(-inf, 1) == Interval(0, 1)
+    assert x | Interval(1, 3) == Union(FR(-inf), Interval(0, 3))
@@ -27,6 +27,7 @@ spes = [
     X >> norm(loc=0, scale=1),
     X >> poisson(mu=7),
     Y >> choice({'a': 0.5, 'b': 0.5}),
+    (Y >> choice({'a': 0.25, 'b': 0.75}, exact=False)).condition(Y << {'a'}),
     (X >> norm(loc=0, scale=1)) & (Y >> gamma(a=1)),
     0.2*(X >> norm(loc=0, scale=1)) | 0.8*(X >> gamma(a=1)),
     ((X >> norm(loc=0, scale=1)) & (Y >> gamma(a=1))).constrain({Y:1}),
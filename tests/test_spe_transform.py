@@ -1,6 +1,8 @@
 # Copyright 2020 MIT Probabilistic Computing Project.
 # See LICENSE.txt
 
+import pickle
+
 import pytest
 
 from sppl.distributions import choice
@@ -8,6 +10,7 @@ from sppl.distributions import norm
 from sppl.distributions import poisson
 from sppl.math_util import allclose
 from sppl.transforms import Id
+from sppl.transforms import make_environment
 
 def test_transform_real_leaf_logprob():
     X = Id('X')
@@ -51,6 +54,34 @@ def test_transform_real_leaf_sample():
     assert all(spe.sample_func(lambda X,Y,Z: X-Y+Z==Z, 100))
     assert all(set(s) == {X,Y} for s in spe.sample_subset([X, Y], 100))
 
+def test_transform_environment_shared():
+    X = Id('X')
+    Z = Id('Z')
+    Y = Id('Y')
+    W = Id('W')
+    env = make_environment(X)
+    env_z = env.extend(Z, X**2)
+    env_y = env_z.extend(Y, 2*Z)
+    # Extending an environment that was already extended copies it.
+    env_w = env_z.extend(W, Z+1)
+    assert env_y.order is env_z.order is env.order
+    assert env_w.order is not env.order
+    assert list(env_y) == [X, Z, Y]
+    assert list(env_w) == [X, Z, W]
+    assert Y not in env_z and Y not in env_w and W not in env_y
+    with pytest.raises(KeyError):
+        env_z[Y]
+    # Substitution uses the composed expressions.
+    assert env_y.composed[Y] == (2*Z).substitute({Z: X**2})
+    assert env_y.substitute(Y > 1) == (Y > 1).substitute(dict(env_y))
+    event = (W > 1) | (Z < 1)
+    assert env_w.substitute(event) == event.substitute(dict(env_w))
+    with pytest.raises(AssertionError):
+        env_z.substitute(W > 1)
+    # Round trip through a dict and pickle.
+    assert make_environment(X, dict(env_y)) == env_y
+    assert pickle.loads(pickle.dumps(env_w)) == env_w
+
 def test_transform_sum():
     X = Id('X')
     Z = Id('Z')
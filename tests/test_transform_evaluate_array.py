@@ -0,0 +1,67 @@
+# Copyright 2020 MIT Probabilistic Computing Project.
+# See LICENSE.txt
+
+import numpy
+import pytest
+
+from sppl.distributions import norm
+from sppl.math_util import allclose
+from sppl.sets import inf as oo
+from sppl.transforms import Exp
+from sppl.transforms import Id
+from sppl.transforms import Log
+from sppl.transforms import Piecewise
+from sppl.transforms import Sqrt
+
+X = Id('X')
+Y = Id('Y')
+Z = Id('Z')
+
+xs = numpy.linspace(.5, 4, 15)
+
+@pytest.mark.parametrize('expr', [
+    X,
+    X**2 - 3*X + 1,
+    Sqrt(X),
+    Exp(X),
+    2**X,
+    Log(X),
+    abs(X - 2),
+    1 / X,
+    (X + 1)**(1, 3),
+])
+def test_evaluate_array(expr):
+    ys = expr.evaluate_array({X: xs})
+    assert ys.dtype == numpy.float64
+    expected = [expr.evaluate({X: x}) for x in xs]
+    expected = [float(next(iter(y)) if isinstance(y, set) else y)
+        for y in expected]
+    assert allclose(ys, expected)
+
+def test_evaluate_array_infinite():
+    values = numpy.array([-oo, 0, oo])
+    assert list((X**3 - X).evaluate_array({X: values})) == [-oo, 0, oo]
+    assert list((-X**2).evaluate_array({X: values})) == [-oo, 0, -oo]
+    assert list((1 / X).evaluate_array({X: values[[0, 2]]})) == [0, 0]
+    assert list(Log(X).evaluate_array({X: values[1:]})) == [-oo, oo]
+    assert list(Exp(X).evaluate_array({X: values})) == [0, 1, oo]
+    assert list((2**X).evaluate_array({X: values})) == [0, 1, oo]
+    assert Exp(X).evaluate_array({X: xs}).tolist() == numpy.exp(xs).tolist()
+
+def test_evaluate_array_piecewise():
+    expr = Piecewise([X**2, X], [X < 0, 0 <= X])
+    values = numpy.array([-2, -1, 0, 3])
+    assert list(expr.evaluate_array({X: values})) == [4, 1, 0, 3]
+    expr = Piecewise([X**2], [X < 0])
+    with pytest.raises(ValueError):
+        expr.evaluate_array({X: values})
+    with pytest.raises(ValueError):
+        X.evaluate_array({Y: values})
+
+def test_evaluate_array_sample():
+    spe = (X >> norm()).transform(Y, X**2).transform(Z, Exp(Y) + 1)
+    samples = spe.sample_columns(100, prng=numpy.random.default_rng(1))
+    assert allclose(samples[Y], samples[X]**2)
+    assert allclose(samples[Z], numpy.exp(samples[Y]) + 1)
+    rows = spe.sample_subset([X, Z], 10, prng=numpy.random.default_rng(1))
+    assert all(allclose(r[Z], numpy.exp(r[X]**2) + 1) for r in rows)